@@ -0,0 +1,209 @@
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from .optimizer import PortfolioOptimizer, RESTART_SEED
+from .metrics import RiskMetrics
+from .moments import RollingMoments
+
+
+def _solve_rebalance_block(returns: pd.DataFrame, positions: List[int], window: int, objective: str,
+                           portfolio_type: str, esg_scores: Optional[Dict[str, float]], esg_weight: float,
+                           restarts: int) -> List[Tuple[int, np.ndarray]]:
+    """
+    Solve a contiguous block of rebalance dates sequentially.
+
+    Each solve after the first is warm-started from the previous date's weights and
+    reuses the previous window's moments, so blocks are the unit of work handed to
+    the process pool.
+
+    Args:
+        returns: DataFrame of asset returns (full history)
+        positions: Row positions of the rebalance dates in this block
+        window: Number of trailing rows used for each optimization
+        objective: Optimization objective
+        portfolio_type: "long_only" or "long_short"
+        esg_scores: Optional ESG scores passed through to the optimizer
+        esg_weight: ESG weight passed through to the optimizer
+        restarts: Restarts per warm-started solve
+
+    Returns:
+        List of (position, weights) tuples in the order of positions
+    """
+    results = []
+    previous_weights = None
+    returns_values = returns.to_numpy(dtype=float)
+    moments = None
+    moments_end = None
+
+    for position in positions:
+        # Only data strictly before the rebalance date is visible to the optimizer
+        training = returns.iloc[position - window:position]
+
+        # Slide the window moments forward row by row instead of recomputing the covariance
+        if moments is None or position - moments_end >= window:
+            moments = RollingMoments.from_returns(training)
+        else:
+            for row in returns_values[moments_end:position]:
+                moments.slide(row)
+        moments_end = position
+
+        optimizer = PortfolioOptimizer(
+            returns=training,
+            objective=objective,
+            portfolio_type=portfolio_type,
+            esg_scores=esg_scores,
+            esg_weight=esg_weight,
+            moments=moments,
+            seed=RESTART_SEED
+        )
+
+        try:
+            if previous_weights is None:
+                weights, _ = optimizer.optimize()
+            else:
+                weights, _ = optimizer.optimize(initial_weights=previous_weights, num_restarts=restarts)
+        except ValueError:
+            # Keep the current allocation if this window cannot be solved
+            if previous_weights is None:
+                weights = np.ones(returns.shape[1]) / returns.shape[1]
+            else:
+                weights = previous_weights
+
+        results.append((position, weights))
+        previous_weights = weights
+
+    return results
+
+
+class WalkForwardBacktester:
+    """Out-of-sample backtest that periodically re-optimizes on a trailing window."""
+
+    def __init__(self, returns: pd.DataFrame, objective: str = "sharpe", portfolio_type: str = "long_only",
+                 window: int = 252, rebalance_every: int = 21, esg_scores: Optional[Dict[str, float]] = None,
+                 esg_weight: float = 0.0, max_workers: Optional[int] = None, restarts_per_rebalance: int = 1):
+        """
+        Initialize backtester.
+
+        Args:
+            returns: DataFrame of asset returns, indexed by date
+            objective: Optimization objective ("sharpe", "sortino", "calmar", "min_variance", "hrp", "risk_parity")
+            portfolio_type: "long_only" or "long_short"
+            window: Number of trailing trading days used for each optimization
+            rebalance_every: Number of trading days between rebalances
+            esg_scores: Dictionary mapping ticker to ESG score (lower is better)
+            esg_weight: Weight for ESG in blended objective (0.0 to 1.0)
+            max_workers: Processes used across rebalance dates (default: CPU count, 1 = in-process)
+            restarts_per_rebalance: Restarts for warm-started solves (the first solve uses the default)
+        """
+        if window < 2:
+            raise ValueError("Training window must be at least 2 days")
+        if rebalance_every < 1:
+            raise ValueError("Rebalance frequency must be at least 1 day")
+        if len(returns) <= window:
+            raise ValueError(f"Insufficient data: {len(returns)} days available, need more than the {window}-day training window")
+
+        self.returns = returns
+        self.objective = objective
+        self.portfolio_type = portfolio_type
+        self.window = window
+        self.rebalance_every = rebalance_every
+        self.esg_scores = esg_scores
+        self.esg_weight = esg_weight
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.restarts_per_rebalance = restarts_per_rebalance
+
+    def rebalance_positions(self) -> List[int]:
+        """Row positions at which the portfolio is re-optimized (first out-of-sample day of each period)."""
+        return list(range(self.window, len(self.returns), self.rebalance_every))
+
+    def block_tasks(self) -> List[Tuple[Callable, tuple]]:
+        """
+        Solves of the rebalance dates as (function, args) tasks, one per contiguous
+        block of dates and at most max_workers of them.
+
+        Callers that schedule work themselves (e.g. on a shared, admission-controlled
+        pool) run these tasks and pass the concatenated results to run().
+        """
+        positions = self.rebalance_positions()
+        n_blocks = max(1, min(self.max_workers, len(positions)))
+        blocks = [list(block) for block in np.array_split(positions, n_blocks) if len(block) > 0]
+        return [
+            (_solve_rebalance_block, (self.returns, block, self.window, self.objective, self.portfolio_type,
+                                      self.esg_scores, self.esg_weight, self.restarts_per_rebalance))
+            for block in blocks
+        ]
+
+    def _solve_all(self) -> Dict[int, np.ndarray]:
+        """Solve every rebalance date, splitting contiguous blocks across a process pool."""
+        tasks = self.block_tasks()
+        if len(tasks) == 1:
+            fn, args = tasks[0]
+            return dict(fn(*args))
+
+        solved = []
+        with ProcessPoolExecutor(max_workers=len(tasks)) as executor:
+            futures = [executor.submit(fn, *args) for fn, args in tasks]
+            for future in futures:
+                solved.extend(future.result())
+        return dict(solved)
+
+    def run(self, solved: Optional[List[Tuple[int, np.ndarray]]] = None) -> Dict:
+        """
+        Run the walk-forward backtest.
+
+        Target weights are applied from the rebalance date onwards and drift with
+        asset returns until the next rebalance. Turnover is the L1 distance between
+        the drifted and the new target weights (half of it is the one-way turnover).
+
+        Args:
+            solved: (position, weights) of every rebalance date, from running block_tasks();
+                solved here when omitted
+
+        Returns:
+            Dictionary with out-of-sample daily returns, rebalance history and summary metrics
+        """
+        target_weights = dict(solved) if solved is not None else self._solve_all()
+
+        returns_values = self.returns.to_numpy(dtype=float)
+        tickers = list(self.returns.columns)
+        n_assets = len(tickers)
+
+        portfolio_returns = np.empty(len(returns_values) - self.window)
+        holdings = np.zeros(n_assets)
+        rebalances = []
+
+        for day in range(self.window, len(returns_values)):
+            if day in target_weights:
+                new_weights = target_weights[day]
+                turnover = float(np.sum(np.abs(new_weights - holdings)))
+                rebalances.append({
+                    "date": self.returns.index[day],
+                    "weights": {ticker: float(w) for ticker, w in zip(tickers, new_weights)},
+                    "turnover": turnover
+                })
+                holdings = new_weights.copy()
+
+            day_return = float(np.dot(holdings, returns_values[day]))
+            portfolio_returns[day - self.window] = day_return
+
+            # Let weights drift with asset returns until the next rebalance
+            if 1 + day_return != 0:
+                holdings = holdings * (1 + returns_values[day]) / (1 + day_return)
+
+        oos_returns = pd.Series(portfolio_returns, index=self.returns.index[self.window:])
+
+        # The initial allocation from cash is not counted as turnover
+        turnovers = [r["turnover"] for r in rebalances[1:]]
+
+        return {
+            "portfolio_returns": oos_returns,
+            "rebalances": rebalances,
+            "expected_return": float(oos_returns.mean() * 252),
+            "volatility": RiskMetrics.calculate_volatility(oos_returns),
+            "sharpe_ratio": RiskMetrics.calculate_sharpe_ratio(oos_returns),
+            "max_drawdown": RiskMetrics.calculate_max_drawdown(oos_returns),
+            "total_turnover": float(np.sum(turnovers)) if turnovers else 0.0,
+            "average_turnover": float(np.mean(turnovers)) if turnovers else 0.0
+        }
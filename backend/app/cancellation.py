@@ -0,0 +1,83 @@
+import threading
+from typing import Any, Optional
+
+# Flags shared with the parent process, set in each compute worker by init_worker
+_worker_flags: Optional[Any] = None
+
+
+class OperationCancelled(Exception):
+    """Raised when work is abandoned because its CancellationToken was cancelled."""
+
+
+class CancellationToken:
+    """
+    Cooperative cancellation flag, checked between units of work (optimizer restarts,
+    frontier solves, data downloads).
+
+    Passed to ComputePool.run, the token is bound to a slot of a flag array shared
+    with the worker processes, so cancel() in the parent reaches a task that is
+    already running in a worker.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._flags = None
+        self._slot: Optional[int] = None
+
+    def cancel(self) -> None:
+        """Ask the work using this token to stop at its next check."""
+        self._event.set()
+        if self._flags is not None:
+            self._flags[self._slot] = 1
+
+    def is_cancelled(self) -> bool:
+        if self._event.is_set():
+            return True
+        if self._flags is not None and self._flags[self._slot]:
+            self._event.set()
+            return True
+        return False
+
+    def raise_if_cancelled(self) -> None:
+        """
+        Raises:
+            OperationCancelled: If the token was cancelled
+        """
+        if self.is_cancelled():
+            raise OperationCancelled("Operation cancelled")
+
+    def bind(self, flags: Any, slot: int) -> None:
+        """Mirror the flag into flags[slot] (shared memory) while a worker task runs."""
+        flags[slot] = int(self._event.is_set())
+        self._flags = flags
+        self._slot = slot
+
+    def unbind(self) -> None:
+        self._flags = None
+        self._slot = None
+
+    def __reduce__(self):
+        # In a worker process the token reads its slot of the shared flags
+        return _worker_token, (self._slot, self.is_cancelled())
+
+
+def _worker_token(slot: Optional[int], cancelled: bool) -> CancellationToken:
+    token = CancellationToken()
+    if cancelled:
+        token.cancel()
+    if slot is not None and _worker_flags is not None:
+        token._flags = _worker_flags
+        token._slot = slot
+    return token
+
+
+def init_worker(flags: Any) -> None:
+    """ProcessPoolExecutor initializer: share the pool's cancellation flags with this worker."""
+    global _worker_flags
+    _worker_flags = flags
+
+
+def check(token: Optional[CancellationToken]) -> None:
+    """Raise OperationCancelled if token is set and cancelled (no-op for None)."""
+    if token is not None:
+        token.raise_if_cancelled()
@@ -0,0 +1,227 @@
+import asyncio
+import functools
+import logging
+import math
+import multiprocessing
+import os
+import queue
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from typing import Any, Callable, List, Optional
+from . import telemetry
+from .cancellation import CancellationToken, init_worker
+
+logger = logging.getLogger(__name__)
+
+
+class OverloadedError(Exception):
+    """Raised when a request cannot be admitted; maps to 429/503 with Retry-After."""
+
+    def __init__(self, message: str, status_code: int = 429, retry_after: int = 1):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class ComputePool:
+    """
+    Bounded process pool for CPU-bound work plus a thread pool for blocking I/O.
+
+    At most max_workers tasks run at once and at most max_queue more wait for a
+    slot. Requests beyond that are rejected immediately (429), and requests that
+    wait longer than queue_timeout are rejected (503), both with a Retry-After
+    estimated from recent task durations, so the event loop stays responsive and
+    tail latency stays bounded under bursts.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_queue: Optional[int] = None,
+                 queue_timeout: float = 30.0, io_threads: int = 16):
+        """
+        Initialize pool (processes are started lazily on first use).
+
+        Args:
+            max_workers: Worker processes (default: CPU count). 0 runs compute in the
+                I/O thread pool instead, one task at a time (useful for tests/debugging).
+            max_queue: Requests allowed to wait for a worker (default: 2 x max_workers)
+            queue_timeout: Seconds a request may wait for a worker before a 503
+            io_threads: Threads for blocking I/O such as price downloads
+        """
+        self.max_workers = (os.cpu_count() or 1) if max_workers is None else max_workers
+        self.concurrency = max(1, self.max_workers)
+        self.max_queue = 2 * self.concurrency if max_queue is None else max_queue
+        self.queue_timeout = queue_timeout
+        self.io_threads = io_threads
+
+        self._process_executor: Optional[ProcessPoolExecutor] = None
+        # One cancellation flag per running task, in memory shared with the workers
+        self._cancel_flags = None
+        self._free_flags: List[int] = []
+        self._io_executor: Optional[ThreadPoolExecutor] = None
+        self._manager = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending = 0
+        self._avg_duration = 1.0
+
+    @classmethod
+    def from_env(cls) -> "ComputePool":
+        """
+        Build a pool from COMPUTE_WORKERS, COMPUTE_QUEUE_SIZE, COMPUTE_QUEUE_TIMEOUT
+        and IO_THREADS environment variables.
+        """
+        workers = os.getenv("COMPUTE_WORKERS")
+        queue_size = os.getenv("COMPUTE_QUEUE_SIZE")
+        return cls(
+            max_workers=int(workers) if workers else None,
+            max_queue=int(queue_size) if queue_size else None,
+            queue_timeout=float(os.getenv("COMPUTE_QUEUE_TIMEOUT", "30")),
+            io_threads=int(os.getenv("IO_THREADS", "16"))
+        )
+
+    @property
+    def executor(self) -> Optional[ProcessPoolExecutor]:
+        """The process pool, or None when compute runs in threads (max_workers=0)."""
+        if self.max_workers == 0:
+            return None
+        if self._process_executor is None:
+            # Admission caps running tasks at max_workers, so that many flags suffice
+            self._cancel_flags = multiprocessing.RawArray("b", self.max_workers)
+            self._free_flags = list(range(self.max_workers))
+            self._process_executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, initializer=init_worker, initargs=(self._cancel_flags,)
+            )
+        return self._process_executor
+
+    @property
+    def io_executor(self) -> ThreadPoolExecutor:
+        if self._io_executor is None:
+            self._io_executor = ThreadPoolExecutor(max_workers=self.io_threads, thread_name_prefix="io")
+        return self._io_executor
+
+    def message_queue(self) -> Any:
+        """
+        Queue that a task running in this pool can put messages on (e.g. progress).
+
+        The queue can be passed to run() as an argument; read it from this process
+        with run_io(queue.get), since get() blocks.
+        """
+        if self.executor is None:
+            return queue.Queue()
+        if self._manager is None:
+            # Started on first use; its proxies can be pickled into worker processes
+            self._manager = multiprocessing.Manager()
+        return self._manager.Queue()
+
+    @property
+    def pending(self) -> int:
+        """Requests currently running or waiting for a worker."""
+        return self._pending
+
+    def _retry_after(self) -> int:
+        return max(1, math.ceil(self._avg_duration * (self._pending + 1) / self.concurrency))
+
+    @asynccontextmanager
+    async def admit(self, wait: bool = False):
+        """
+        Hold one compute slot for the duration of the block.
+
+        Args:
+            wait: Wait for a slot however long it takes instead of being rejected
+                (for background work that has no client waiting on it)
+
+        Raises:
+            OverloadedError: If the queue is full (429) or the wait times out (503)
+        """
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            # A semaphore is bound to the event loop that first waits on it
+            self._slots = asyncio.Semaphore(self.concurrency)
+            self._slots_loop = loop
+        slots = self._slots
+
+        if not wait and self._pending >= self.concurrency + self.max_queue:
+            raise OverloadedError("Server is busy, please retry later", status_code=429,
+                                  retry_after=self._retry_after())
+
+        self._pending += 1
+        try:
+            try:
+                await asyncio.wait_for(slots.acquire(), timeout=None if wait else self.queue_timeout)
+            except asyncio.TimeoutError:
+                raise OverloadedError("Timed out waiting for a compute worker", status_code=503,
+                                      retry_after=self._retry_after())
+
+            started = time.monotonic()
+            try:
+                yield
+            finally:
+                slots.release()
+                # Exponentially weighted task duration, used for Retry-After estimates
+                self._avg_duration = 0.8 * self._avg_duration + 0.2 * (time.monotonic() - started)
+        finally:
+            self._pending -= 1
+
+    async def run(self, fn: Callable, *args: Any, wait: bool = False,
+                  cancel_token: Optional[CancellationToken] = None) -> Any:
+        """
+        Run a CPU-bound function in the process pool once admitted.
+
+        Args:
+            fn: Picklable module-level function
+            *args: Picklable arguments
+            wait: Wait for a slot instead of being rejected (see admit)
+            cancel_token: Passed to fn as the cancel_token keyword argument. Cancelling
+                it in this process is seen by fn in the worker, and a token cancelled
+                while waiting for a slot never reaches a worker.
+
+        Returns:
+            The function's return value
+
+        Raises:
+            OperationCancelled: If cancel_token was cancelled before or during the run
+        """
+        async with self.admit(wait=wait):
+            loop = asyncio.get_running_loop()
+            executor: Executor = self.executor or self.io_executor
+            call, flags, slot = fn, self._free_flags, None
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+                call = functools.partial(fn, cancel_token=cancel_token)
+                if executor is self._process_executor:
+                    slot = flags.pop()
+                    cancel_token.bind(self._cancel_flags, slot)
+            try:
+                # Metrics recorded in the worker come back with the result
+                result, samples = await loop.run_in_executor(executor, telemetry.collect, call, *args)
+                telemetry.REGISTRY.merge(samples)
+                return result
+            except BrokenProcessPool:
+                # A worker died (e.g. OOM): replace the pool so later requests can proceed
+                logger.error("Compute worker pool broke, restarting it")
+                # Other tasks of the broken pool fail the same way; only the first replaces it
+                if executor is self._process_executor:
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    self._process_executor = None
+                raise OverloadedError("Compute workers restarted, please retry", status_code=503, retry_after=1)
+            finally:
+                if slot is not None:
+                    cancel_token.unbind()
+                    flags.append(slot)
+
+    async def run_io(self, fn: Callable, *args: Any) -> Any:
+        """Run a blocking I/O function in the thread pool (not subject to admission)."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.io_executor, fn, *args)
+
+    def shutdown(self) -> None:
+        if self._process_executor is not None:
+            self._process_executor.shutdown(wait=False, cancel_futures=True)
+            self._process_executor = None
+        if self._io_executor is not None:
+            self._io_executor.shutdown(wait=False, cancel_futures=True)
+            self._io_executor = None
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
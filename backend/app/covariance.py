@@ -0,0 +1,181 @@
+import numpy as np
+import pandas as pd
+from typing import Optional, Sequence, Union
+
+
+class FactorCovariance:
+    """
+    Covariance matrix stored as low-rank plus diagonal: Sigma = B B' + diag(d).
+
+    With n assets and k factors, products with a weight vector, portfolio variance
+    and its gradient cost O(n*k) instead of O(n^2), and the dense n x n matrix is
+    never formed unless to_dense() is called.
+    """
+
+    def __init__(self, loadings: np.ndarray, specific_variance: np.ndarray, tickers: Optional[Sequence[str]] = None):
+        """
+        Initialize factored covariance.
+
+        Args:
+            loadings: n x k factor loading matrix B
+            specific_variance: Length-n vector of idiosyncratic variances d
+            tickers: Optional asset names in row order
+        """
+        loadings = np.asarray(loadings, dtype=float)
+        specific_variance = np.asarray(specific_variance, dtype=float)
+        if loadings.ndim != 2 or specific_variance.shape != (loadings.shape[0],):
+            raise ValueError("Loadings must be n x k and specific variance must have length n")
+
+        self.loadings = loadings
+        self.specific_variance = specific_variance
+        self.tickers = list(tickers) if tickers is not None else None
+
+    @property
+    def n_assets(self) -> int:
+        return self.loadings.shape[0]
+
+    @property
+    def n_factors(self) -> int:
+        return self.loadings.shape[1]
+
+    def __len__(self) -> int:
+        return self.n_assets
+
+    def __matmul__(self, weights: np.ndarray) -> np.ndarray:
+        """Sigma @ w in O(n*k)."""
+        return self.loadings @ (self.loadings.T @ weights) + self.specific_variance * weights
+
+    def variance(self, weights: np.ndarray) -> float:
+        """Portfolio variance w' Sigma w in O(n*k)."""
+        factor_exposure = self.loadings.T @ weights
+        return float(factor_exposure @ factor_exposure + np.dot(self.specific_variance * weights, weights))
+
+    def diagonal(self) -> np.ndarray:
+        """Asset variances (diagonal of Sigma)."""
+        return np.einsum('ij,ij->i', self.loadings, self.loadings) + self.specific_variance
+
+    def subset(self, indices: Sequence[int]) -> "FactorCovariance":
+        """Covariance of a subset of the assets (rows of the loadings and specific variances)."""
+        indices = np.asarray(indices, dtype=int)
+        tickers = [self.tickers[i] for i in indices] if self.tickers is not None else None
+        return FactorCovariance(self.loadings[indices], self.specific_variance[indices], tickers)
+
+    def to_dense(self) -> np.ndarray:
+        """Materialize the full n x n covariance matrix."""
+        return self.loadings @ self.loadings.T + np.diag(self.specific_variance)
+
+    @classmethod
+    def from_pca(cls, returns: pd.DataFrame, n_factors: int = 10, annualize: bool = True, periods_per_year: int = 252) -> "FactorCovariance":
+        """
+        Statistical factor model from the leading principal components of returns.
+
+        The top k components form the loadings; the residual variance of each asset
+        (floored at a small fraction of its total variance) forms the diagonal.
+
+        Args:
+            returns: DataFrame of asset returns
+            n_factors: Number of principal components to keep
+            annualize: Scale to annual units (x periods_per_year)
+            periods_per_year: Return periods per year of returns (252 for daily returns)
+
+        Returns:
+            FactorCovariance with k = min(n_factors, n_assets, n_days - 1) factors
+        """
+        values = returns.to_numpy(dtype=float)
+        n_days, n_assets = values.shape
+        if n_days < 2:
+            raise ValueError("At least 2 days of returns are needed for a factor model")
+
+        k = max(1, min(n_factors, n_assets, n_days - 1))
+        centered = values - values.mean(axis=0)
+
+        # SVD of the centered data avoids forming the n x n sample covariance
+        _, singular_values, components = np.linalg.svd(centered, full_matrices=False)
+        loadings = components[:k].T * (singular_values[:k] / np.sqrt(n_days - 1))
+
+        total_variance = centered.var(axis=0, ddof=1)
+        explained_variance = np.einsum('ij,ij->i', loadings, loadings)
+        specific_variance = np.maximum(total_variance - explained_variance, 1e-4 * total_variance + 1e-12)
+
+        scale = periods_per_year if annualize else 1
+        return cls(loadings * np.sqrt(scale), specific_variance * scale, returns.columns)
+
+    @classmethod
+    def from_shrinkage(cls, returns: pd.DataFrame, annualize: bool = True, periods_per_year: int = 252) -> "FactorCovariance":
+        """
+        Ledoit-Wolf shrinkage of the sample covariance towards a scaled identity.
+
+        Sigma = (1 - delta) * S + delta * mu * I is stored with the principal components
+        of S as loadings. S has rank at most min(n_assets, n_days - 1), so the loadings
+        stay O(n * min(n, T)) however long the history is; the factored form is only
+        cheaper than a dense matrix when there are fewer days than assets - the
+        large-universe case this is meant for.
+
+        Args:
+            returns: DataFrame of asset returns
+            annualize: Scale to annual units (x periods_per_year)
+            periods_per_year: Return periods per year of returns (252 for daily returns)
+
+        Returns:
+            FactorCovariance with one factor per nonzero singular value of the centered returns
+        """
+        values = returns.to_numpy(dtype=float)
+        n_days, n_assets = values.shape
+        if n_days < 2:
+            raise ValueError("At least 2 days of returns are needed for a shrinkage estimate")
+
+        centered = values - values.mean(axis=0)
+
+        # All Ledoit-Wolf terms can be computed from the T x T Gram matrix,
+        # which keeps the estimate O(T^2 * n) without forming S
+        gram = centered @ centered.T
+        sample_trace = np.trace(gram) / n_days
+        mu = sample_trace / n_assets
+        sample_frob_sq = np.sum(gram ** 2) / n_days ** 2
+        dispersion = sample_frob_sq - 2 * mu * sample_trace + mu ** 2 * n_assets
+
+        row_norms_sq = np.diag(gram)
+        quad_forms = np.sum(gram ** 2, axis=1) / n_days
+        b_bar = np.sum(row_norms_sq ** 2 - 2 * quad_forms + sample_frob_sq) / n_days ** 2
+        delta = 0.0 if dispersion <= 0 else min(b_bar, dispersion) / dispersion
+
+        # S = V diag(s^2) V' / (T - 1) from the SVD of the centered returns; components with
+        # (numerically) zero singular values add nothing to S and are dropped
+        _, singular_values, components = np.linalg.svd(centered, full_matrices=False)
+        tolerance = singular_values[0] * max(n_days, n_assets) * np.finfo(float).eps if singular_values.size else 0.0
+        rank = max(1, int(np.sum(singular_values > tolerance)))
+
+        scale = periods_per_year if annualize else 1
+        loadings = components[:rank].T * (singular_values[:rank] * np.sqrt((1 - delta) * scale / (n_days - 1)))
+        specific_variance = np.full(n_assets, delta * mu * n_days / (n_days - 1) * scale)
+        return cls(loadings, specific_variance, returns.columns)
+
+
+def estimate_covariance(returns: pd.DataFrame, model: str = "sample", n_factors: int = 10,
+                        periods_per_year: int = 252) -> Union[np.ndarray, FactorCovariance]:
+    """
+    Annualized covariance estimate for the given model.
+
+    Args:
+        returns: DataFrame of asset returns
+        model: "sample" (dense), "pca" (statistical factor model) or "shrinkage" (Ledoit-Wolf)
+        n_factors: Number of factors for the PCA model
+        periods_per_year: Return periods per year of returns (252 for daily returns)
+
+    Returns:
+        Dense covariance matrix for "sample", FactorCovariance otherwise
+    """
+    if model == "sample":
+        return returns.cov().to_numpy() * periods_per_year
+    if model == "pca":
+        return FactorCovariance.from_pca(returns, n_factors=n_factors, periods_per_year=periods_per_year)
+    if model == "shrinkage":
+        return FactorCovariance.from_shrinkage(returns, periods_per_year=periods_per_year)
+    raise ValueError(f"Unknown covariance model: {model}")
+
+
+def covariance_diagonal(cov_matrix: Union[np.ndarray, FactorCovariance]) -> np.ndarray:
+    """Asset variances for either a dense or a factored covariance."""
+    if isinstance(cov_matrix, FactorCovariance):
+        return cov_matrix.diagonal()
+    return np.diag(cov_matrix)
@@ -1,25 +1,58 @@
 import yfinance as yf
 import pandas as pd
 import numpy as np
-from typing import List, Dict
+from typing import List, Dict, Optional
 from datetime import datetime, timedelta
 import logging
 from dotenv import load_dotenv
+from . import telemetry
+from .cancellation import CancellationToken, OperationCancelled, check
+from .result_cache import last_market_close
 
 load_dotenv()
 logger = logging.getLogger(__name__)
 
+# pandas offset aliases of the compounded return panels: weeks end on Friday, months on the last day
+PANEL_RULES = {"weekly": "W-FRI", "monthly": "ME"}
+
 class DataLoader:
     """Fetches and cleans historical price data for portfolio optimization."""
     
-    def __init__(self, lookback_days: int = 252):
+    def __init__(self, lookback_days: int = 252, cancel_token: Optional[CancellationToken] = None):
         """
         Initialize data loader.
         
         Args:
             lookback_days: Number of trading days to fetch (default: 252 = 1 year)
+            cancel_token: Checked before each download; once cancelled, fetch_prices
+                raises OperationCancelled
         """
         self.lookback_days = lookback_days
+        self.cancel_token = cancel_token
+    
+    def total_days_needed(self) -> int:
+        """Trading days needed: the lookback plus a buffer for rolling metrics."""
+        # Add buffer for rolling metrics (need at least 90 days extra for 90-day rolling windows)
+        # Use max of 90 days or 1.5x lookback_days to ensure enough data
+        # Increase buffer to ensure rolling metrics don't start at 0
+        buffer_days = max(120, int(self.lookback_days * 0.6))
+        return self.lookback_days + buffer_days
+    
+    @staticmethod
+    def history_end() -> datetime:
+        """
+        Exclusive end date of fetch_prices: the day after the last market close.
+
+        The fetch then covers exactly the session the result cache keys on
+        (request_key's as-of date), including today's close once the market has
+        closed, and never today's unfinished session.
+        """
+        return datetime.combine(last_market_close().date() + timedelta(days=1), datetime.min.time())
+    
+    def history_start(self, end_date: datetime = None) -> datetime:
+        """First calendar date fetched by fetch_prices (twice the needed trading days back)."""
+        end_date = end_date or self.history_end()
+        return end_date - timedelta(days=self.total_days_needed() * 2)
     
     def fetch_prices(self, tickers: List[str]) -> pd.DataFrame:
         """
@@ -33,30 +66,30 @@ class DataLoader:
             
         Raises:
             ValueError: If no valid data is retrieved
+            OperationCancelled: If the loader's cancel token was cancelled
         """
         if not tickers:
             raise ValueError("Tickers list cannot be empty")
+        check(self.cancel_token)
         
-        # Add buffer for rolling metrics (need at least 90 days extra for 90-day rolling windows)
-        # Use max of 90 days or 1.5x lookback_days to ensure enough data
-        # Increase buffer to ensure rolling metrics don't start at 0
-        buffer_days = max(120, int(self.lookback_days * 0.6))
-        total_days_needed = self.lookback_days + buffer_days
+        total_days_needed = self.total_days_needed()
         
         # Calculate start date - fetch more data than needed
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=total_days_needed * 2)
+        end_date = self.history_end()
+        start_date = self.history_start(end_date)
         
         # Fetch data
         try:
-            data = yf.download(
-                tickers,
-                start=start_date.strftime("%Y-%m-%d"),
-                end=end_date.strftime("%Y-%m-%d"),
-                progress=False
-            )
+            with telemetry.span("download_prices"):
+                data = yf.download(
+                    tickers,
+                    start=start_date.strftime("%Y-%m-%d"),
+                    end=end_date.strftime("%Y-%m-%d"),
+                    progress=False
+                )
         except Exception as e:
             raise ValueError(f"Failed to fetch data: {str(e)}")
+        check(self.cancel_token)
         
         # Handle single ticker case
         if len(tickers) == 1:
@@ -103,17 +136,45 @@ class DataLoader:
         return returns
     
     @staticmethod
-    def fetch_esg_scores(tickers: List[str]) -> Dict[str, float]:
+    def resample_returns(returns: pd.DataFrame, frequency: str) -> pd.DataFrame:
+        """
+        Compound daily returns into weekly or monthly returns.
+        
+        Args:
+            returns: Daily returns
+            frequency: "daily" (returned as is), "weekly" or "monthly"
+            
+        Returns:
+            Returns indexed by period end; the latest period may still be incomplete
+            
+        Raises:
+            ValueError: If frequency is unknown
+        """
+        if frequency == "daily":
+            return returns
+        if frequency not in PANEL_RULES:
+            raise ValueError(f"Unknown frequency: {frequency}")
+        # Periods without any trading day (min_count=1 makes them NaN) are dropped
+        growth = (1 + returns).resample(PANEL_RULES[frequency]).prod(min_count=1)
+        return growth.dropna(how="all") - 1
+    
+    @staticmethod
+    @telemetry.span("download_esg")
+    def fetch_esg_scores(tickers: List[str], cancel_token: Optional[CancellationToken] = None) -> Dict[str, float]:
         """
         Fetch ESG scores for given tickers using Financial Modeling Prep API.
         Falls back to yfinance if API key is not available or requests fail.
         
         Args:
             tickers: List of stock ticker symbols
+            cancel_token: Checked before each per-ticker request
             
         Returns:
             Dictionary mapping ticker to ESG score (lower is better)
             Missing or unavailable data gets a neutral score based on available scores
+            
+        Raises:
+            OperationCancelled: If cancel_token was cancelled
         """
         import time
         import os
@@ -134,6 +195,7 @@ class DataLoader:
                 for i, ticker in enumerate(tickers):
                     if fmp_failed:
                         break
+                    check(cancel_token)
                         
                     if i > 0:
                         time.sleep(0.25)  # Rate limiting: ~4 requests per second
@@ -266,6 +328,8 @@ class DataLoader:
                     except Exception as e:
                         logger.warning(f"FMP API request failed for {ticker}: {str(e)}")
                         continue
+            except OperationCancelled:
+                raise
             except Exception as e:
                 logger.warning(f"Error using FMP API: {str(e)}, falling back to yfinance")
         
@@ -274,6 +338,7 @@ class DataLoader:
         if remaining_tickers:
             logger.info(f"Fetching ESG data for {len(remaining_tickers)} tickers using yfinance fallback")
             for i, ticker in enumerate(remaining_tickers):
+                check(cancel_token)
                 # Add small delay to avoid rate limiting
                 if i > 0:
                     time.sleep(0.1)
@@ -0,0 +1,63 @@
+import json
+import numpy as np
+import pandas as pd
+from typing import Any, Dict
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the standard library encoder
+    orjson = None
+
+
+def series_values(series: pd.Series, dates: pd.Index) -> np.ndarray:
+    """Float values of a series aligned to the shared date axis (NaN where missing)."""
+    return series.reindex(dates).to_numpy(dtype=float)
+
+
+def format_dates(dates: pd.Index) -> list:
+    """ISO dates for the shared date axis."""
+    return list(pd.DatetimeIndex(dates).strftime("%Y-%m-%d"))
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, np.ndarray):
+        values = obj.tolist()
+        if obj.dtype.kind == "f" and obj.ndim == 1:
+            # NaN is not valid JSON; missing values are encoded as null. Only the
+            # missing positions are touched in Python, not every element
+            for i in np.flatnonzero(np.isnan(obj)).tolist():
+                values[i] = None
+        elif obj.dtype.kind == "f" and np.isnan(obj).any():
+            values = np.where(np.isnan(obj), None, obj).tolist()
+        return values
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Dict[str, Any]) -> bytes:
+    """
+    Serialize a response containing NumPy arrays without per-element Python objects.
+
+    Uses orjson (NumPy arrays are encoded natively, NaN as null), which is in
+    requirements.txt; the standard library encoder is a slower fallback.
+
+    Args:
+        content: JSON-compatible dictionary, possibly containing NumPy arrays
+
+    Returns:
+        UTF-8 encoded JSON
+    """
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY, default=_default)
+    return json.dumps(content, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+def encode_event(event: Dict[str, Any], sse: bool = False) -> bytes:
+    """
+    One streaming message: a newline-delimited JSON line, or a Server-Sent Event
+    named after the event's "type" field.
+    """
+    if sse:
+        return b"event: " + event["type"].encode("utf-8") + b"\ndata: " + dumps(event) + b"\n\n"
+    return dumps(event) + b"\n"
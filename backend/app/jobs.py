@@ -0,0 +1,421 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+from .schemas import PortfolioRequest
+from .compute_pool import ComputePool, OverloadedError
+from .cancellation import CancellationToken, OperationCancelled
+from .pipeline import (load_market_data, solve_portfolio, compute_frontier, compute_metrics, merge_frontier,
+                       encode_result)
+
+logger = logging.getLogger(__name__)
+
+JOB_STAGES = ("fetch", "solve", "frontier", "metrics")
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+JOB_COLUMNS = "job_id, request, status, stages, result, error, created_at, updated_at, expires_at"
+
+
+def _timestamp(seconds: Optional[float]) -> Optional[str]:
+    if seconds is None:
+        return None
+    return datetime.fromtimestamp(seconds, tz=timezone.utc).isoformat()
+
+
+class Job:
+    """An asynchronous /optimize run and its stage-level progress."""
+
+    def __init__(self, job_id: str, request: PortfolioRequest, status: str = "queued",
+                 stages: Optional[Dict[str, str]] = None, result: Optional[bytes] = None,
+                 error: Optional[str] = None, created_at: Optional[float] = None,
+                 updated_at: Optional[float] = None, expires_at: Optional[float] = None):
+        """
+        Args:
+            job_id: Unique job identifier
+            request: Portfolio optimization parameters
+            status: "queued", "running", "succeeded", "failed" or "cancelled"
+            stages: Status of each stage in JOB_STAGES ("pending", "running", "done" or "skipped")
+            result: Serialized PortfolioResponse once the job succeeded
+            error: Error message if the job failed
+            created_at: Submission time (epoch seconds)
+            updated_at: Last status change (epoch seconds)
+            expires_at: Time after which a finished job is discarded (epoch seconds)
+        """
+        now = time.time()
+        self.job_id = job_id
+        self.request = request
+        self.status = status
+        self.stages = stages or {stage: "pending" for stage in JOB_STAGES}
+        self.result = result
+        self.error = error
+        self.created_at = created_at or now
+        self.updated_at = updated_at or now
+        self.expires_at = expires_at
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    @property
+    def progress(self) -> float:
+        """Fraction of stages completed (skipped stages count as completed)."""
+        completed = sum(1 for state in self.stages.values() if state in ("done", "skipped"))
+        return completed / len(self.stages)
+
+    def to_status(self) -> Dict[str, Any]:
+        """Job status without the result, in JobStatusResponse format."""
+        running = [stage for stage, state in self.stages.items() if state == "running"]
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "stage": running[0] if running else None,
+            "stages": dict(self.stages),
+            "progress": self.progress,
+            "error": self.error,
+            "created_at": _timestamp(self.created_at),
+            "updated_at": _timestamp(self.updated_at),
+            "expires_at": _timestamp(self.expires_at)
+        }
+
+
+class InMemoryJobStore:
+    """Jobs kept in a dictionary; lost when the process restarts."""
+
+    def __init__(self):
+        self._jobs: Dict[str, Job] = {}
+
+    def save(self, job: Job) -> None:
+        self._jobs[job.job_id] = job
+
+    def update(self, job: Job) -> bool:
+        # The manager holds the stored object itself, so a cancel is already visible on it
+        self._jobs[job.job_id] = job
+        return True
+
+    def claim(self, job_id: str, owner: str, lease_seconds: float) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        return job if job is not None and not job.finished else None
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def unfinished(self) -> List[Job]:
+        return [job for job in self._jobs.values() if not job.finished]
+
+    def purge_expired(self, now: float) -> int:
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.expires_at is not None and job.expires_at <= now]
+        for job_id in expired:
+            del self._jobs[job_id]
+        return len(expired)
+
+
+class SQLiteJobStore:
+    """
+    Jobs persisted in a local SQLite database, so queued and interrupted jobs are
+    picked up again when the server restarts.
+
+    Several server processes can share the database: a job is run by the process
+    that claims it (an owner and a lease, renewed while it runs), and updates never
+    overwrite a job another process has already finished, e.g. cancelled.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Database file (created if missing)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                request TEXT NOT NULL,
+                status TEXT NOT NULL,
+                stages TEXT NOT NULL,
+                result BLOB,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                expires_at REAL,
+                owner TEXT,
+                lease_expires_at REAL
+            )
+        """)
+        # Databases created before jobs were claimed lack the owner columns
+        columns = {row[1] for row in self._connection.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("owner", "TEXT"), ("lease_expires_at", "REAL")):
+            if column not in columns:
+                self._connection.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        self._connection.commit()
+
+    def save(self, job: Job) -> None:
+        with self._lock:
+            self._connection.execute(
+                f"INSERT OR REPLACE INTO jobs ({JOB_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job.job_id, job.request.model_dump_json(), job.status, json.dumps(job.stages), job.result,
+                 job.error, job.created_at, job.updated_at, job.expires_at)
+            )
+            self._connection.commit()
+
+    def update(self, job: Job) -> bool:
+        """
+        Write the job's state unless it is already finished in the database.
+
+        Returns:
+            False if another process (or request) finished the job first
+        """
+        with self._lock:
+            cursor = self._connection.execute(
+                "UPDATE jobs SET status = ?, stages = ?, result = ?, error = ?, updated_at = ?, expires_at = ? "
+                "WHERE job_id = ? AND status NOT IN (?, ?, ?)",
+                (job.status, json.dumps(job.stages), job.result, job.error, job.updated_at, job.expires_at,
+                 job.job_id, *FINISHED_STATUSES)
+            )
+            self._connection.commit()
+        return cursor.rowcount == 1
+
+    def claim(self, job_id: str, owner: str, lease_seconds: float) -> Optional[Job]:
+        """
+        Atomically take (or renew) the lease of an unfinished job.
+
+        Returns:
+            The job, or None if it is finished or leased by another owner
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._connection.execute(
+                "UPDATE jobs SET owner = ?, lease_expires_at = ? WHERE job_id = ? AND status NOT IN (?, ?, ?) "
+                "AND (owner IS NULL OR owner = ? OR lease_expires_at <= ?)",
+                (owner, now + lease_seconds, job_id, *FINISHED_STATUSES, owner, now)
+            )
+            self._connection.commit()
+            if cursor.rowcount != 1:
+                return None
+            row = self._connection.execute(f"SELECT {JOB_COLUMNS} FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._from_row(row) if row else None
+
+    def _from_row(self, row) -> Job:
+        job_id, request, status, stages, result, error, created_at, updated_at, expires_at = row
+        return Job(job_id, PortfolioRequest.model_validate_json(request), status, json.loads(stages),
+                   result, error, created_at, updated_at, expires_at)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._connection.execute(f"SELECT {JOB_COLUMNS} FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._from_row(row) if row else None
+
+    def unfinished(self) -> List[Job]:
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT {JOB_COLUMNS} FROM jobs WHERE status NOT IN (?, ?, ?) ORDER BY created_at", FINISHED_STATUSES
+            ).fetchall()
+        return [self._from_row(row) for row in rows]
+
+    def purge_expired(self, now: float) -> int:
+        with self._lock:
+            cursor = self._connection.execute("DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+            self._connection.commit()
+        return cursor.rowcount
+
+
+class _JobCancelled(Exception):
+    """Raised inside a job run when the job was finished elsewhere, i.e. cancelled."""
+
+
+class JobManager:
+    """
+    Runs /optimize requests in the background on a fixed number of asyncio workers.
+
+    Each job goes through the fetch, solve, frontier and metrics stages, with the
+    CPU-bound stages queued for the shared ComputePool. Every stage gets the job's
+    CancellationToken, so a cancel takes effect at the stage's next check (between
+    downloads, optimizer restarts and frontier solves), also in a worker process.
+    With a shared SQLiteJobStore, cancels made by another server process are picked
+    up by polling the store while a job runs.
+    """
+
+    def __init__(self, compute_pool: ComputePool, store=None, workers: int = 2,
+                 ttl_seconds: float = 3600.0, max_pending: int = 100,
+                 lease_seconds: float = 30.0, poll_interval: float = 1.0):
+        """
+        Initialize job manager (workers start on start() or the first submit).
+
+        Args:
+            compute_pool: Pool used for downloads and CPU-bound stages
+            store: InMemoryJobStore (default) or SQLiteJobStore
+            workers: Jobs processed concurrently
+            ttl_seconds: How long finished jobs and their results are kept
+            max_pending: Maximum queued jobs before submissions are rejected with 429
+            lease_seconds: How long a claimed job stays reserved for this process
+                without being renewed (a crashed process's jobs are resumed after it)
+            poll_interval: Seconds between lease renewals and checks for cancels
+                made by other processes while a job runs
+        """
+        self.compute_pool = compute_pool
+        self.store = store or InMemoryJobStore()
+        self.workers = workers
+        self.ttl_seconds = ttl_seconds
+        self.max_pending = max_pending
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._tokens: Dict[str, CancellationToken] = {}
+
+    @classmethod
+    def from_env(cls, compute_pool: ComputePool) -> "JobManager":
+        """
+        Build a manager from JOB_WORKERS, JOB_TTL_SECONDS, JOB_MAX_PENDING and
+        JOB_DB_PATH (SQLite store if set, in-memory otherwise) environment variables.
+        """
+        db_path = os.getenv("JOB_DB_PATH")
+        return cls(
+            compute_pool,
+            store=SQLiteJobStore(db_path) if db_path else None,
+            workers=int(os.getenv("JOB_WORKERS", "2")),
+            ttl_seconds=float(os.getenv("JOB_TTL_SECONDS", "3600")),
+            max_pending=int(os.getenv("JOB_MAX_PENDING", "100"))
+        )
+
+    def start(self) -> None:
+        """Start the workers and queue unfinished jobs (those another live process holds are skipped when claimed)."""
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue()
+        for job in self.store.unfinished():
+            self._queue.put_nowait(job.job_id)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    def submit(self, request: PortfolioRequest) -> Job:
+        """
+        Queue a request and return its job immediately.
+
+        Raises:
+            OverloadedError: If max_pending jobs are already queued (429)
+        """
+        self.start()
+        self.store.purge_expired(time.time())
+        if self._queue.qsize() >= self.max_pending:
+            raise OverloadedError("Too many queued jobs, please retry later", status_code=429, retry_after=5)
+
+        job = Job(uuid.uuid4().hex, request)
+        self.store.save(job)
+        self._queue.put_nowait(job.job_id)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Current state of a job, or None if unknown or expired."""
+        job = self.store.get(job_id)
+        if job is not None and job.expires_at is not None and job.expires_at <= time.time():
+            return None
+        return job
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a queued or running job (finished jobs are returned unchanged)."""
+        job = self.get(job_id)
+        if job is not None and not job.finished:
+            if not self._finish(job, "cancelled"):
+                # Finished in another process in the meantime
+                return self.get(job_id)
+            token = self._tokens.get(job_id)
+            if token is not None:
+                token.cancel()
+        return job
+
+    def _update(self, job: Job, **changes) -> bool:
+        """Apply and persist changes, unless the job was finished (e.g. cancelled) meanwhile."""
+        if job.finished:
+            return False
+        for name, value in changes.items():
+            setattr(job, name, value)
+        job.updated_at = time.time()
+        return self.store.update(job)
+
+    def _finish(self, job: Job, status: str, **changes) -> bool:
+        return self._update(job, status=status, expires_at=time.time() + self.ttl_seconds, **changes)
+
+    def _set_stage(self, job: Job, stage: str, state: str) -> None:
+        job.stages[stage] = state
+        if not self._update(job):
+            raise _JobCancelled
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            job = self.store.claim(job_id, self.owner, self.lease_seconds)
+            if job is None:
+                # Finished, or running in another process
+                continue
+            token = CancellationToken()
+            self._tokens[job_id] = token
+            watcher = asyncio.create_task(self._watch(job_id, token))
+            try:
+                await self._run(job, token)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job {job.job_id} failed: {str(e)}")
+                self._finish(job, "failed", error=str(e))
+            finally:
+                watcher.cancel()
+                self._tokens.pop(job_id, None)
+
+    async def _watch(self, job_id: str, token: CancellationToken) -> None:
+        """Renew the job's lease while it runs; cancel the token once it was finished elsewhere."""
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            if self.store.claim(job_id, self.owner, self.lease_seconds) is None:
+                token.cancel()
+                return
+
+    async def _stage(self, job: Job, stage: str, fn: Callable, *args: Any, token: CancellationToken,
+                     io: bool = False) -> Any:
+        self._set_stage(job, stage, "running")
+        if io:
+            output = await self.compute_pool.run_io(fn, *args, token)
+        else:
+            # Background work queues for a compute slot instead of being rejected
+            output = await self.compute_pool.run(fn, *args, wait=True, cancel_token=token)
+        self._set_stage(job, stage, "done")
+        return output
+
+    async def _run(self, job: Job, token: CancellationToken) -> None:
+        request = job.request
+        # A resumed job starts over from the first stage
+        if not self._update(job, status="running", stages={stage: "pending" for stage in JOB_STAGES}):
+            return
+        try:
+            market_data = await self._stage(job, "fetch", load_market_data, request, token=token, io=True)
+            solved = await self._stage(job, "solve", solve_portfolio, request, market_data, token=token)
+            if "frontier" in request.sections():
+                frontier = await self._stage(job, "frontier", compute_frontier, request, market_data, solved,
+                                             token=token)
+            else:
+                # Only the theoretical point, which is cheap enough to compute here
+                self._set_stage(job, "frontier", "skipped")
+                frontier = compute_frontier(request, market_data, solved)
+            result = await self._stage(job, "metrics", compute_metrics, request, market_data, solved, token=token)
+        except (_JobCancelled, OperationCancelled):
+            logger.info(f"Job {job.job_id} cancelled")
+            return
+
+        merge_frontier(result, frontier)
+        body = await self.compute_pool.run_io(encode_result, request, result)
+        if self._finish(job, "succeeded", result=body):
+            logger.info(f"Job {job.job_id} succeeded")
@@ -1,14 +1,32 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Header, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from .schemas import PortfolioRequest, PortfolioResponse, TickerSearchResponse, TickerInfo
+from .schemas import PortfolioRequest, PortfolioResponse, TickerSearchResponse, TickerInfo, BacktestRequest, BacktestResponse, JobStatusResponse, BatchPortfolioRequest, ComparisonRequest, ComparisonResponse, ResampledFrontierRequest, ResampledFrontierResponse, ScreenColumn, ScreenResponse
 from .data_loader import DataLoader
-from .optimizer import PortfolioOptimizer
-from .metrics import RiskMetrics
+from .backtest import WalkForwardBacktester
+from .pipeline import (load_market_data, compute_portfolio, encode_result, solve_portfolio, stream_frontier,
+                       load_universe_data, market_data_subset, window_moments, comparison_frontier,
+                       compute_comparison, bootstrap_resamples, aggregate_resamples)
+from .optimizer import solve_resampled_frontiers
+from .compute_pool import ComputePool, OverloadedError
+from .cancellation import CancellationToken, OperationCancelled
+from .result_cache import ResultCache, request_key, last_market_close
+from .jobs import JobManager
+from .ticker_index import TickerIndex
+from .presets import PresetRefresher
+from .screener import UniverseScreener
+from .encoding import dumps, encode_event
+from .compression import CompressionMiddleware
+from .profiling import profiling_allowed, profile_call
+from . import telemetry
+from contextlib import asynccontextmanager
+from typing import Literal, Optional
+import asyncio
 import logging
+import time
 import json
+import math
 import os
-import numpy as np
-import pandas as pd
 from pathlib import Path
 
 # Configure logging
@@ -24,6 +42,9 @@ if TICKER_DB_PATH.exists():
 else:
     logger.warning(f"Ticker database not found at {TICKER_DB_PATH}")
 
+# Search index over the ticker database, built once
+TICKER_INDEX = TickerIndex(TICKER_DB)
+
 # Load portfolio presets
 PORTFOLIO_PRESETS_PATH = Path(__file__).parent.parent / "data" / "portfolio_presets.json"
 PORTFOLIO_PRESETS = []
@@ -33,11 +54,52 @@ if PORTFOLIO_PRESETS_PATH.exists():
 else:
     logger.warning(f"Portfolio presets not found at {PORTFOLIO_PRESETS_PATH}")
 
+# Worker processes for optimizations and threads for blocking downloads
+# (configured via COMPUTE_WORKERS, COMPUTE_QUEUE_SIZE, COMPUTE_QUEUE_TIMEOUT, IO_THREADS)
+compute_pool = ComputePool.from_env()
+
+# Serialized /optimize responses keyed by canonical request and data as-of date
+result_cache = ResultCache(max_entries=int(os.getenv("RESULT_CACHE_SIZE", "256")))
+
+# Background optimization jobs (JOB_WORKERS, JOB_TTL_SECONDS, JOB_MAX_PENDING, JOB_DB_PATH)
+job_manager = JobManager.from_env(compute_pool)
+
+# How often in-flight /optimize requests check whether their client is still connected
+DISCONNECT_POLL_SECONDS = float(os.getenv("DISCONNECT_POLL_SECONDS", "0.1"))
+
+# Presets are re-optimized after every market close and served from their own cache
+# (PRESET_REFRESH=0 disables, PRESET_REFRESH_CONCURRENCY bounds parallel refreshes)
+preset_refresher = PresetRefresher(
+    PORTFOLIO_PRESETS, compute_pool,
+    max_concurrency=int(os.getenv("PRESET_REFRESH_CONCURRENCY", "1"))
+)
+
+# The ticker database is screened after every market close (SCREEN_REFRESH=0 disables,
+# SCREEN_LOOKBACK_DAYS sets the window)
+screener = UniverseScreener(TICKER_DB, compute_pool, lookback_days=int(os.getenv("SCREEN_LOOKBACK_DAYS", "252")))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Resumes jobs left unfinished in the SQLite store by a previous process
+    job_manager.start()
+    if os.getenv("PRESET_REFRESH", "1") != "0":
+        preset_refresher.start()
+    if os.getenv("SCREEN_REFRESH", "1") != "0":
+        screener.start()
+    yield
+    await screener.stop()
+    await preset_refresher.stop()
+    await job_manager.stop()
+    compute_pool.shutdown()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="Portfolio Optimization API",
     description="API for optimizing investment portfolios using various risk metrics",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -47,8 +109,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+# Compress responses with Brotli or gzip, as the client's Accept-Encoding allows (time series payloads are large)
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+# Latency of every request by route template and status code
+app.add_middleware(telemetry.RequestLatencyMiddleware)
+
 
 @app.get("/")
 async def root():
@@ -60,238 +129,547 @@ async def root():
     }
 
 
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches the ETag (weak comparison)."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in [tag[2:] if tag.startswith("W/") else tag for tag in candidates]
+
+
+async def _profiled_optimization(request: PortfolioRequest) -> Response:
+    """Run /optimize under the profiler in a worker, bypassing the result cache."""
+    started = time.perf_counter()
+    market_data = await compute_pool.run_io(load_market_data, request)
+    fetch_seconds = time.perf_counter() - started
+    
+    result, report = await compute_pool.run(profile_call, compute_portfolio, request, market_data)
+    report["stages"] = {"fetch": round(fetch_seconds, 6), **report["stages"]}
+    result["profile"] = report
+    logger.info(f"Profiled optimization in {report['total_seconds']:.3f}s (artifact: {report['artifact']})")
+    
+    body = encode_result(request, result)
+    return Response(content=body, media_type="application/json", headers={"Cache-Control": "no-store"})
+
+
+async def _cancel_on_disconnect(raw_request: Request, token: CancellationToken) -> None:
+    """Cancel token once the client of raw_request disconnects."""
+    while not await raw_request.is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL_SECONDS)
+    logger.info(f"Client disconnected from {raw_request.url.path}, cancelling its work")
+    token.cancel()
+
+
+@asynccontextmanager
+async def _disconnect_token(raw_request: Request):
+    """Cancellation token that is cancelled if the client disconnects within the block."""
+    token = CancellationToken()
+    watcher = asyncio.create_task(_cancel_on_disconnect(raw_request, token))
+    try:
+        yield token
+    finally:
+        watcher.cancel()
+
+
 @app.post("/optimize", response_model=PortfolioResponse)
-async def optimize_portfolio(request: PortfolioRequest):
+async def optimize_portfolio(request: PortfolioRequest, raw_request: Request, if_none_match: Optional[str] = Header(None),
+                             profile: bool = Query(False, description="Attach a profiler report (admin only)"),
+                             x_admin_token: Optional[str] = Header(None)):
     """
     Optimize portfolio allocation based on specified objective and constraints.
     
+    Responses are cached until the next market close and carry an ETag that hashes
+    the body; clients revalidating with If-None-Match against a cached response get
+    a 304 without any recomputation. If the
+    client disconnects, the downloads, restarts and frontier solves still pending
+    are skipped and the worker is freed.
+    
     Args:
         request: Portfolio optimization parameters
+        raw_request: The HTTP request, watched for client disconnects
+        if_none_match: ETag of a previously received response
+        profile: Run under cProfile and attach the hot-function table and stage times
+            (requires PROFILING_ENABLED=1 or a valid X-Admin-Token)
+        x_admin_token: Admin token for profiling
         
     Returns:
         Optimized portfolio weights and performance metrics
     """
+    if profile and not profiling_allowed(x_admin_token):
+        raise HTTPException(status_code=403, detail="Profiling requires PROFILING_ENABLED=1 or a valid X-Admin-Token")
+    
     try:
+        if profile:
+            return await _profiled_optimization(request)
+        
+        # The key covers the canonical request and the last close included in the data
+        as_of = last_market_close().date()
+        cache_key = request_key(request, as_of)
+        cached = result_cache.lookup(cache_key) or preset_refresher.cache.lookup(cache_key)
+        if cached is not None:
+            body, etag = cached
+            headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+            if _etag_matches(if_none_match, etag):
+                return Response(status_code=304, headers=headers)
+            logger.info(f"Serving cached optimization for tickers: {request.tickers}")
+            return Response(content=body, media_type="application/json", headers=headers)
+        
         logger.info(f"Optimizing portfolio for tickers: {request.tickers}")
         
-        # Load historical data
-        data_loader = DataLoader(lookback_days=request.lookback_days)
-        prices = data_loader.fetch_prices(request.tickers)
-        returns = data_loader.compute_returns(prices)
+        # Blocking downloads run in the I/O thread pool and the optimization in a
+        # worker process, so the event loop keeps serving other requests
+        async with _disconnect_token(raw_request) as token:
+            market_data = await compute_pool.run_io(load_market_data, request, token)
+            # Includes the wait for a worker and transfer to and from the worker process
+            with telemetry.span("compute"):
+                result = await compute_pool.run(compute_portfolio, request, market_data, cancel_token=token)
         
-        logger.info(f"Loaded {len(prices)} days of data for {len(request.tickers)} tickers")
+        body = encode_result(request, result)
+        if result.get("partial"):
+            # Cut short by time_budget_ms: another attempt may do better, so neither cache nor revalidate it
+            return Response(content=body, media_type="application/json", headers={"Cache-Control": "no-store"})
+        if not market_data.cacheable_as_of(request, as_of):
+            # Stale prices or a failed ESG/benchmark fetch: serve it, but do not pin it under the key until the next close
+            logger.info(f"Not caching optimization for tickers {request.tickers}: data incomplete as of {as_of}")
+            return Response(content=body, media_type="application/json", headers={"Cache-Control": "no-store"})
+        headers = {"ETag": result_cache.put(cache_key, body), "Cache-Control": "private, no-cache"}
+        # The client may already hold this exact body, e.g. from before a restart
+        if _etag_matches(if_none_match, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
         
-        # Fetch ESG scores if ESG weight > 0
-        esg_scores = None
-        esg_weight = request.esg_weight or 0.0
-        if esg_weight > 0:
-            logger.info(f"Fetching ESG scores for {len(request.tickers)} tickers (ESG weight: {esg_weight})")
-            try:
-                esg_scores = DataLoader.fetch_esg_scores(request.tickers)
-                logger.info(f"Successfully fetched ESG scores for {len(esg_scores)} tickers")
-            except Exception as e:
-                logger.warning(f"Failed to fetch ESG scores: {str(e)}. Continuing without ESG optimization.")
-                esg_scores = None
-                esg_weight = 0.0
+    except OperationCancelled:
+        logger.info(f"Optimization cancelled for tickers: {request.tickers}")
+        # Nobody is left to read it; 499 (client closed request) keeps it apart in the latency metrics
+        return Response(status_code=499)
+    except OverloadedError as e:
+        logger.warning(f"Rejecting request: {str(e)}")
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Optimization failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Optimization failed: {str(e)}")
+
+
+@app.post("/optimize/compare", response_model=ComparisonResponse)
+async def compare_objectives(request: ComparisonRequest):
+    """
+    Optimize the same portfolio under several objectives.
+    
+    Data is loaded and the moments are estimated once; the objectives are solved in
+    parallel on the worker pool, then the single efficient frontier and the
+    per-objective metrics table are computed concurrently. Price history and the
+    benchmark are returned once for all objectives.
+    
+    Args:
+        request: Portfolio parameters and the objectives to compare
         
-        # Use only the requested lookback period for optimization
-        # But keep all data for rolling metrics and price history
-        returns_for_optimization = returns.tail(request.lookback_days)
+    Returns:
+        Weights and metrics by objective with the shared time series and frontier
+    """
+    try:
+        logger.info(f"Comparing objectives {request.objectives} for tickers: {request.tickers}")
+        market_data = await compute_pool.run_io(load_market_data, request)
+        moments = await compute_pool.run(window_moments, request, market_data)
         
-        # Optimize portfolio
-        optimizer = PortfolioOptimizer(
-            returns=returns_for_optimization,
-            objective=request.objective,
-            portfolio_type=request.portfolio_type,
-            esg_scores=esg_scores,
-            esg_weight=esg_weight
-        )
-        optimal_weights, metrics = optimizer.optimize()
+        # The comparison was admitted above; its remaining stages queue for workers
+        solved = await asyncio.gather(*[
+            compute_pool.run(solve_portfolio, request.objective_request(objective), market_data, moments, wait=True)
+            for objective in request.objectives
+        ])
+        solved = dict(zip(request.objectives, solved))
         
-        # Convert weights array to dictionary
-        weights_dict = {ticker: float(weight) for ticker, weight in zip(request.tickers, optimal_weights)}
+        stages = [compute_pool.run(compute_comparison, request, market_data, solved, wait=True)]
+        if "frontier" in request.sections():
+            stages.append(compute_pool.run(comparison_frontier, request, market_data, solved, wait=True))
+        result, *frontier = await asyncio.gather(*stages)
+        if frontier:
+            result["efficient_frontier"] = frontier[0]
         
-        # Calculate portfolio returns for additional metrics using all available data
-        # This ensures rolling metrics have enough historical data
-        portfolio_returns = (returns * optimal_weights).sum(axis=1)
-        expected_return = float(portfolio_returns.mean() * 252)
-        volatility = RiskMetrics.calculate_volatility(portfolio_returns)
-        sharpe_ratio = RiskMetrics.calculate_sharpe_ratio(portfolio_returns)
-        max_drawdown = RiskMetrics.calculate_max_drawdown(portfolio_returns)
+        body = await compute_pool.run_io(encode_result, request, result, ComparisonResponse)
+        return Response(content=body, media_type="application/json")
         
-        # Calculate Sortino ratio
-        downside_returns = portfolio_returns[portfolio_returns < 0]
-        sortino_ratio = None
-        if len(downside_returns) > 0:
-            downside_std = downside_returns.std() * (252 ** 0.5)
-            if downside_std > 0:
-                sortino_ratio = float((expected_return - 0.02) / downside_std)
+    except OverloadedError as e:
+        logger.warning(f"Rejecting request: {str(e)}")
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Comparison failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Comparison failed: {str(e)}")
+
+
+@app.post("/optimize/resampled", response_model=ResampledFrontierResponse)
+async def resampled_frontier(request: ResampledFrontierRequest):
+    """
+    Resampled (Michaud) efficient frontier.
+    
+    The moment sets of n_resamples bootstrap resamples of the returns window are drawn
+    from row counts, their frontiers are solved in chunks spread over the worker pool,
+    and the weights are averaged per return rank. Every stage is admitted like any
+    other compute task, so a full queue rejects the request with a 429.
+    
+    Args:
+        request: Portfolio parameters plus the number of resamples, ranks and the seed
         
-        # Calculate Calmar ratio
-        calmar_ratio = None
-        if max_drawdown < 0:
-            calmar_ratio = float(expected_return / abs(max_drawdown))
+    Returns:
+        Averaged frontier with its weights and spread, the sample frontier, and wall time
+    """
+    try:
+        logger.info(f"Resampling the frontier {request.n_resamples} times for tickers: {request.tickers}")
+        market_data = await compute_pool.run_io(load_market_data, request)
+        started = time.perf_counter()
+        means, covariances = await compute_pool.run(bootstrap_resamples, request, market_data)
         
-        # Get total leverage from metrics if available
-        total_leverage = metrics.get("total_leverage", None)
+        # One chunk per worker, each admitted on its own; all chunks finish before an error is raised
+        chunk_size = math.ceil(request.n_resamples / compute_pool.concurrency)
+        chunks = await asyncio.gather(*[
+            compute_pool.run(solve_resampled_frontiers, market_data.returns.columns.tolist(),
+                             means[start:start + chunk_size], covariances[start:start + chunk_size],
+                             request.portfolio_type, request.num_points)
+            for start in range(0, request.n_resamples, chunk_size)
+        ], return_exceptions=True)
+        for chunk in chunks:
+            if isinstance(chunk, BaseException):
+                raise chunk
+        wall_time = time.perf_counter() - started
         
-        # Prepare price history data
-        price_history = {}
-        for ticker in request.tickers:
-            if ticker in prices.columns:
-                price_history[ticker] = [
-                    {"date": str(date), "price": float(price)}
-                    for date, price in prices[ticker].items()
-                ]
+        result = await compute_pool.run(aggregate_resamples, request, market_data, chunks, wall_time)
+        return ResampledFrontierResponse(**result)
         
-        # Fetch SPY benchmark data for comparison
-        benchmark_data = None
-        try:
-            logger.info("Fetching SPY benchmark data")
-            benchmark_prices = data_loader.fetch_prices(["SPY"])
-            if "SPY" in benchmark_prices.columns:
-                benchmark_returns = data_loader.compute_returns(benchmark_prices)
-                benchmark_cumulative = (1 + benchmark_returns["SPY"]).cumprod()
-                benchmark_data = [
-                    {"date": str(date), "value": float(value)}
-                    for date, value in benchmark_cumulative.items()
-                ]
-                logger.info(f"Successfully fetched {len(benchmark_data)} days of SPY benchmark data")
-        except Exception as e:
-            logger.warning(f"Failed to fetch SPY benchmark data: {str(e)}. Continuing without benchmark.")
-            benchmark_data = None
+    except OverloadedError as e:
+        logger.warning(f"Rejecting request: {str(e)}")
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Resampled frontier failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Resampled frontier failed: {str(e)}")
+
+
+def _moments_key(request: PortfolioRequest):
+    """Requests with the same key share one universe covariance in a batch."""
+    covariance_model = request.covariance_model or "sample"
+    return (request.lookback_days, request.frequency or "daily", covariance_model,
+            request.n_factors if covariance_model == "pca" else None)
+
+
+async def _batch_item(index: int, request: PortfolioRequest, universe, universe_moments) -> bytes:
+    """Optimize one portfolio of a batch and return its NDJSON line."""
+    try:
+        as_of = last_market_close().date()
+        cache_key = request_key(request, as_of)
+        body = result_cache.get(cache_key) or preset_refresher.cache.get(cache_key)
+        if body is None:
+            market_data = market_data_subset(universe, request)
+            moments = universe_moments[_moments_key(request)].subset(list(market_data.returns.columns))
+            # The batch was admitted as a whole; its portfolios queue for workers instead of being rejected
+            result = await compute_pool.run(compute_portfolio, request, market_data, moments, wait=True)
+            body = await compute_pool.run_io(encode_result, request, result)
+            if not result.get("partial") and market_data.cacheable_as_of(request, as_of):
+                result_cache.put(cache_key, body)
+        return b'{"index":%d,"status_code":200,"result":' % index + body + b"}\n"
+    except ValueError as e:
+        return encode_event({"index": index, "status_code": 400, "detail": str(e)})
+    except Exception as e:
+        logger.error(f"Batch portfolio {index} failed: {str(e)}")
+        return encode_event({"index": index, "status_code": 500, "detail": f"Optimization failed: {str(e)}"})
+
+
+async def _batch_results(batch: BatchPortfolioRequest, universe, universe_moments):
+    """Solve all portfolios concurrently and stream the results in request order."""
+    tasks = [
+        asyncio.ensure_future(_batch_item(index, request, universe, universe_moments))
+        for index, request in enumerate(batch.portfolios)
+    ]
+    try:
+        for task in tasks:
+            yield await task
+    finally:
+        # Client disconnected: drop portfolios that have not started yet
+        for task in tasks:
+            task.cancel()
+
+
+@app.post("/optimize/batch")
+async def optimize_batch(batch: BatchPortfolioRequest):
+    """
+    Optimize many portfolios with one data fetch.
+    
+    The union of all tickers is downloaded once and one covariance per distinct
+    lookback/covariance model is computed for the whole universe; each portfolio
+    slices its moments from it. Portfolios are solved in parallel on the worker
+    pool and streamed back in request order as NDJSON lines of the form
+    {"index", "status_code", "result"} or {"index", "status_code", "detail"}.
+    
+    Args:
+        batch: Portfolio optimization requests
         
-        # Calculate portfolio cumulative returns
-        portfolio_cumulative = (1 + portfolio_returns).cumprod()
-        portfolio_returns_data = [
-            {"date": str(date), "value": float(value)}
-            for date, value in portfolio_cumulative.items()
-        ]
+    Returns:
+        Streaming NDJSON response, one line per portfolio
+    """
+    try:
+        logger.info(f"Optimizing batch of {len(batch.portfolios)} portfolios")
+        universe = await compute_pool.run_io(load_universe_data, batch.portfolios)
         
+        representatives = {_moments_key(request): request for request in batch.portfolios}
+        moments = await asyncio.gather(*[
+            compute_pool.run(window_moments, request, universe)
+            for request in representatives.values()
+        ])
+        universe_moments = dict(zip(representatives, moments))
+    except OverloadedError as e:
+        logger.warning(f"Rejecting request: {str(e)}")
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Batch optimization failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Batch optimization failed: {str(e)}")
+    
+    return StreamingResponse(_batch_results(batch, universe, universe_moments), media_type="application/x-ndjson")
+
+
+async def _frontier_events(request: PortfolioRequest, market_data, solved, sse: bool):
+    """
+    Stream frontier points as a worker process solves them, then the final curve.
+    
+    Points come back over a queue shared with the worker. Closing the stream (client
+    disconnect) cancels the remaining frontier solves, and the frontier keeps its
+    compute slot until the worker has stopped.
+    """
+    yield encode_event({
+        "type": "portfolio",
+        "weights": {ticker: float(w) for ticker, w in zip(solved.moments.tickers, solved.weights)},
+        "expected_return_theoretical": solved.moments.portfolio_return(solved.weights),
+        "volatility_theoretical": solved.moments.portfolio_volatility(solved.weights)
+    }, sse)
+    
+    token = CancellationToken()
+    points = compute_pool.message_queue()
+    frontier = asyncio.ensure_future(
+        compute_pool.run(stream_frontier, request, market_data, solved, points, cancel_token=token)
+    )
+    # No points follow the end of the frontier (including a failed or rejected one); wake the reader
+    frontier.add_done_callback(lambda _: compute_pool.io_executor.submit(points.put, None))
+    try:
+        while True:
+            point = await compute_pool.run_io(points.get)
+            if point is None:
+                break
+            yield encode_event({"type": "point", **point}, sse)
+        result = await frontier
+        yield encode_event({"type": "frontier", "points": result["efficient_frontier"]}, sse)
+    except OverloadedError as e:
+        yield encode_event({"type": "error", "status_code": e.status_code, "detail": str(e),
+                            "retry_after": e.retry_after}, sse)
+    except Exception as e:
+        logger.error(f"Frontier stream failed: {str(e)}")
+        yield encode_event({"type": "error", "status_code": 500, "detail": f"Frontier failed: {str(e)}"}, sse)
+    finally:
+        token.cancel()
+        # The worker stops at its next check; the frontier task holds the slot until then
+        await asyncio.gather(frontier, return_exceptions=True)
+
+
+@app.post("/optimize/frontier/stream")
+async def stream_efficient_frontier(request: PortfolioRequest, accept: Optional[str] = Header(None)):
+    """
+    Stream the efficient frontier while it is being solved.
+    
+    Emits a "portfolio" message with the optimal weights and theoretical point, one
+    "point" message per solved frontier point and a final "frontier" message with the
+    sorted, filtered curve. The format is NDJSON, or Server-Sent Events when the client
+    sends Accept: text/event-stream. Disconnecting cancels the remaining solves.
+    
+    Args:
+        request: Portfolio optimization parameters
+        accept: Accept header (selects SSE or NDJSON)
         
-        # Calculate theoretical expected return and volatility using same method as efficient frontier
-        # This ensures the current portfolio point appears on the frontier line
-        mean_returns = returns_for_optimization.mean() * 252
-        cov_matrix = returns_for_optimization.cov() * 252
-        expected_return_theoretical = float(np.dot(optimal_weights, mean_returns))
-        volatility_theoretical = float(np.sqrt(np.dot(optimal_weights.T, np.dot(cov_matrix, optimal_weights))))
+    Returns:
+        Streaming response of frontier messages
+    """
+    sse = "text/event-stream" in (accept or "")
+    try:
+        logger.info(f"Streaming efficient frontier for tickers: {request.tickers}")
+        frontier_request = request.model_copy(update={"include": ["frontier"], "exclude": None})
+        market_data = await compute_pool.run_io(load_market_data, frontier_request)
+        solved = await compute_pool.run(solve_portfolio, frontier_request, market_data)
+    except OverloadedError as e:
+        logger.warning(f"Rejecting request: {str(e)}")
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Optimization failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Optimization failed: {str(e)}")
+    
+    return StreamingResponse(
+        _frontier_events(frontier_request, market_data, solved, sse),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/jobs/optimize", response_model=JobStatusResponse, status_code=202)
+async def submit_optimization_job(request: PortfolioRequest):
+    """
+    Queue an optimization and return its job id immediately.
+    
+    Args:
+        request: Portfolio optimization parameters
         
-        # Calculate efficient frontier with extended range beyond current portfolio
-        # Pass both current return and risk to extend frontier beyond the portfolio point
-        # Increase num_points to ensure smooth curve extends well beyond current point
-        efficient_frontier = optimizer.calculate_efficient_frontier(
-            num_points=150,  # Increased from 120 to ensure better coverage
-            extend_beyond_return=expected_return_theoretical,
-            extend_beyond_risk=volatility_theoretical
-        )
+    Returns:
+        Initial job status; poll GET /jobs/{job_id} for progress and the result
+    """
+    try:
+        job = job_manager.submit(request)
+    except OverloadedError as e:
+        logger.warning(f"Rejecting job: {str(e)}")
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    
+    logger.info(f"Queued optimization job {job.job_id} for tickers: {request.tickers}")
+    return JSONResponse(status_code=202, content=job.to_status(), headers={"Location": f"/jobs/{job.job_id}"})
+
+
+@app.get("/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_job(job_id: str):
+    """
+    Get job status, stage-level progress and, once it succeeded, the result.
+    
+    Args:
+        job_id: Job identifier returned by POST /jobs/optimize
         
-        # Calculate risk decomposition
-        risk_decomposition = RiskMetrics.calculate_risk_decomposition(returns, optimal_weights)
+    Returns:
+        Job status with the optimization result when available
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found or expired")
+    
+    status = dumps(job.to_status())
+    if job.result is None:
+        return Response(content=status, media_type="application/json")
+    
+    # The result is stored serialized; splice it in instead of decoding and re-encoding it
+    return Response(content=status[:-1] + b',"result":' + job.result + b"}", media_type="application/json")
+
+
+@app.delete("/jobs/{job_id}", response_model=JobStatusResponse)
+async def cancel_job(job_id: str):
+    """
+    Cancel a queued or running job.
+    
+    Args:
+        job_id: Job identifier returned by POST /jobs/optimize
         
-        # Calculate rolling metrics on all available data
-        # The data loader already fetches extra buffer days (90+ days) before the lookback period
-        rolling_sharpe_30 = RiskMetrics.calculate_rolling_sharpe_ratio(portfolio_returns, window=30)
-        rolling_sharpe_60 = RiskMetrics.calculate_rolling_sharpe_ratio(portfolio_returns, window=60)
-        rolling_sharpe_90 = RiskMetrics.calculate_rolling_sharpe_ratio(portfolio_returns, window=90)
-        rolling_vol_30 = RiskMetrics.calculate_rolling_volatility(portfolio_returns, window=30)
-        rolling_vol_60 = RiskMetrics.calculate_rolling_volatility(portfolio_returns, window=60)
-        rolling_vol_90 = RiskMetrics.calculate_rolling_volatility(portfolio_returns, window=90)
+    Returns:
+        Job status after cancellation
+    """
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found or expired")
+    
+    logger.info(f"Job {job_id} is {job.status}")
+    return job.to_status()
+
+
+def _load_backtest_data(request: BacktestRequest):
+    """Fetch returns (and ESG scores if requested) for a backtest (blocking I/O)."""
+    # Load enough history for the first training window plus the out-of-sample period
+    total_days = request.lookback_days + request.backtest_days
+    data_loader = DataLoader(lookback_days=total_days)
+    prices = data_loader.fetch_prices(request.tickers)
+    returns = data_loader.compute_returns(prices).tail(total_days)
+    
+    esg_scores = None
+    esg_weight = request.esg_weight or 0.0
+    if esg_weight > 0:
+        try:
+            esg_scores = DataLoader.fetch_esg_scores(list(returns.columns))
+        except Exception as e:
+            logger.warning(f"Failed to fetch ESG scores: {str(e)}. Continuing without ESG optimization.")
+            esg_scores = None
+            esg_weight = 0.0
+    
+    return returns, esg_scores, esg_weight
+
+
+@app.post("/backtest", response_model=BacktestResponse)
+async def backtest_portfolio(request: BacktestRequest):
+    """
+    Walk-forward backtest: re-optimize every rebalance_days on a trailing
+    lookback_days window and apply the weights out of sample.
+    
+    Args:
+        request: Backtest parameters
         
-        # Only return data from the lookback period onwards
-        # This ensures the first returned value already has the full rolling window history
-        # (e.g., 90-day rolling metric on day 1 of lookback already has 90 days of history)
-        lookback_start_index = len(portfolio_returns) - request.lookback_days
-        rolling_sharpe_30_lookback = rolling_sharpe_30.iloc[lookback_start_index:]
-        rolling_sharpe_60_lookback = rolling_sharpe_60.iloc[lookback_start_index:]
-        rolling_sharpe_90_lookback = rolling_sharpe_90.iloc[lookback_start_index:]
-        rolling_vol_30_lookback = rolling_vol_30.iloc[lookback_start_index:]
-        rolling_vol_60_lookback = rolling_vol_60.iloc[lookback_start_index:]
-        rolling_vol_90_lookback = rolling_vol_90.iloc[lookback_start_index:]
+    Returns:
+        Out-of-sample performance, turnover and rebalance history
+    """
+    try:
+        logger.info(f"Backtesting portfolio for tickers: {request.tickers}")
         
-        # Filter out NaN values and convert to response format
-        rolling_metrics_data = {
-            "sharpe_30": [
-                {"date": str(date), "value": float(value)}
-                for date, value in rolling_sharpe_30_lookback.items()
-                if pd.notna(value) and not np.isnan(value)
-            ],
-            "sharpe_60": [
-                {"date": str(date), "value": float(value)}
-                for date, value in rolling_sharpe_60_lookback.items()
-                if pd.notna(value) and not np.isnan(value)
-            ],
-            "sharpe_90": [
-                {"date": str(date), "value": float(value)}
-                for date, value in rolling_sharpe_90_lookback.items()
-                if pd.notna(value) and not np.isnan(value)
-            ],
-            "volatility_30": [
-                {"date": str(date), "value": float(value)}
-                for date, value in rolling_vol_30_lookback.items()
-                if pd.notna(value) and not np.isnan(value)
-            ],
-            "volatility_60": [
-                {"date": str(date), "value": float(value)}
-                for date, value in rolling_vol_60_lookback.items()
-                if pd.notna(value) and not np.isnan(value)
-            ],
-            "volatility_90": [
-                {"date": str(date), "value": float(value)}
-                for date, value in rolling_vol_90_lookback.items()
-                if pd.notna(value) and not np.isnan(value)
-            ],
-        }
+        returns, esg_scores, esg_weight = await compute_pool.run_io(_load_backtest_data, request)
+        
+        backtester = WalkForwardBacktester(
+            returns=returns,
+            objective=request.objective,
+            portfolio_type=request.portfolio_type,
+            window=request.lookback_days,
+            rebalance_every=request.rebalance_days,
+            esg_scores=esg_scores,
+            esg_weight=esg_weight,
+            max_workers=compute_pool.concurrency
+        )
+        # Each rebalance block is admitted on its own, so admission counts every worker
+        # the backtest occupies; all blocks finish before an error is raised
+        blocks = await asyncio.gather(
+            *(compute_pool.run(fn, *args) for fn, args in backtester.block_tasks()),
+            return_exceptions=True
+        )
+        for block in blocks:
+            if isinstance(block, BaseException):
+                raise block
+        result = await compute_pool.run_io(backtester.run, [solve for block in blocks for solve in block])
         
-        # Calculate portfolio ESG score (weighted average)
-        portfolio_esg_score = None
-        ticker_esg_scores_dict = None
-        if esg_scores:
-            # Calculate weighted average ESG score
-            portfolio_esg = 0.0
-            total_weight = 0.0
-            ticker_esg_scores_dict = {}
-            
-            for ticker in request.tickers:
-                if ticker in esg_scores:
-                    ticker_esg_scores_dict[ticker] = float(esg_scores[ticker])
-                    weight = weights_dict.get(ticker, 0.0)
-                    portfolio_esg += abs(weight) * esg_scores[ticker]  # Use absolute weight
-                    total_weight += abs(weight)
-            
-            if total_weight > 0:
-                portfolio_esg_score = float(portfolio_esg / total_weight)
+        portfolio_cumulative = (1 + result["portfolio_returns"]).cumprod()
         
-        response = PortfolioResponse(
-            weights=weights_dict,
-            expected_return=expected_return,
-            volatility=volatility,
-            sharpe_ratio=sharpe_ratio,
-            sortino_ratio=sortino_ratio,
-            calmar_ratio=calmar_ratio,
-            max_drawdown=max_drawdown,
-            total_leverage=total_leverage,
-            price_history=price_history,
-            portfolio_returns=portfolio_returns_data,
-            benchmark_returns=benchmark_data,
-            efficient_frontier=efficient_frontier,
-            rolling_metrics=rolling_metrics_data,
-            risk_decomposition=risk_decomposition,
-            esg_weight=float(esg_weight) if esg_weight > 0 else None,
-            portfolio_esg_score=portfolio_esg_score,
-            ticker_esg_scores=ticker_esg_scores_dict,
-            expected_return_theoretical=expected_return_theoretical,
-            volatility_theoretical=volatility_theoretical
+        response = BacktestResponse(
+            expected_return=result["expected_return"],
+            volatility=result["volatility"],
+            sharpe_ratio=result["sharpe_ratio"],
+            max_drawdown=result["max_drawdown"],
+            total_turnover=result["total_turnover"],
+            average_turnover=result["average_turnover"],
+            portfolio_returns=[
+                {"date": str(date), "value": float(value)}
+                for date, value in portfolio_cumulative.items()
+            ],
+            rebalances=[
+                {"date": str(r["date"]), "weights": r["weights"], "turnover": r["turnover"]}
+                for r in result["rebalances"]
+            ]
         )
         
-        logger.info(f"Optimization successful. Sharpe ratio: {sharpe_ratio:.2f}")
+        logger.info(f"Backtest complete: {len(result['rebalances'])} rebalances, out-of-sample Sharpe {result['sharpe_ratio']:.2f}")
         return response
         
+    except OverloadedError as e:
+        logger.warning(f"Rejecting request: {str(e)}")
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
     except ValueError as e:
         logger.error(f"Validation error: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        logger.error(f"Optimization failed: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Optimization failed: {str(e)}")
+        logger.error(f"Backtest failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Backtest failed: {str(e)}")
 
 
 @app.get("/search/tickers", response_model=TickerSearchResponse)
@@ -305,42 +683,62 @@ async def search_tickers(q: str = Query(..., min_length=1, description="Search q
     Returns:
         List of matching tickers with company names
     """
-    if not TICKER_DB:
-        return TickerSearchResponse(results=[])
+    # Trie / n-gram index lookup with the same ranking as a linear scan, cached per query
+    ticker_results = [TickerInfo(**match) for match in TICKER_INDEX.search(q)]
+    
+    return TickerSearchResponse(results=ticker_results)
+
+
+@app.get("/screen", response_model=ScreenResponse)
+async def screen_tickers(
+    sort_by: ScreenColumn = Query("sharpe_ratio", description="Statistic to sort by (undefined values last)"),
+    order: Literal["asc", "desc"] = Query("desc", description="Sort order"),
+    offset: int = Query(0, ge=0, description="Matching tickers to skip"),
+    limit: int = Query(50, ge=1, le=500, description="Maximum tickers to return"),
+    min_annual_return: Optional[float] = Query(None, description="Minimum annualized return"),
+    max_annual_return: Optional[float] = Query(None, description="Maximum annualized return"),
+    min_volatility: Optional[float] = Query(None, description="Minimum annualized volatility"),
+    max_volatility: Optional[float] = Query(None, description="Maximum annualized volatility"),
+    min_sharpe_ratio: Optional[float] = Query(None, description="Minimum Sharpe ratio"),
+    max_sharpe_ratio: Optional[float] = Query(None, description="Maximum Sharpe ratio"),
+    min_max_drawdown: Optional[float] = Query(None, description="Minimum max drawdown (e.g. -0.3 excludes deeper drawdowns)"),
+    max_max_drawdown: Optional[float] = Query(None, description="Maximum max drawdown"),
+    min_beta: Optional[float] = Query(None, description="Minimum beta to SPY"),
+    max_beta: Optional[float] = Query(None, description="Maximum beta to SPY"),
+    min_avg_correlation: Optional[float] = Query(None, description="Minimum average correlation with the rest of the universe"),
+    max_avg_correlation: Optional[float] = Query(None, description="Maximum average correlation with the rest of the universe")
+):
+    """
+    Screen the ticker database by return, risk and correlation statistics.
     
-    query = q.upper().strip()
-    results = []
+    Statistics are precomputed after each market close; a request only filters,
+    sorts and pages the precomputed table.
     
-    for ticker_info in TICKER_DB:
-        symbol = ticker_info.get("symbol", "").upper()
-        name = ticker_info.get("name", "").upper()
+    Args:
+        sort_by: Statistic to sort by
+        order: "asc" or "desc"
+        offset: Matching tickers to skip
+        limit: Maximum tickers to return
+        min_*, max_*: Bounds per statistic; a bound never matches an undefined value
         
-        # Match if query is in symbol or name
-        if query in symbol or query in name:
-            # Prioritize exact symbol matches
-            score = 0
-            if symbol == query:
-                score = 100
-            elif symbol.startswith(query):
-                score = 50
-            elif query in symbol:
-                score = 30
-            elif query in name:
-                score = 20
-            
-            results.append({
-                "symbol": ticker_info["symbol"],
-                "name": ticker_info["name"],
-                "_score": score
-            })
-    
-    # Sort by score (exact matches first), then by symbol
-    results.sort(key=lambda x: (-x["_score"], x["symbol"]))
-    
-    # Remove score before returning
-    ticker_results = [TickerInfo(symbol=r["symbol"], name=r["name"]) for r in results[:20]]
+    Returns:
+        Total number of matching tickers and the requested page
+    """
+    table = screener.table
+    if table is None:
+        raise HTTPException(status_code=503, detail="The screen is still being computed", headers={"Retry-After": "30"})
     
-    return TickerSearchResponse(results=ticker_results)
+    bounds = {
+        "annual_return": (min_annual_return, max_annual_return),
+        "volatility": (min_volatility, max_volatility),
+        "sharpe_ratio": (min_sharpe_ratio, max_sharpe_ratio),
+        "max_drawdown": (min_max_drawdown, max_max_drawdown),
+        "beta": (min_beta, max_beta),
+        "avg_correlation": (min_avg_correlation, max_avg_correlation)
+    }
+    filters = {column: bound for column, bound in bounds.items() if bound != (None, None)}
+    total, rows = table.query(sort_by, order == "desc", filters, offset, limit)
+    return ScreenResponse(as_of=table.as_of, lookback_days=table.lookback_days, total=total, offset=offset, results=rows)
 
 
 @app.get("/portfolio-presets")
@@ -361,9 +759,22 @@ async def get_portfolio_presets(category: str = Query(None, description="Filter
     if category:
         presets = [p for p in presets if p.get("category", "").lower() == category.lower()]
     
+    # Attach the precomputed optimization summary (weights and metrics) when it is current
+    presets = [{**p, "precomputed": preset_refresher.summary(p.get("id"))} for p in presets]
+    
     return {"presets": presets}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus metrics: request and per-stage latency histograms, solver counters
+    (objective evaluations, SLSQP iterations, restart outcomes, frontier points)
+    and cache hits and misses.
+    """
+    return PlainTextResponse(telemetry.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/health")
 async def health_check():
     """Detailed health check"""
@@ -373,9 +784,18 @@ async def health_check():
         "endpoints": [
             "/",
             "/optimize",
+            "/optimize/frontier/stream",
+            "/optimize/batch",
+            "/optimize/compare",
+            "/optimize/resampled",
+            "/backtest",
+            "/jobs/optimize",
+            "/jobs/{job_id}",
             "/search/tickers",
+            "/screen",
             "/portfolio-presets",
             "/health",
+            "/metrics",
             "/docs"
         ]
     }
@@ -1,25 +1,45 @@
 import numpy as np
 import pandas as pd
-from typing import Dict
+from typing import Dict, Optional, Union
+from .covariance import FactorCovariance
+
+# Return periods per year of each return frequency, used to annualize means and volatilities
+PERIODS_PER_YEAR = {"daily": 252, "weekly": 52, "monthly": 12}
 
 class RiskMetrics:
-    """Calculate various portfolio risk metrics"""
+    """
+    Calculate various portfolio risk metrics.
+    
+    Returns are daily unless periods_per_year says otherwise (see PERIODS_PER_YEAR).
+    """
     
     @staticmethod
-    def calculate_volatility(returns: pd.Series, annualize: bool = True) -> float:
+    def calculate_volatility(returns: pd.Series, annualize: bool = True, periods_per_year: int = 252) -> float:
         """Calculate portfolio volatility"""
         vol = returns.std()
         if annualize:
-            vol *= np.sqrt(252)
+            vol *= np.sqrt(periods_per_year)
         return float(vol)
     
     @staticmethod
-    def calculate_sharpe_ratio(returns: pd.Series, risk_free_rate: float = 0.02) -> float:
+    def calculate_sharpe_ratio(returns: pd.Series, risk_free_rate: float = 0.02, periods_per_year: int = 252) -> float:
         """Calculate Sharpe ratio"""
-        excess_returns = returns.mean() * 252 - risk_free_rate
-        volatility = RiskMetrics.calculate_volatility(returns)
+        excess_returns = returns.mean() * periods_per_year - risk_free_rate
+        volatility = RiskMetrics.calculate_volatility(returns, periods_per_year=periods_per_year)
         return float(excess_returns / volatility) if volatility > 0 else 0.0
     
+    @staticmethod
+    def calculate_sortino_ratio(returns: pd.Series, risk_free_rate: float = 0.02,
+                                periods_per_year: int = 252) -> Optional[float]:
+        """Calculate Sortino ratio (None without losing periods)"""
+        downside_returns = returns[returns < 0]
+        if len(downside_returns) == 0:
+            return None
+        downside_std = downside_returns.std() * np.sqrt(periods_per_year)
+        if not downside_std > 0:
+            return None
+        return float((returns.mean() * periods_per_year - risk_free_rate) / downside_std)
+    
     @staticmethod
     def calculate_max_drawdown(returns: pd.Series) -> float:
         """Calculate maximum drawdown"""
@@ -40,65 +60,75 @@ class RiskMetrics:
         return float(returns[returns <= var].mean())
     
     @staticmethod
-    def calculate_rolling_sharpe_ratio(returns: pd.Series, window: int = 30, risk_free_rate: float = 0.02) -> pd.Series:
+    def calculate_rolling_sharpe_ratio(returns: pd.Series, window: int = 30, risk_free_rate: float = 0.02,
+                                       periods_per_year: int = 252) -> pd.Series:
         """
         Calculate rolling Sharpe ratio.
         
         Args:
             returns: Series of daily returns
-            window: Rolling window size in days
+            window: Rolling window size in periods (days for daily returns)
             risk_free_rate: Annual risk-free rate
+            periods_per_year: Return periods per year (252 for daily returns)
             
         Returns:
             Series of rolling Sharpe ratios (NaN for insufficient data, not filled with 0)
         """
-        rolling_mean = returns.rolling(window=window).mean() * 252
-        rolling_std = returns.rolling(window=window).std() * np.sqrt(252)
+        rolling_mean = returns.rolling(window=window).mean() * periods_per_year
+        rolling_std = returns.rolling(window=window).std() * np.sqrt(periods_per_year)
         rolling_excess = rolling_mean - risk_free_rate
         rolling_sharpe = rolling_excess / rolling_std
         # Don't fill NaN with 0 - let caller filter them out
         return rolling_sharpe
     
     @staticmethod
-    def calculate_rolling_volatility(returns: pd.Series, window: int = 30) -> pd.Series:
+    def calculate_rolling_volatility(returns: pd.Series, window: int = 30, periods_per_year: int = 252) -> pd.Series:
         """
         Calculate rolling volatility.
         
         Args:
             returns: Series of daily returns
-            window: Rolling window size in days
+            window: Rolling window size in periods (days for daily returns)
+            periods_per_year: Return periods per year (252 for daily returns)
             
         Returns:
             Series of rolling annualized volatility (NaN for insufficient data, not filled with 0)
         """
-        rolling_vol = returns.rolling(window=window).std() * np.sqrt(252)
+        rolling_vol = returns.rolling(window=window).std() * np.sqrt(periods_per_year)
         # Don't fill NaN with 0 - let caller filter them out
         return rolling_vol
     
     @staticmethod
-    def calculate_risk_decomposition(returns: pd.DataFrame, weights: np.ndarray) -> Dict[str, float]:
+    def calculate_risk_decomposition(returns: pd.DataFrame, weights: np.ndarray,
+                                     cov_matrix: Optional[Union[np.ndarray, FactorCovariance]] = None,
+                                     periods_per_year: int = 252) -> Dict[str, float]:
         """
         Calculate risk contribution of each asset to portfolio risk.
         
         Args:
             returns: DataFrame of asset returns
             weights: Portfolio weights array
+            cov_matrix: Optional annualized covariance (dense or factored) to use instead
+                of the sample covariance of returns; a FactorCovariance keeps this O(n*k)
+            periods_per_year: Return periods per year of returns (252 for daily returns)
             
         Returns:
             Dictionary mapping ticker to risk contribution percentage
         """
         # Calculate covariance matrix
-        cov_matrix = returns.cov() * 252
+        if cov_matrix is None:
+            cov_matrix = returns.cov().to_numpy() * periods_per_year
         
         # Portfolio variance
-        portfolio_variance = np.dot(weights, np.dot(cov_matrix, weights))
+        sigma_w = cov_matrix @ weights
+        portfolio_variance = np.dot(weights, sigma_w)
         portfolio_std = np.sqrt(portfolio_variance)
         
         if portfolio_std == 0:
             return {ticker: 0.0 for ticker in returns.columns}
         
         # Marginal contribution to risk (MCR)
-        mcr = np.dot(cov_matrix, weights) / portfolio_std
+        mcr = sigma_w / portfolio_std
         
         # Risk contribution = weight * MCR
         risk_contributions = weights * mcr
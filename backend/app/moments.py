@@ -0,0 +1,240 @@
+import numpy as np
+import pandas as pd
+from collections import deque
+from typing import Sequence, Union
+from .covariance import FactorCovariance, estimate_covariance
+
+
+class RollingMoments:
+    """
+    Streaming mean and covariance of asset returns over a sliding window.
+
+    Keeps the sum vector and cross-product matrix of the rows in the window so
+    that adding or removing a row costs O(n^2) instead of recomputing
+    returns.cov() from scratch. Sums are accumulated around a shift vector and
+    periodically re-anchored from the stored rows to bound floating-point drift.
+    """
+
+    def __init__(self, tickers: Sequence[str], reanchor_every: int = 500):
+        """
+        Initialize an empty window.
+
+        Args:
+            tickers: Asset names, in column order of the rows that will be added
+            reanchor_every: Number of add/remove updates between exact recomputations
+        """
+        self.tickers = list(tickers)
+        self.n_assets = len(self.tickers)
+        self.reanchor_every = reanchor_every
+        self._rows = deque()
+        self._shift = np.zeros(self.n_assets)
+        self._sum = np.zeros(self.n_assets)
+        self._cross = np.zeros((self.n_assets, self.n_assets))
+        self._updates_since_anchor = 0
+
+    @classmethod
+    def from_returns(cls, returns: pd.DataFrame, reanchor_every: int = 500) -> "RollingMoments":
+        """
+        Build a window holding every row of a returns DataFrame.
+
+        Args:
+            returns: DataFrame of asset returns
+            reanchor_every: Number of updates between exact recomputations
+
+        Returns:
+            RollingMoments over the rows of returns
+        """
+        moments = cls(returns.columns, reanchor_every=reanchor_every)
+        moments._rows.extend(returns.to_numpy(dtype=float))
+        moments.reanchor()
+        return moments
+
+    @property
+    def count(self) -> int:
+        """Number of rows currently in the window."""
+        return len(self._rows)
+
+    def add(self, row: np.ndarray) -> None:
+        """Append a row of returns to the end of the window."""
+        row = np.asarray(row, dtype=float)
+        if row.shape != (self.n_assets,):
+            raise ValueError(f"Expected a row of {self.n_assets} returns, got shape {row.shape}")
+        self._rows.append(row)
+        centered = row - self._shift
+        self._sum += centered
+        self._cross += np.outer(centered, centered)
+        self._after_update()
+
+    def remove(self) -> np.ndarray:
+        """
+        Drop the oldest row from the window.
+
+        Returns:
+            The removed row
+        """
+        if not self._rows:
+            raise ValueError("Cannot remove from an empty window")
+        row = self._rows.popleft()
+        centered = row - self._shift
+        self._sum -= centered
+        self._cross -= np.outer(centered, centered)
+        self._after_update()
+        return row
+
+    def slide(self, row: np.ndarray) -> np.ndarray:
+        """
+        Add a new row and drop the oldest one, keeping the window length fixed.
+
+        Returns:
+            The removed row
+        """
+        self.add(row)
+        return self.remove()
+
+    def _after_update(self) -> None:
+        self._updates_since_anchor += 1
+        if self._updates_since_anchor >= self.reanchor_every:
+            self.reanchor()
+
+    def reanchor(self) -> None:
+        """Recompute the sums exactly from the stored rows, centered on the current mean."""
+        self._updates_since_anchor = 0
+        if not self._rows:
+            self._shift = np.zeros(self.n_assets)
+            self._sum = np.zeros(self.n_assets)
+            self._cross = np.zeros((self.n_assets, self.n_assets))
+            return
+
+        rows = np.asarray(self._rows)
+        self._shift = rows.mean(axis=0)
+        centered = rows - self._shift
+        self._sum = centered.sum(axis=0)
+        self._cross = centered.T @ centered
+
+    def mean(self, annualize: bool = True) -> np.ndarray:
+        """Mean return of each asset over the window."""
+        if not self._rows:
+            raise ValueError("No rows in window")
+        mean = self._shift + self._sum / self.count
+        return mean * 252 if annualize else mean
+
+    def covariance(self, annualize: bool = True) -> np.ndarray:
+        """Sample covariance (ddof=1) of asset returns over the window."""
+        if self.count < 2:
+            raise ValueError("At least 2 rows are needed for a covariance estimate")
+        centered_mean = self._sum / self.count
+        cov = (self._cross - self.count * np.outer(centered_mean, centered_mean)) / (self.count - 1)
+        # Cancellation can leave the matrix very slightly asymmetric
+        cov = (cov + cov.T) / 2
+        return cov * 252 if annualize else cov
+
+    def context(self) -> "MomentsContext":
+        """Snapshot of the current window as a MomentsContext."""
+        return MomentsContext(self.tickers, self.mean(), self.covariance())
+
+    def to_frame(self) -> pd.DataFrame:
+        """Rows currently in the window as a DataFrame (without a date index)."""
+        return pd.DataFrame(np.asarray(self._rows), columns=self.tickers)
+
+
+class MomentsContext:
+    """
+    Per-request moments shared by every consumer: optimizer, efficient frontier,
+    theoretical metrics and risk decomposition.
+
+    Holds the annualized mean vector, the annualized covariance (dense, or a
+    FactorCovariance for large universes) and a lazily computed Cholesky factor,
+    so each is computed once per request and all results use the same window.
+    """
+
+    def __init__(self, tickers: Sequence[str], mean: np.ndarray, covariance: Union[np.ndarray, FactorCovariance]):
+        """
+        Initialize context.
+
+        Args:
+            tickers: Asset names in order
+            mean: Annualized mean returns
+            covariance: Annualized covariance (dense or factored)
+        """
+        self.tickers = list(tickers)
+        self.mean = np.asarray(mean, dtype=float)
+        self.covariance = covariance
+        self._cholesky = None
+
+        if len(self.mean) != len(self.tickers) or len(covariance) != len(self.tickers):
+            raise ValueError("Mean and covariance dimensions do not match the tickers")
+
+    @classmethod
+    def from_returns(cls, returns: pd.DataFrame, covariance_model: str = "sample", n_factors: int = 10,
+                     periods_per_year: int = 252) -> "MomentsContext":
+        """
+        Compute the moments of a returns window.
+
+        Args:
+            returns: DataFrame of asset returns (the optimization window)
+            covariance_model: "sample", "pca" or "shrinkage"
+            n_factors: Number of factors for the pca model
+            periods_per_year: Return periods per year of returns (252 for daily returns)
+
+        Returns:
+            MomentsContext for the columns of returns
+        """
+        return cls(
+            returns.columns,
+            returns.mean().to_numpy() * periods_per_year,
+            estimate_covariance(returns, covariance_model, n_factors, periods_per_year)
+        )
+
+    @property
+    def n_assets(self) -> int:
+        return len(self.tickers)
+
+    def subset(self, tickers: Sequence[str]) -> "MomentsContext":
+        """
+        Moments of a subset of the assets, sliced from this (universe) context.
+
+        For the sample covariance this equals the covariance of the subset computed
+        on the same window; factor models keep the universe-wide factors.
+
+        Args:
+            tickers: Asset names to keep, in the desired order
+
+        Returns:
+            MomentsContext for tickers
+        """
+        positions = {ticker: i for i, ticker in enumerate(self.tickers)}
+        missing = [ticker for ticker in tickers if ticker not in positions]
+        if missing:
+            raise ValueError(f"Tickers not in the universe: {', '.join(missing)}")
+
+        indices = [positions[ticker] for ticker in tickers]
+        if isinstance(self.covariance, FactorCovariance):
+            covariance = self.covariance.subset(indices)
+        else:
+            covariance = self.covariance[np.ix_(indices, indices)]
+        return MomentsContext(tickers, self.mean[indices], covariance)
+
+    @property
+    def cholesky(self) -> np.ndarray:
+        """Lower-triangular Cholesky factor of the covariance, computed on first use."""
+        if self._cholesky is None:
+            dense = self.covariance.to_dense() if isinstance(self.covariance, FactorCovariance) else self.covariance
+            try:
+                self._cholesky = np.linalg.cholesky(dense)
+            except np.linalg.LinAlgError:
+                # Singular sample covariance (e.g. duplicated assets): add a tiny ridge
+                ridge = 1e-10 * max(float(np.trace(dense)) / len(dense), 1e-12)
+                self._cholesky = np.linalg.cholesky(dense + ridge * np.eye(len(dense)))
+        return self._cholesky
+
+    def portfolio_return(self, weights: np.ndarray) -> float:
+        """Annualized expected portfolio return w' mu."""
+        return float(np.dot(weights, self.mean))
+
+    def portfolio_variance(self, weights: np.ndarray) -> float:
+        """Annualized portfolio variance w' Sigma w."""
+        return float(np.dot(weights, self.covariance @ weights))
+
+    def portfolio_volatility(self, weights: np.ndarray) -> float:
+        """Annualized portfolio volatility."""
+        return float(np.sqrt(max(self.portfolio_variance(weights), 0.0)))
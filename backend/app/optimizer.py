@@ -1,31 +1,211 @@
+import bisect
+import heapq
+import time
 import numpy as np
 import pandas as pd
-from scipy.optimize import minimize
-from typing import Dict, List, Tuple, Optional
+from concurrent.futures import Executor
+from scipy.optimize import linprog, minimize
+from typing import Any, Callable, Dict, List, Tuple, Optional, Union
 from .metrics import RiskMetrics
+from .moments import RollingMoments, MomentsContext
+from .covariance import FactorCovariance, covariance_diagonal
+from .allocation import hrp_weights, risk_parity_weights
+from . import telemetry
+from .cancellation import CancellationToken, check
+
+# Objectives solved by a dedicated allocation method instead of SLSQP
+ALLOCATION_OBJECTIVES = ("hrp", "risk_parity")
+
+# Adaptive frontier sampling, in fractions of the chart's risk/return extent: the
+# longest allowed segment between neighbouring points, and the default tolerance for
+# the curve's deviation from a straight segment
+FRONTIER_MAX_SEGMENT = 0.08
+FRONTIER_TOLERANCE = 0.002
+
+# Resampled frontier: moment sets per task when the resamples are spread over an executor
+RESAMPLE_CHUNK_SIZE = 10
+# Parametric resampling: random values drawn at once (bounds the sample block to ~32 MB)
+BOOTSTRAP_BLOCK_VALUES = 4_000_000
+# Seed of the random restarts of request and backtest solves, so the same data always
+# gives the same weights (and byte-identical, revalidatable responses)
+RESTART_SEED = 0
 
 
 class PortfolioOptimizer:
     """Optimize portfolio weights using scipy.optimize."""
     
-    def __init__(self, returns: pd.DataFrame, objective: str = "sharpe", portfolio_type: str = "long_only", 
-                 esg_scores: Optional[Dict[str, float]] = None, esg_weight: float = 0.0):
+    def __init__(self, returns: Optional[pd.DataFrame] = None, objective: str = "sharpe", portfolio_type: str = "long_only", 
+                 esg_scores: Optional[Dict[str, float]] = None, esg_weight: float = 0.0,
+                 moments: Optional[Union[MomentsContext, RollingMoments]] = None,
+                 covariance: Optional[Union[np.ndarray, FactorCovariance]] = None,
+                 time_budget_ms: Optional[float] = None, periods_per_year: int = 252,
+                 seed: Optional[int] = None):
         """
         Initialize optimizer.
         
         Args:
             returns: DataFrame of asset returns
-            objective: Optimization objective ("sharpe", "sortino", "calmar", "min_variance")
+            objective: Optimization objective ("sharpe", "sortino", "calmar", "min_variance",
+                "hrp", "risk_parity")
             portfolio_type: "long_only" or "long_short"
             esg_scores: Dictionary mapping ticker to ESG score (lower is better)
             esg_weight: Weight for ESG in blended objective (0.0 to 1.0)
+            moments: Precomputed moments (a per-request MomentsContext or a sliding-window
+                RollingMoments), used instead of recomputing the mean and covariance from
+                returns. Without returns only the moment-based objectives ("sharpe",
+                "min_variance", "hrp", "risk_parity") and the efficient frontier are available.
+            covariance: Annualized covariance estimate to use instead of the sample
+                covariance, e.g. a FactorCovariance for large universes
+            time_budget_ms: Compute time budget of optimize and the efficient frontier
+            periods_per_year: Return periods per year of returns, used to annualize
+                (252 for daily returns, 52 weekly, 12 monthly)
+            seed: Seed of the random restarts of optimize (None for fresh entropy)
         """
+        if returns is None and moments is None:
+            raise ValueError("Either returns or moments must be provided")
+        if returns is None and objective in ("sortino", "calmar"):
+            raise ValueError(f"The {objective} objective needs the returns history, not just moments")
+        if returns is not None and moments is not None and list(returns.columns) != moments.tickers:
+            raise ValueError("Returns columns and moments tickers do not match")
+        
+        if isinstance(moments, RollingMoments):
+            moments = moments.context()
+        if moments is None:
+            moments = MomentsContext(
+                returns.columns,
+                returns.mean().to_numpy() * periods_per_year,
+                returns.cov().to_numpy() * periods_per_year if covariance is None else covariance
+            )
+        elif covariance is not None:
+            moments = MomentsContext(moments.tickers, moments.mean, covariance)
+        
         self.returns = returns
+        self.moments = moments
         self.objective = objective
         self.portfolio_type = portfolio_type
-        self.n_assets = len(returns.columns)
+        self.tickers = list(moments.tickers)
+        self.n_assets = len(self.tickers)
         self.esg_scores = esg_scores or {}
         self.esg_weight = esg_weight
+        self.periods_per_year = periods_per_year
+        
+        # Cache numpy views of the data used on every objective evaluation
+        self._returns_values = returns.to_numpy(dtype=float) if returns is not None else None
+        self._mean_returns = moments.mean
+        self._cov_matrix = moments.covariance
+        
+        self._rng = np.random.default_rng(seed)
+        
+        self.time_budget_ms = time_budget_ms
+        self._started = time.monotonic()
+        self._deadline = self._started + time_budget_ms / 1000 if time_budget_ms is not None else None
+        # Set by calculate_efficient_frontier: False if the time budget cut it short
+        self.frontier_complete = True
+    
+    def _out_of_time(self) -> bool:
+        """Whether the time budget (if any) is used up."""
+        return self._deadline is not None and time.monotonic() >= self._deadline
+    
+    def _is_feasible(self, weights: np.ndarray, tol: float = 1e-6) -> bool:
+        """Whether weights satisfy the budget, bound and leverage constraints (within tol)."""
+        if abs(np.sum(weights) - 1.0) > tol:
+            return False
+        lower = 0.0 if self.portfolio_type == "long_only" else -1.0
+        if np.any(weights < lower - tol) or np.any(weights > 1.0 + tol):
+            return False
+        return self.portfolio_type != "long_short" or np.sum(np.abs(weights)) <= 1.5 + tol
+    
+    def _budget_callback(self, incumbent: Dict) -> Callable[[np.ndarray], None]:
+        """
+        SLSQP callback that keeps the best feasible iterate and stops the solve once
+        the time budget is used up.
+        
+        Args:
+            incumbent: Shared across restarts; updated in place with "weights", "value"
+                and "stopped"
+        """
+        def callback(weights: np.ndarray) -> None:
+            if self._is_feasible(weights):
+                value = float(self._objective_function(weights))
+                if value < incumbent["value"]:
+                    incumbent["value"] = value
+                    incumbent["weights"] = np.array(weights, dtype=float)
+            if self._out_of_time():
+                incumbent["stopped"] = True
+                # SLSQP ends the solve and returns the current iterate (status 99)
+                raise StopIteration
+        return callback
+    
+    def _portfolio_variance(self, weights: np.ndarray) -> float:
+        """Annualized portfolio variance (O(n*k) for a factored covariance)."""
+        return float(np.dot(weights, self._cov_matrix @ weights))
+    
+    def _portfolio_variance_gradient(self, weights: np.ndarray) -> np.ndarray:
+        """Gradient of the portfolio variance, 2 * Sigma @ w."""
+        return 2 * (self._cov_matrix @ weights)
+    
+    def _objective_gradient(self, weights: np.ndarray) -> np.ndarray:
+        """
+        Analytic gradient of the sharpe, min_variance and calmar objectives (without ESG).
+        
+        Args:
+            weights: Portfolio weights
+            
+        Returns:
+            Gradient of _objective_function at weights
+        """
+        if self.objective == "calmar":
+            return self._calmar_gradient(weights)
+        
+        sigma_w = self._cov_matrix @ weights
+        if self.objective == "min_variance":
+            return 2 * sigma_w
+        
+        volatility = np.sqrt(max(float(np.dot(weights, sigma_w)), 0.0))
+        if volatility == 0:
+            return np.zeros_like(weights)
+        excess_return = np.dot(weights, self._mean_returns) - 0.02
+        return -(self._mean_returns * volatility - excess_return * sigma_w / volatility) / volatility ** 2
+    
+    def _calmar_gradient(self, weights: np.ndarray) -> np.ndarray:
+        """
+        Gradient of the negative Calmar ratio, holding the peak and trough of the maximum drawdown fixed.
+        
+        The drawdown between peak p and trough t is prod_{p<s<=t}(1 + r_s) - 1, so its
+        gradient is (drawdown + 1) * sum_{p<s<=t} R_s / (1 + r_s). This is exact wherever
+        the drawdown's peak and trough do not change, and replaces n_assets + 1 evaluations
+        of the cumulative-product objective per SLSQP iteration with one.
+        
+        Args:
+            weights: Portfolio weights
+            
+        Returns:
+            Gradient of _objective_function at weights
+        """
+        portfolio_returns = self._returns_values @ weights
+        cumulative = np.cumprod(1 + portfolio_returns)
+        running_max = np.maximum.accumulate(cumulative)
+        drawdowns = (cumulative - running_max) / running_max
+        trough = int(np.argmin(drawdowns))
+        max_dd = drawdowns[trough]
+        if max_dd >= 0:
+            return np.zeros_like(weights)
+        peak = int(np.argmax(cumulative[:trough + 1]))
+        
+        expected_return = portfolio_returns.mean() * self.periods_per_year
+        return_gradient = self._returns_values.mean(axis=0) * self.periods_per_year
+        window = slice(peak + 1, trough + 1)
+        drawdown_gradient = (max_dd + 1) * (
+            self._returns_values[window] / (1 + portfolio_returns[window])[:, None]
+        ).sum(axis=0)
+        # -(expected_return / |max_dd|) == expected_return / max_dd
+        return (return_gradient * max_dd - expected_return * drawdown_gradient) / max_dd ** 2
+    
+    def _objective_jacobian(self):
+        """Analytic jacobian for scipy.optimize if available, otherwise None (finite differences)."""
+        if self.objective in ("sharpe", "min_variance", "calmar") and not (self.esg_weight > 0 and self.esg_scores):
+            return self._objective_gradient
+        return None
     
     def _normalize_esg_score(self, weights: np.ndarray) -> float:
         """
@@ -45,7 +225,7 @@ class PortfolioOptimizer:
         portfolio_esg = 0.0
         total_weight = 0.0
         
-        for i, ticker in enumerate(self.returns.columns):
+        for i, ticker in enumerate(self.tickers):
             if ticker in self.esg_scores:
                 portfolio_esg += weights[i] * self.esg_scores[ticker]
                 total_weight += weights[i]
@@ -81,19 +261,27 @@ class PortfolioOptimizer:
         Returns:
             Negative of the optimization metric
         """
-        portfolio_returns = (self.returns.values * weights).sum(axis=1)
-        portfolio_returns = pd.Series(portfolio_returns)
+        # Work on the cached numpy arrays rather than building a pandas Series on
+        # every evaluation - SLSQP calls this n_assets + 1 times per iteration
+        if self.objective in ("sortino", "calmar"):
+            portfolio_returns = self._returns_values @ weights
         
         # Calculate base metric for all objectives
         if self.objective == "sharpe":
-            base_metric = -RiskMetrics.calculate_sharpe_ratio(portfolio_returns)
+            # The sample mean/std of portfolio returns are exactly w'mu and sqrt(w'Sigma w),
+            # so the Sharpe ratio only needs the moments, not the full returns history
+            volatility = np.sqrt(max(self._portfolio_variance(weights), 0.0))
+            if volatility > 0:
+                base_metric = -((np.dot(weights, self._mean_returns) - 0.02) / volatility)
+            else:
+                base_metric = 0
         elif self.objective == "sortino":
             # Calculate Sortino ratio
             downside_returns = portfolio_returns[portfolio_returns < 0]
-            if len(downside_returns) > 0:
-                downside_std = downside_returns.std() * (252 ** 0.5)
+            if len(downside_returns) > 1:
+                downside_std = downside_returns.std(ddof=1) * (self.periods_per_year ** 0.5)
                 if downside_std > 0:
-                    expected_return = portfolio_returns.mean() * 252
+                    expected_return = portfolio_returns.mean() * self.periods_per_year
                     base_metric = -((expected_return - 0.02) / downside_std)
                 else:
                     base_metric = 0
@@ -101,17 +289,17 @@ class PortfolioOptimizer:
                 base_metric = 0
         elif self.objective == "calmar":
             # Calculate Calmar ratio
-            max_dd = RiskMetrics.calculate_max_drawdown(portfolio_returns)
-            expected_return = portfolio_returns.mean() * 252
+            cumulative = np.cumprod(1 + portfolio_returns)
+            running_max = np.maximum.accumulate(cumulative)
+            max_dd = np.min((cumulative - running_max) / running_max)
+            expected_return = portfolio_returns.mean() * self.periods_per_year
             if max_dd < 0:
                 base_metric = -(expected_return / abs(max_dd))
             else:
                 base_metric = 0
         elif self.objective == "min_variance":
-            # Minimize portfolio variance (volatility)
-            # Calculate portfolio variance directly
-            cov_matrix = self.returns.cov() * 252
-            portfolio_variance = np.dot(weights.T, np.dot(cov_matrix, weights))
+            # Minimize portfolio variance (volatility) using the cached covariance matrix
+            portfolio_variance = self._portfolio_variance(weights)
             base_metric = portfolio_variance  # Minimize variance directly
         else:
             raise ValueError(f"Unknown objective: {self.objective}")
@@ -124,8 +312,7 @@ class PortfolioOptimizer:
                 # For min_variance, we minimize variance
                 # Blend: minimize (1-esg_weight)*variance - esg_weight*normalized_esg
                 # Scale ESG to match variance scale
-                cov_matrix = self.returns.cov() * 252
-                max_var = np.max(np.diag(cov_matrix)) if len(cov_matrix) > 0 else 1.0
+                max_var = np.max(covariance_diagonal(self._cov_matrix)) if len(self._cov_matrix) > 0 else 1.0
                 # Scale normalized_esg (0-1) to variance scale
                 esg_component = normalized_esg * max_var * 0.1  # Scale ESG contribution
                 metric = (1 - self.esg_weight) * base_metric - self.esg_weight * esg_component
@@ -155,16 +342,19 @@ class PortfolioOptimizer:
         constraints = []
         
         # Budget constraint: weights sum to 1
+        # Analytic jacobians save SLSQP a finite-difference pass per iteration
         constraints.append({
             'type': 'eq',
-            'fun': lambda w: np.sum(w) - 1.0
+            'fun': lambda w: np.sum(w) - 1.0,
+            'jac': lambda w: np.ones_like(w)
         })
         
         if self.portfolio_type == "long_short":
             # Leverage constraint: L1 norm <= 1.5
             constraints.append({
                 'type': 'ineq',
-                'fun': lambda w: 1.5 - np.sum(np.abs(w))
+                'fun': lambda w: 1.5 - np.sum(np.abs(w)),
+                'jac': lambda w: -np.sign(w)
             })
         
         return constraints
@@ -183,370 +373,782 @@ class PortfolioOptimizer:
             # Long/short: weights between -1 and 1
             return [(-1.0, 1.0) for _ in range(self.n_assets)]
     
-    def optimize(self) -> Tuple[np.ndarray, Dict]:
+    @telemetry.span("optimize")
+    def optimize(self, initial_weights: Optional[np.ndarray] = None, num_restarts: int = 5,
+                 cancel_token: Optional[CancellationToken] = None) -> Tuple[np.ndarray, Dict]:
         """
         Optimize portfolio weights with multiple random restarts for global optimization.
         
+        With a time budget, no new restart starts once it is used up and a running solve
+        is interrupted; the best feasible point seen so far (converged or not) is returned
+        with metrics["partial"] = True. Metrics then also include "convergence"
+        diagnostics (restarts, iterations, objective evaluations, elapsed time).
+        
+        Args:
+            initial_weights: Optional warm start (e.g. the previous rebalance's solution),
+                used as the first initial guess instead of equal weights
+            num_restarts: Number of initial guesses to try
+            cancel_token: Checked before each restart
+        
         Returns:
             Tuple of (optimal_weights, metrics_dict)
+            
+        Raises:
+            OperationCancelled: If cancel_token was cancelled
         """
+        # Closed-form / fixed-point allocations: no SLSQP involved
+        if self.objective in ALLOCATION_OBJECTIVES:
+            optimal_weights = self._allocation_weights(self.objective)
+            return optimal_weights, self._with_convergence(self._compute_metrics(optimal_weights), {})
+        
         best_result = None
         best_value = float('inf')
-        num_restarts = 5
+        stats = {"restarts_attempted": 0, "restarts_converged": 0, "iterations": 0, "objective_evaluations": 0}
+        # Best feasible iterate across restarts, only tracked under a time budget
+        incumbent = {"weights": None, "value": float('inf'), "stopped": False}
+        callback = self._budget_callback(incumbent) if self._deadline is not None else None
         
         # Try multiple random initial guesses
-        for attempt in range(num_restarts):
+        for attempt in range(max(1, num_restarts)):
+            check(cancel_token)
+            if attempt > 0 and self._out_of_time():
+                incumbent["stopped"] = True
+                break
             if attempt == 0:
-                # First attempt: equal weights
-                x0 = np.ones(self.n_assets) / self.n_assets
+                # First attempt: warm start if provided, otherwise equal weights
+                if initial_weights is not None and len(initial_weights) == self.n_assets:
+                    x0 = np.asarray(initial_weights, dtype=float)
+                else:
+                    x0 = np.ones(self.n_assets) / self.n_assets
             else:
                 # Random initial guess
                 if self.portfolio_type == "long_only":
-                    x0 = np.random.dirichlet(np.ones(self.n_assets))
+                    x0 = self._rng.dirichlet(np.ones(self.n_assets))
                 else:
                     # For long/short, use random weights that sum close to 1
-                    x0 = np.random.uniform(-0.5, 0.5, self.n_assets)
+                    x0 = self._rng.uniform(-0.5, 0.5, self.n_assets)
                     x0 = x0 / np.sum(np.abs(x0)) * 0.5  # Normalize to reasonable leverage
             
             try:
                 result = minimize(
                     fun=self._objective_function,
                     x0=x0,
+                    jac=self._objective_jacobian(),
                     method='SLSQP',
                     bounds=self._bounds(),
                     constraints=self._constraints(),
-                    options={'maxiter': 2000, 'ftol': 1e-9}
+                    options={'maxiter': 2000, 'ftol': 1e-9},
+                    callback=callback
                 )
+                self._record_solve(result)
+                stats["restarts_attempted"] += 1
+                stats["restarts_converged"] += int(result.success)
+                stats["iterations"] += int(result.nit)
+                stats["objective_evaluations"] += int(result.nfev)
                 
                 if result.success and result.fun < best_value:
                     best_value = result.fun
                     best_result = result
             except:
-                continue
-        
-        if best_result is None:
-            # Fallback to equal weights if all attempts fail
-            x0 = np.ones(self.n_assets) / self.n_assets
-            best_result = minimize(
-                fun=self._objective_function,
-                x0=x0,
-                method='SLSQP',
-                bounds=self._bounds(),
-                constraints=self._constraints(),
-                options={'maxiter': 2000, 'ftol': 1e-9}
-            )
-        
-        if not best_result.success:
-            raise ValueError(f"Optimization failed: {best_result.message}")
+                telemetry.inc("optimizer_restarts_total", objective=self.objective, outcome="error")
+            
+            if incumbent["stopped"]:
+                break
         
-        optimal_weights = best_result.x
+        partial = incumbent["stopped"]
+        if partial and incumbent["weights"] is not None and incumbent["value"] < best_value:
+            # Interrupted by the time budget with a better feasible iterate than any converged run
+            optimal_weights = incumbent["weights"]
+            best_value = incumbent["value"]
+        else:
+            if best_result is None and not partial:
+                check(cancel_token)
+                # Fallback to equal weights if all attempts fail
+                telemetry.inc("optimizer_fallbacks_total", objective=self.objective, fallback="equal_weights")
+                x0 = np.ones(self.n_assets) / self.n_assets
+                best_result = minimize(
+                    fun=self._objective_function,
+                    x0=x0,
+                    jac=self._objective_jacobian(),
+                    method='SLSQP',
+                    bounds=self._bounds(),
+                    constraints=self._constraints(),
+                    options={'maxiter': 2000, 'ftol': 1e-9}
+                )
+                self._record_solve(best_result)
+            
+            if best_result is None or not best_result.success:
+                # Fall back to the (always feasible) risk parity allocation rather than failing the request
+                telemetry.inc("optimizer_fallbacks_total", objective=self.objective, fallback="risk_parity")
+                optimal_weights = self._allocation_weights("risk_parity")
+                metrics = self._compute_metrics(optimal_weights)
+                metrics["fallback"] = "risk_parity"
+                return optimal_weights, self._with_convergence(metrics, stats, partial)
+            
+            optimal_weights = best_result.x
+            best_value = best_result.fun
         
         # Validate weights
         if np.abs(np.sum(optimal_weights) - 1.0) > 1e-6:
             raise ValueError("Optimization produced invalid weights (sum != 1)")
         
-        # Compute final metrics
-        portfolio_returns = (self.returns.values * optimal_weights).sum(axis=1)
-        portfolio_returns = pd.Series(portfolio_returns)
-        
-        metrics = {
-            "expected_return": float(portfolio_returns.mean() * 252),
-            "volatility": float(RiskMetrics.calculate_volatility(portfolio_returns)),
-            "sharpe_ratio": float(RiskMetrics.calculate_sharpe_ratio(portfolio_returns)),
-            "max_drawdown": float(RiskMetrics.calculate_max_drawdown(portfolio_returns))
+        stats["best_objective"] = float(best_value)
+        return optimal_weights, self._with_convergence(self._compute_metrics(optimal_weights), stats, partial)
+    
+    def _with_convergence(self, metrics: Dict, stats: Dict, partial: bool = False) -> Dict:
+        """Add the partial flag and convergence diagnostics to metrics when a time budget is set."""
+        if self._deadline is None:
+            return metrics
+        metrics["partial"] = partial
+        metrics["convergence"] = {
+            **stats,
+            "stopped_by_budget": partial,
+            "elapsed_ms": (time.monotonic() - self._started) * 1000,
+            "time_budget_ms": self.time_budget_ms
         }
-        
-        # Add leverage for long/short
-        if self.portfolio_type == "long_short":
-            metrics["total_leverage"] = float(np.sum(np.abs(optimal_weights)))
-        
-        return optimal_weights, metrics
+        return metrics
+    
+    def _record_solve(self, result) -> None:
+        """Export evaluation, iteration and outcome counts of one SLSQP run."""
+        telemetry.inc("optimizer_objective_evaluations_total", result.nfev, objective=self.objective)
+        telemetry.inc("optimizer_slsqp_iterations_total", result.nit, objective=self.objective)
+        telemetry.inc("optimizer_restarts_total", objective=self.objective,
+                      outcome="converged" if result.success else "failed")
     
-    def calculate_efficient_frontier(self, num_points: int = 100, extend_beyond_return: float = None, extend_beyond_risk: float = None) -> List[Dict[str, float]]:
+    def _allocation_weights(self, method: str) -> np.ndarray:
         """
-        Calculate efficient frontier points with proper lambda closure handling.
+        Weights from the non-iterative allocation methods.
         
         Args:
-            num_points: Number of points on the efficient frontier
-            extend_beyond_return: If provided, extend frontier beyond this return value
+            method: "hrp" or "risk_parity"
             
         Returns:
-            List of dictionaries with 'risk' and 'return' keys, sorted by risk
+            Long-only weights summing to 1 (feasible for both portfolio types)
         """
-        # Calculate expected returns and covariance matrix
-        mean_returns = self.returns.mean() * 252
-        cov_matrix = self.returns.cov() * 252
+        if method == "hrp":
+            return hrp_weights(self._cov_matrix)
         
-        # Find min and max expected returns achievable
-        # For min return, find minimum variance portfolio
-        # For max return, find maximum return portfolio
-        bounds = self._bounds()
-        
-        # Find minimum variance portfolio (lower bound)
-        def portfolio_variance(weights):
-            return np.dot(weights.T, np.dot(cov_matrix, weights))
-        
-        constraints_min = [{'type': 'eq', 'fun': lambda w: np.sum(w) - 1.0}]
-        if self.portfolio_type == "long_short":
-            constraints_min.append({'type': 'ineq', 'fun': lambda w: 1.5 - np.sum(np.abs(w))})
-        
-        result_min = minimize(
-            portfolio_variance,
-            np.ones(self.n_assets) / self.n_assets,
-            method='SLSQP',
-            bounds=bounds,
-            constraints=constraints_min,
-            options={'maxiter': 1000}
-        )
+        # With ESG enabled, tilt the risk budgets towards better (lower) ESG scores
+        risk_budgets = None
+        scores = np.array([self.esg_scores.get(ticker, np.nan) for ticker in self.tickers])
+        if self.esg_weight > 0 and not np.all(np.isnan(scores)):
+            scores = np.where(np.isnan(scores), np.nanmean(scores), scores)
+            spread = scores.max() - scores.min()
+            normalized = 1.0 - (scores - scores.min()) / spread if spread > 0 else np.ones(self.n_assets)
+            risk_budgets = (1 - self.esg_weight) + self.esg_weight * normalized + 1e-6
+        return risk_parity_weights(self._cov_matrix, risk_budgets=risk_budgets)
+    
+    def _compute_metrics(self, optimal_weights: np.ndarray) -> Dict:
+        """
+        Summary metrics for a set of weights.
         
-        if result_min.success:
-            min_return = float(np.dot(result_min.x, mean_returns))
+        Args:
+            optimal_weights: Portfolio weights
+            
+        Returns:
+            Dictionary of annualized metrics
+        """
+        if self._returns_values is not None:
+            portfolio_returns = pd.Series(self._returns_values @ optimal_weights)
+            
+            metrics = {
+                "expected_return": float(portfolio_returns.mean() * self.periods_per_year),
+                "volatility": float(RiskMetrics.calculate_volatility(portfolio_returns, periods_per_year=self.periods_per_year)),
+                "sharpe_ratio": float(RiskMetrics.calculate_sharpe_ratio(portfolio_returns, periods_per_year=self.periods_per_year)),
+                "max_drawdown": float(RiskMetrics.calculate_max_drawdown(portfolio_returns))
+            }
         else:
-            min_return = mean_returns.min()
-        
-        # Find maximum return portfolio (upper bound)
-        def neg_return(weights):
-            return -np.dot(weights, mean_returns)
-        
-        result_max = minimize(
-            neg_return,
-            np.ones(self.n_assets) / self.n_assets,
-            method='SLSQP',
-            bounds=bounds,
-            constraints=constraints_min,
-            options={'maxiter': 1000}
-        )
+            # Moments only: drawdown needs the return path, so it is not reported
+            expected_return = float(np.dot(optimal_weights, self._mean_returns))
+            volatility = float(np.sqrt(self._portfolio_variance(optimal_weights)))
+            metrics = {
+                "expected_return": expected_return,
+                "volatility": volatility,
+                "sharpe_ratio": float((expected_return - 0.02) / volatility) if volatility > 0 else 0.0
+            }
         
-        if result_max.success:
-            max_return = float(np.dot(result_max.x, mean_returns))
-        else:
-            max_return = mean_returns.max()
-        
-        # Always extend beyond current portfolio return if specified
-        # This ensures the frontier has points beyond the current portfolio
-        if extend_beyond_return is not None:
-            # Always extend beyond the current portfolio return
-            # Use at least 40% extension beyond current return, or 25% of total range, whichever is larger
-            extension = max(
-                extend_beyond_return * 0.4,  # 40% beyond current return
-                (max_return - min_return) * 0.25,  # Or 25% of total range
-                (max_return - min_return) * 0.15  # At minimum 15% of total range
-            )
-            # Set max_return to be well beyond the current portfolio
-            # Ensure we always have points beyond, even if current portfolio is already at max
-            max_return = max(extend_beyond_return + extension, max_return * 1.15)
+        # Add leverage for long/short
+        if self.portfolio_type == "long_short":
+            metrics["total_leverage"] = float(np.sum(np.abs(optimal_weights)))
         
-        # Generate target returns
-        target_returns = np.linspace(min_return, max_return, num_points)
+        return metrics
+    
+    def _frontier_constraints(self, target_return: Optional[float] = None) -> List[Dict]:
+        """Portfolio constraints plus, if given, an expected return equal to target_return (all with jacobians)."""
+        constraints = self._constraints()
+        if target_return is not None:
+            mean_returns = self._mean_returns
+            constraints.append({
+                'type': 'eq',
+                'fun': lambda w: np.dot(w, mean_returns) - target_return,
+                'jac': lambda w: mean_returns
+            })
+        return constraints
+    
+    @telemetry.span("frontier")
+    def calculate_efficient_frontier(self, num_points: int = 100, extend_beyond_return: float = None, extend_beyond_risk: float = None,
+                                     on_point: Optional[Callable[[Dict], None]] = None,
+                                     should_stop: Optional[Callable[[], bool]] = None,
+                                     cancel_token: Optional[CancellationToken] = None,
+                                     tolerance: float = FRONTIER_TOLERANCE) -> List[Dict]:
+        """
+        Efficient frontier from the minimum-variance to the maximum-return portfolio,
+        sampled adaptively.
         
-        efficient_frontier = []
+        A segment between two solved points is split at its middle return while it is
+        longer than FRONTIER_MAX_SEGMENT, or while the curve bends more than tolerance
+        away from it. Both are measured as fractions of the chart's risk and return
+        extent. Flat stretches therefore get few solves and the bend near the
+        minimum-variance portfolio gets many. Each target is warm-started from its
+        neighbours' weights, interpolated to the target return. That start is feasible
+        because the constraints are convex and the return is linear in the weights.
         
-        for target_return in target_returns:
-            # Fix lambda closure bug by using default parameter
-            def make_return_constraint(tr):
-                return lambda w: np.dot(w, mean_returns) - tr
-            
-            # Minimize volatility for given target return
-            constraints = [
-                {
-                    'type': 'eq',
-                    'fun': lambda w: np.sum(w) - 1.0
-                },
-                {
-                    'type': 'eq',
-                    'fun': make_return_constraint(target_return)
-                }
-            ]
-            
-            if self.portfolio_type == "long_short":
-                constraints.append({
-                    'type': 'ineq',
-                    'fun': lambda w: 1.5 - np.sum(np.abs(w))
-                })
+        Args:
+            num_points: Maximum number of frontier points (one solve each)
+            extend_beyond_return: Return of the portfolio shown with the frontier; a point
+                is solved at this return so the curve passes next to the portfolio
+            extend_beyond_risk: Risk of that portfolio, included in the chart extent
+            on_point: Called with each point as soon as it is solved (before sorting)
+            should_stop: Checked before each solve; when it returns True the points found so far are returned.
+                The time budget (if any) stops the frontier the same way and sets
+                self.frontier_complete to False.
+            cancel_token: Checked before each solve; unlike should_stop, cancellation
+                abandons the frontier
+            tolerance: Largest allowed deviation of the curve from a straight segment
+                between two points, as a fraction of the chart extent
             
-            # Use previous solution as initial guess if available for better convergence
-            if efficient_frontier:
-                # Try to use last successful weights, but we don't store them
-                # Use a weighted average approach: bias towards higher return assets
-                x0 = np.ones(self.n_assets) / self.n_assets
-                if len(mean_returns) > 0:
-                    # Slightly bias towards higher return assets for better convergence
-                    return_weights = mean_returns / mean_returns.sum()
-                    x0 = 0.8 * x0 + 0.2 * return_weights
-                    x0 = x0 / x0.sum()  # Normalize
-            else:
-                x0 = np.ones(self.n_assets) / self.n_assets
+        Returns:
+            List of dictionaries with 'risk', 'return' and 'weights' (ticker to weight,
+            for weights of at least 1e-6 in magnitude) keys, sorted by risk
             
+        Raises:
+            OperationCancelled: If cancel_token was cancelled
+        """
+        mean_returns = self._mean_returns
+        bounds = self._bounds()
+        self.frontier_complete = True
+        check(cancel_token)
+        attempted = 0
+        
+        def stop() -> bool:
+            check(cancel_token)
+            if should_stop is not None and should_stop():
+                return True
+            if self._out_of_time():
+                self.frontier_complete = False
+                return True
+            return False
+        
+        def solve(objective, jac, x0: np.ndarray, target_return: Optional[float] = None) -> Optional[np.ndarray]:
+            nonlocal attempted
+            attempted += 1
             try:
                 result = minimize(
-                    portfolio_variance,
+                    objective,
                     x0,
+                    jac=jac,
                     method='SLSQP',
                     bounds=bounds,
-                    constraints=constraints,
+                    constraints=self._frontier_constraints(target_return),
                     options={'maxiter': 2000, 'ftol': 1e-9}
                 )
-                
-                if result.success:
-                    weights = result.x
-                    portfolio_return = float(np.dot(weights, mean_returns))
-                    portfolio_vol = float(np.sqrt(np.dot(weights.T, np.dot(cov_matrix, weights))))
-                    
-                    # Validate the point
-                    if portfolio_vol > 0 and np.isfinite(portfolio_return) and np.isfinite(portfolio_vol):
-                        efficient_frontier.append({
-                            'risk': portfolio_vol,
-                            'return': portfolio_return
-                        })
-            except Exception as e:
+            except Exception:
                 # Skip if optimization fails for this point
+                return None
+            return result.x if result.success else None
+        
+        # Solved points as (return, risk, weights), kept sorted by return; their returns
+        # are mirrored in solved_returns for bisect (insort's key= needs Python 3.10)
+        solved: List[Tuple[float, float, np.ndarray]] = []
+        solved_returns: List[float] = []
+        
+        def add(weights: np.ndarray) -> Optional[Tuple[float, float, np.ndarray]]:
+            portfolio_return = float(np.dot(weights, mean_returns))
+            portfolio_vol = float(np.sqrt(max(self._portfolio_variance(weights), 0.0)))
+            if not (portfolio_vol > 0 and np.isfinite(portfolio_return) and np.isfinite(portfolio_vol)):
+                return None
+            position = bisect.bisect(solved_returns, portfolio_return)
+            # Only the sorted neighbours can be within the duplicate tolerance
+            if any(abs(portfolio_return - solved_returns[i]) <= 1e-12
+                   for i in (position - 1, position) if 0 <= i < len(solved_returns)):
+                return None
+            entry = (portfolio_return, portfolio_vol, weights)
+            solved_returns.insert(position, portfolio_return)
+            solved.insert(position, entry)
+            if on_point is not None:
+                on_point(self._frontier_point(entry))
+            return entry
+        
+        equal_weights = np.ones(self.n_assets) / self.n_assets
+        
+        # Lower end: minimum variance portfolio
+        if stop():
+            return self._finish_frontier(solved, attempted)
+        min_variance_weights = solve(self._portfolio_variance, self._portfolio_variance_gradient, equal_weights)
+        if min_variance_weights is None or add(min_variance_weights) is None:
+            return self._finish_frontier(solved, attempted)
+        
+        # Upper end: maximum return portfolio
+        if stop():
+            return self._finish_frontier(solved, attempted)
+        max_return_weights = solve(lambda w: -np.dot(w, mean_returns), lambda w: -mean_returns, equal_weights)
+        if max_return_weights is None or add(max_return_weights) is None:
+            return self._finish_frontier(solved, attempted)
+        
+        # Chart extent, including the portfolio drawn next to the frontier
+        lower, upper = solved[0], solved[-1]
+        risks = [lower[1], upper[1]] + ([extend_beyond_risk] if extend_beyond_risk is not None else [])
+        returns = [lower[0], upper[0]] + ([extend_beyond_return] if extend_beyond_return is not None else [])
+        risk_scale = (max(risks) - min(risks)) or 1.0
+        return_scale = (max(returns) - min(returns)) or 1.0
+        
+        def chart(entry) -> np.ndarray:
+            return np.array([entry[1] / risk_scale, entry[0] / return_scale])
+        
+        def solve_between(low, high, target_return: float):
+            # Interpolated neighbours meet the target return exactly and all convex constraints
+            fraction = (target_return - low[0]) / (high[0] - low[0])
+            x0 = low[2] + fraction * (high[2] - low[2])
+            weights = solve(self._portfolio_variance, self._portfolio_variance_gradient, x0, target_return)
+            return add(weights) if weights is not None else None
+        
+        if extend_beyond_return is not None and lower[0] < extend_beyond_return < upper[0] and not stop():
+            solve_between(lower, upper, extend_beyond_return)
+        
+        # Refine the segment with the largest estimated error first. A segment's error is
+        # unknown until its midpoint is solved; the halves of a segment whose midpoint
+        # deviated by d are estimated at d / 4 (the deviation of a smooth curve shrinks
+        # quadratically with the segment length).
+        heap = []
+        
+        def push(low, high, estimated_deviation: float) -> None:
+            length = float(np.linalg.norm(chart(high) - chart(low)))
+            priority = max(estimated_deviation / tolerance, length / FRONTIER_MAX_SEGMENT)
+            if priority > 1 and length > tolerance:
+                heapq.heappush(heap, (-priority, low[0], high[0]))
+        
+        for low, high in zip(solved, solved[1:]):
+            push(low, high, float('inf'))
+        
+        while heap and attempted < num_points and not stop():
+            _, low_return, high_return = heapq.heappop(heap)
+            low = next(entry for entry in solved if entry[0] == low_return)
+            high = next(entry for entry in solved if entry[0] == high_return)
+            middle = solve_between(low, high, (low_return + high_return) / 2)
+            if middle is None:
                 continue
+            
+            # Distance of the midpoint from the straight segment, in chart units
+            a, b, m = chart(low), chart(high), chart(middle)
+            chord = b - a
+            deviation = abs(chord[0] * (m - a)[1] - chord[1] * (m - a)[0]) / (np.linalg.norm(chord) or 1.0)
+            push(low, middle, deviation / 4)
+            push(middle, high, deviation / 4)
         
-        # Sort by risk to ensure proper curve shape
-        efficient_frontier.sort(key=lambda x: x['risk'])
-        
-        # Filter out duplicate or invalid points
-        filtered_frontier = []
-        prev_risk = None
-        for point in efficient_frontier:
-            # Skip if risk is too close to previous point (within 0.1%)
-            if prev_risk is None or abs(point['risk'] - prev_risk) / prev_risk > 0.001:
-                filtered_frontier.append(point)
-                prev_risk = point['risk']
-        
-        # Always extend beyond current portfolio point to show the frontier continues
-        # This ensures the curve extends past the red dot on the chart
-        # Generate additional data points beyond the current portfolio for the chart
-        if extend_beyond_risk is not None and extend_beyond_return is not None and len(filtered_frontier) > 0:
-            max_risk_in_frontier = max(p['risk'] for p in filtered_frontier)
-            max_return_in_frontier = max(p['return'] for p in filtered_frontier)
+        return self._finish_frontier(solved, attempted)
+    
+    def _frontier_point(self, entry: Tuple[float, float, np.ndarray]) -> Dict:
+        portfolio_return, portfolio_vol, weights = entry
+        return {
+            'risk': portfolio_vol,
+            'return': portfolio_return,
+            'weights': {ticker: float(w) for ticker, w in zip(self.tickers, weights) if abs(w) >= 1e-6}
+        }
+    
+    def _finish_frontier(self, solved: List[Tuple[float, float, np.ndarray]], attempted: int) -> List[Dict]:
+        """Frontier points sorted by risk, with the solve counters recorded."""
+        frontier = sorted((self._frontier_point(entry) for entry in solved), key=lambda point: point['risk'])
+        telemetry.inc("frontier_points_total", attempted, outcome="attempted")
+        telemetry.inc("frontier_points_total", len(frontier), outcome="kept")
+        return frontier
+    
+    def bootstrap_moments(self, n_resamples: int, seed: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Moment estimates of bootstrap resamples of the returns window.
+        
+        Each resample draws as many rows as the window holds, with replacement. A
+        resample is kept as the number of times each row was drawn, and its moments are
+        count-weighted sums over the rows, so the resampled returns themselves are never
+        materialized. Without a returns history the periods are drawn from a normal
+        distribution with the optimizer's moments instead (parametric resampling over
+        one year of periods), in blocks of at most BOOTSTRAP_BLOCK_VALUES values.
+        
+        Args:
+            n_resamples: Number of moment sets
+            seed: Seed of the random draws
             
-            # Always extend beyond current portfolio to ensure the line continues past the red dot
-            # Check if we need to generate more points
-            needs_extension = (
-                extend_beyond_risk >= max_risk_in_frontier * 0.95 or  # Within 5% of max risk
-                extend_beyond_return >= max_return_in_frontier * 0.95 or  # Within 5% of max return
-                extend_beyond_risk > max_risk_in_frontier or  # Beyond max risk
-                extend_beyond_return > max_return_in_frontier  # Beyond max return
-            )
+        Returns:
+            Annualized means, shape (n_resamples, n_assets), and covariances, shape
+            (n_resamples, n_assets, n_assets)
+        """
+        rng = np.random.default_rng(seed)
+        n = self.n_assets
+        if self._returns_values is not None:
+            values = self._returns_values
+            n_periods = len(values)
+            draws = rng.integers(0, n_periods, size=(n_resamples, n_periods))
+            offsets = np.arange(n_resamples)[:, None] * n_periods
+            counts = np.bincount((draws + offsets).ravel(), minlength=n_resamples * n_periods)
+            counts = counts.reshape(n_resamples, n_periods).astype(float)
             
-            # Always extend to show the curve continues beyond the current portfolio
-            if needs_extension:
-                # Current portfolio is at or near the end of frontier - need to extend
-                # Use the last point in the frontier as the starting point
-                
-                # Estimate target return needed to reach current portfolio risk + buffer
-                # Use the slope from the last few points
-                if len(filtered_frontier) >= 2:
-                    last_point = filtered_frontier[-1]
-                    second_last_point = filtered_frontier[-2]
-                    
-                    # Generate additional points by optimizing for progressively higher returns
-                    # This maintains the curve shape naturally since each point is optimized
-                    # Use smaller increments to ensure smooth curve continuation
-                    last_point = filtered_frontier[-1]
-                    
-                    # Calculate return increment based on the last few points to maintain curve shape
-                    if len(filtered_frontier) >= 3:
-                        # Use last 3 points to estimate return increment per step
-                        p1 = filtered_frontier[-3]
-                        p2 = filtered_frontier[-2]
-                        p3 = filtered_frontier[-1]
-                        
-                        # Calculate average return increment from last points
-                        return_inc1 = p2['return'] - p1['return']
-                        return_inc2 = p3['return'] - p2['return']
-                        avg_return_increment = (return_inc1 + return_inc2) / 2 if (return_inc1 > 0 and return_inc2 > 0) else return_inc2 if return_inc2 > 0 else (max_return - min_return) / 100
-                    else:
-                        # Fallback: use a small increment
-                        avg_return_increment = (max_return - min_return) / 100
-                    
-                    # Generate target returns with small increments to maintain smooth curve
-                    # Start from just above the last point and extend well beyond current portfolio
-                    start_return = last_point['return'] + avg_return_increment * 0.3
-                    # Extend to at least 40% beyond current portfolio return, ensuring we have enough points
-                    target_extension = max(
-                        extend_beyond_return * 1.4,  # 40% beyond current portfolio
-                        last_point['return'] + avg_return_increment * 30,  # Or 30 increments
-                        last_point['return'] * 1.3  # At least 30% more return than last point
-                    )
-                    end_return = target_extension
-                    num_extra_points = 60  # More points for smoother curve beyond current portfolio
-                    extra_returns = np.linspace(start_return, end_return, num_extra_points)
-                    
-                    # Use last successful weights as starting point
-                    # Start with equal weights but biased towards higher return assets for better convergence
-                    x0_start = np.ones(self.n_assets) / self.n_assets
-                    if len(mean_returns) > 0:
-                        # Bias towards assets with higher expected returns
-                        return_weights = mean_returns / mean_returns.sum()
-                        x0_start = 0.6 * x0_start + 0.4 * return_weights
-                        # Normalize to ensure it sums to 1
-                        x0_start = x0_start / x0_start.sum()
-                    
-                    successful_points = 0
-                    for extra_return in extra_returns:
-                        def make_return_constraint(tr):
-                            return lambda w: np.dot(w, mean_returns) - tr
-                        
-                        constraints = [
-                            {'type': 'eq', 'fun': lambda w: np.sum(w) - 1.0},
-                            {'type': 'eq', 'fun': make_return_constraint(extra_return)}
-                        ]
-                        
-                        if self.portfolio_type == "long_short":
-                            constraints.append({
-                                'type': 'ineq',
-                                'fun': lambda w: 1.5 - np.sum(np.abs(w))
-                            })
-                        
-                        try:
-                            result = minimize(
-                                portfolio_variance,
-                                x0_start,
-                                method='SLSQP',
-                                bounds=bounds,
-                                constraints=constraints,
-                                options={'maxiter': 2000, 'ftol': 1e-9}
-                            )
-                            
-                            if result.success:
-                                weights = result.x
-                                portfolio_return = float(np.dot(weights, mean_returns))
-                                portfolio_vol = float(np.sqrt(np.dot(weights.T, np.dot(cov_matrix, weights))))
-                                
-                                if portfolio_vol > 0 and np.isfinite(portfolio_return) and np.isfinite(portfolio_vol):
-                                    # Priority 1: Add if beyond current portfolio (this is most important)
-                                    # Priority 2: Add if extends beyond last point (for smooth curve)
-                                    # This ensures we always get points beyond the current portfolio
-                                    beyond_current_portfolio = (
-                                        portfolio_vol >= extend_beyond_risk * 0.99 or  # At or beyond current portfolio risk
-                                        portfolio_return >= extend_beyond_return * 0.99  # At or beyond current portfolio return
-                                    )
-                                    
-                                    extends_last_point = (
-                                        portfolio_vol >= last_point['risk'] * 0.998 or  # At least 99.8% of last risk
-                                        portfolio_return >= last_point['return'] * 0.998  # At least 99.8% of last return
-                                    )
-                                    
-                                    # Add point if it's beyond current portfolio OR extends beyond last point
-                                    # This ensures we get points beyond the current portfolio even if optimization results vary slightly
-                                    if beyond_current_portfolio or extends_last_point:
-                                        filtered_frontier.append({
-                                            'risk': portfolio_vol,
-                                            'return': portfolio_return
-                                        })
-                                        # Update starting point for next iteration using successful weights
-                                        x0_start = weights
-                                        successful_points += 1
-                                        
-                                        # Stop if we've extended well beyond the current portfolio (40% buffer)
-                                        if portfolio_vol > extend_beyond_risk * 1.4 and portfolio_return > extend_beyond_return * 1.4:
-                                            break
-                        except:
-                            continue
-                    
-                    # Re-sort after adding extra points
-                    filtered_frontier.sort(key=lambda x: x['risk'])
-        
-        return filtered_frontier
\ No newline at end of file
+            # Centering on the window mean keeps the raw second moments accurate
+            center = values.mean(axis=0)
+            shifted = values - center
+            outer = (shifted[:, :, None] * shifted[:, None, :]).reshape(n_periods, n * n)
+            means = counts @ shifted / n_periods
+            second_moments = (counts @ outer).reshape(n_resamples, n, n) / n_periods
+            covariances = (second_moments - means[:, :, None] * means[:, None, :]) * n_periods / (n_periods - 1)
+            means += center
+        else:
+            periods = self.periods_per_year
+            period_cholesky = self.moments.cholesky / np.sqrt(periods)
+            means = np.empty((n_resamples, n))
+            covariances = np.empty((n_resamples, n, n))
+            block = max(1, BOOTSTRAP_BLOCK_VALUES // (periods * n))
+            for start in range(0, n_resamples, block):
+                stop = min(start + block, n_resamples)
+                shocks = rng.standard_normal((stop - start, periods, n))
+                samples = self._mean_returns / periods + shocks @ period_cholesky.T
+                means[start:stop] = samples.mean(axis=1)
+                centered = samples - means[start:stop, None, :]
+                covariances[start:stop] = np.transpose(centered, (0, 2, 1)) @ centered / (periods - 1)
+        return means * self.periods_per_year, covariances * self.periods_per_year
+    
+    def _dense_covariance(self) -> np.ndarray:
+        if isinstance(self._cov_matrix, FactorCovariance):
+            return self._cov_matrix.to_dense()
+        return np.asarray(self._cov_matrix)
+    
+    def _kkt_weights(self, target_return: Optional[float] = None,
+                     start: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        """
+        Minimum-variance weights (at target_return, if given) from the KKT system of the
+        quadratic program, without an iterative solver.
+        
+        This is an active-set method. Long-only portfolios fix the assets whose weight
+        comes out negative at zero. Long/short portfolios whose leverage cap binds hold
+        each asset long or short, which makes the cap the linear constraint
+        sum(sign * w) = 1.5; assets that change sign are fixed at zero. Assets at zero
+        whose optimality condition fails are released. Each step changes one asset and
+        solves the system again. The result is returned only if it satisfies every
+        constraint and the optimality conditions, in which case it is the exact solution
+        of the constrained problem.
+        
+        Args:
+            target_return: Expected return to meet (None for the minimum-variance portfolio)
+            start: Weights whose long/short/zero pattern the search starts from (e.g. the
+                previous frontier point's); default all assets held
+        
+        Returns:
+            The weights, or None if the SLSQP solve is needed
+        """
+        n = self.n_assets
+        covariance = self._dense_covariance()
+        rows = [np.ones(n)] + ([self._mean_returns] if target_return is not None else [])
+        rhs = [1.0] + ([target_return] if target_return is not None else [])
+        
+        def solve(signs: np.ndarray, leverage: bool):
+            held = np.flatnonzero(signs)
+            constraint_matrix = np.array(rows + [signs] if leverage else rows)
+            n_constraints = len(constraint_matrix)
+            size = len(held)
+            if size < n_constraints:
+                return None
+            kkt = np.zeros((size + n_constraints, size + n_constraints))
+            kkt[:size, :size] = 2 * covariance[np.ix_(held, held)]
+            kkt[size:, :size] = constraint_matrix[:, held]
+            kkt[:size, size:] = constraint_matrix[:, held].T
+            try:
+                solution = np.linalg.solve(kkt, np.concatenate([np.zeros(size), rhs, [1.5] if leverage else []]))
+            except np.linalg.LinAlgError:
+                return None
+            weights = np.zeros(n)
+            weights[held] = solution[:size]
+            multipliers = solution[size:]
+            # Gradient of the Lagrangian without the leverage term, for the assets at zero
+            outside = np.flatnonzero(signs == 0)
+            reduced_gradient = 2 * covariance[outside] @ weights + np.array(rows)[:, outside].T @ multipliers[:len(rows)]
+            return weights, multipliers, outside, reduced_gradient
+        
+        signs = np.ones(n)
+        leverage = False
+        if self.portfolio_type == "long_only":
+            if start is not None:
+                signs = (start > 1e-10).astype(float)
+        else:
+            unconstrained = solve(signs, False)
+            if unconstrained is None:
+                return None
+            weights = unconstrained[0]
+            if np.sum(np.abs(weights)) <= 1.5 + 1e-9:
+                return weights if self._is_feasible(weights) else None
+            # The leverage cap binds: search over long/short patterns
+            leverage = True
+            signs = np.sign(start if start is not None and np.sum(np.abs(start)) > 1.5 - 1e-6 else weights)
+        
+        for _ in range(2 * n):
+            solved = solve(signs, leverage)
+            if solved is None:
+                return None
+            weights, multipliers, outside, reduced_gradient = solved
+            
+            held = np.flatnonzero(signs)
+            wrong_sign = weights[held] * signs[held]
+            if wrong_sign.min() < -1e-10:
+                signs[held[np.argmin(wrong_sign)]] = 0
+                continue
+            
+            if leverage:
+                # Multiplier of the cap: negative means the cap does not bind at the optimum
+                cap_multiplier = multipliers[-1]
+                if cap_multiplier < -1e-8:
+                    return None
+                # An asset at zero must not lower the Lagrangian when bought or sold
+                violation = np.abs(reduced_gradient) - cap_multiplier
+                if len(outside) and violation.max() > 1e-8:
+                    worst = np.argmax(violation)
+                    signs[outside[worst]] = -np.sign(reduced_gradient[worst])
+                    continue
+            elif len(outside) and reduced_gradient.min() < -1e-8:
+                # An asset held at zero must not lower the Lagrangian when bought
+                signs[outside[np.argmin(reduced_gradient)]] = 1
+                continue
+            return weights if self._is_feasible(weights) else None
+        return None
+    
+    def _split_frontier_solve(self, target_return: Optional[float], x0: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Long/short minimum-variance solve with the weights split as w = u - v (u, v >= 0).
+        
+        The leverage cap becomes the linear constraint sum(u + v) <= 1.5, so SLSQP works on a
+        smooth problem instead of the kink of |w| and converges in a few iterations.
+        """
+        n = self.n_assets
+        mean_returns = self._mean_returns
+        covariance = self._cov_matrix
+        signs = np.concatenate([np.ones(n), -np.ones(n)])
+        
+        def variance(x):
+            w = x[:n] - x[n:]
+            return float(np.dot(w, covariance @ w))
+        
+        def gradient(x):
+            g = 2 * (covariance @ (x[:n] - x[n:]))
+            return np.concatenate([g, -g])
+        
+        constraints = [
+            {'type': 'eq', 'fun': lambda x: np.dot(signs, x) - 1.0, 'jac': lambda x: signs},
+            {'type': 'ineq', 'fun': lambda x: 1.5 - np.sum(x), 'jac': lambda x: -np.ones(2 * n)}
+        ]
+        if target_return is not None:
+            split_returns = np.concatenate([mean_returns, -mean_returns])
+            constraints.append({'type': 'eq', 'fun': lambda x: np.dot(split_returns, x) - target_return,
+                                'jac': lambda x: split_returns})
+        try:
+            result = minimize(variance, np.concatenate([np.maximum(x0, 0.0), np.maximum(-x0, 0.0)]), jac=gradient,
+                              method='SLSQP', bounds=[(0.0, 1.0)] * (2 * n), constraints=constraints,
+                              options={'maxiter': 2000, 'ftol': 1e-9})
+        except Exception:
+            return None
+        return result.x[:n] - result.x[n:] if result.success else None
+    
+    def _max_return_weights(self) -> Optional[np.ndarray]:
+        """Maximum-return portfolio from a linear program (weights split as w = u - v for long/short)."""
+        n = self.n_assets
+        if self.portfolio_type == "long_only":
+            result = linprog(-self._mean_returns, A_eq=np.ones((1, n)), b_eq=[1.0], bounds=[(0.0, 1.0)] * n, method="highs")
+            return result.x if result.success else None
+        result = linprog(
+            np.concatenate([-self._mean_returns, self._mean_returns]),
+            A_ub=np.ones((1, 2 * n)), b_ub=[1.5],
+            A_eq=np.concatenate([np.ones(n), -np.ones(n)])[None, :], b_eq=[1.0],
+            bounds=[(0.0, 1.0)] * (2 * n), method="highs"
+        )
+        return result.x[:n] - result.x[n:] if result.success else None
+    
+    def rank_frontier(self, num_points: int = 20) -> np.ndarray:
+        """
+        Minimum-variance weights at num_points returns evenly spaced from the
+        minimum-variance to the maximum-return portfolio: the frontier indexed by return
+        rank, which is what the resampled frontier averages.
+        
+        Each target is solved from the KKT system when that is exact (see _kkt_weights),
+        starting from the assets held at the previous rank. Otherwise SLSQP solves it
+        (on split weights for long/short, see _split_frontier_solve), warm-started between
+        the previous point and the maximum-return portfolio, interpolated to the target return.
+        
+        Args:
+            num_points: Number of return ranks
+            
+        Returns:
+            Weights, shape (num_points, n_assets); rows of NaN where a solve failed
+        """
+        weights = np.full((num_points, self.n_assets), np.nan)
+        mean_returns = self._mean_returns
+        bounds = self._bounds()
+        
+        def solve(x0: np.ndarray, target_return: Optional[float] = None) -> Optional[np.ndarray]:
+            if self.portfolio_type == "long_short":
+                return self._split_frontier_solve(target_return, x0)
+            try:
+                result = minimize(self._portfolio_variance, x0, jac=self._portfolio_variance_gradient, method='SLSQP',
+                                  bounds=bounds, constraints=self._frontier_constraints(target_return),
+                                  options={'maxiter': 2000, 'ftol': 1e-9})
+            except Exception:
+                return None
+            return result.x if result.success else None
+        
+        def record(method: str, solution: Optional[np.ndarray]) -> Optional[np.ndarray]:
+            telemetry.inc("resampled_frontier_solves_total", outcome=method if solution is not None else "failed")
+            return solution
+        
+        min_variance_weights = self._kkt_weights()
+        if min_variance_weights is not None:
+            record("qp", min_variance_weights)
+        else:
+            equal_weights = np.ones(self.n_assets) / self.n_assets
+            min_variance_weights = record("slsqp", solve(equal_weights))
+        max_return_weights = record("lp", self._max_return_weights())
+        if min_variance_weights is None or max_return_weights is None:
+            return weights
+        
+        low, high = float(mean_returns @ min_variance_weights), float(mean_returns @ max_return_weights)
+        if high - low <= 1e-12:
+            weights[:] = min_variance_weights
+            return weights
+        weights[0], weights[-1] = min_variance_weights, max_return_weights
+        
+        previous, previous_return = min_variance_weights, low
+        for rank, target_return in enumerate(np.linspace(low, high, num_points)[1:-1], start=1):
+            # Neighbouring ranks hold nearly the same assets
+            solution = self._kkt_weights(target_return, start=previous)
+            if solution is not None:
+                record("qp", solution)
+            else:
+                fraction = (target_return - previous_return) / (high - previous_return)
+                x0 = previous + fraction * (max_return_weights - previous)
+                solution = record("slsqp", solve(x0, target_return))
+            if solution is not None:
+                weights[rank] = solution
+                previous, previous_return = solution, float(target_return)
+        return weights
+    
+    def resampled_frontier(self, n_resamples: int = 200, num_points: int = 20, seed: Optional[int] = None,
+                           executor: Optional[Executor] = None, chunk_size: int = RESAMPLE_CHUNK_SIZE) -> Dict[str, Any]:
+        """
+        Resampled (Michaud) efficient frontier.
+        
+        Bootstrap moment sets are drawn in one pass (see bootstrap_moments), the frontier of
+        each is solved by return rank (see rank_frontier), and the weights are averaged per
+        rank. Averaged weights satisfy the constraints because they are all convex.
+        
+        Args:
+            n_resamples: Number of bootstrap moment sets
+            num_points: Number of return ranks per frontier
+            seed: Seed of the bootstrap draws
+            executor: Solves chunks of chunk_size resamples in parallel if given
+                (e.g. a ProcessPoolExecutor); serial otherwise
+            chunk_size: Resamples per executor task
+            
+        Returns:
+            See aggregate_resampled_frontier
+        """
+        started = time.perf_counter()
+        means, covariances = self.bootstrap_moments(n_resamples, seed)
+        starts = range(0, n_resamples, chunk_size)
+        mapper = executor.map if executor is not None else map
+        chunks = mapper(
+            solve_resampled_frontiers,
+            [self.tickers] * len(starts),
+            [means[start:start + chunk_size] for start in starts],
+            [covariances[start:start + chunk_size] for start in starts],
+            [self.portfolio_type] * len(starts),
+            [num_points] * len(starts)
+        )
+        weights = np.concatenate(list(chunks))
+        return self.aggregate_resampled_frontier(weights, time.perf_counter() - started)
+    
+    def aggregate_resampled_frontier(self, weights: np.ndarray, wall_time_seconds: float) -> Dict[str, Any]:
+        """
+        Average resampled frontiers per return rank and measure their spread.
+        
+        All portfolios are evaluated on this optimizer's (unresampled) moments.
+        
+        Args:
+            weights: Rank frontiers of the resamples, shape (n_resamples, num_points, n_assets)
+            wall_time_seconds: Time taken to draw and solve the resamples
+            
+        Returns:
+            Dictionary with "resampled_frontier" (per rank: risk, return, averaged weights,
+            weights_std and the return_std and risk_std of the resampled portfolios),
+            "sample_frontier" (the frontier of the unresampled moments by the same ranks),
+            "n_resamples", "resamples_solved", "spread" (weight_std, return_std and risk_std
+            averaged over ranks) and "wall_time_seconds"
+        """
+        n_resamples, num_points, _ = weights.shape
+        solved = ~np.isnan(weights).any(axis=2)
+        if not solved.any():
+            raise ValueError("No resampled frontier could be solved")
+        
+        returns = weights @ self._mean_returns
+        variances = np.einsum('rpi,ij,rpj->rp', np.nan_to_num(weights), self._dense_covariance(), np.nan_to_num(weights))
+        risks = np.where(solved, np.sqrt(np.maximum(variances, 0.0)), np.nan)
+        
+        def holdings(values: np.ndarray) -> Dict[str, float]:
+            return {ticker: float(w) for ticker, w in zip(self.tickers, values) if abs(w) >= 1e-6}
+        
+        frontier, weight_std = [], []
+        for rank in range(num_points):
+            rank_weights = weights[solved[:, rank], rank]
+            if len(rank_weights) == 0:
+                continue
+            average, std = rank_weights.mean(axis=0), rank_weights.std(axis=0)
+            weight_std.append(float(std.mean()))
+            frontier.append({
+                'risk': self.moments.portfolio_volatility(average),
+                'return': self.moments.portfolio_return(average),
+                'weights': holdings(average),
+                'weights_std': holdings(std),
+                'return_std': float(np.nanstd(returns[:, rank])),
+                'risk_std': float(np.nanstd(risks[:, rank]))
+            })
+        
+        sample_frontier = [
+            {'risk': self.moments.portfolio_volatility(w), 'return': self.moments.portfolio_return(w), 'weights': holdings(w)}
+            for w in self.rank_frontier(num_points) if not np.isnan(w).any()
+        ]
+        return {
+            'resampled_frontier': frontier,
+            'sample_frontier': sample_frontier,
+            'n_resamples': int(n_resamples),
+            'resamples_solved': int(solved.all(axis=1).sum()),
+            'spread': {
+                'weight_std': float(np.mean(weight_std)),
+                'return_std': float(np.mean([point['return_std'] for point in frontier])),
+                'risk_std': float(np.mean([point['risk_std'] for point in frontier]))
+            },
+            'wall_time_seconds': float(wall_time_seconds)
+        }
+
+
+def solve_resampled_frontiers(tickers: List[str], means: np.ndarray, covariances: np.ndarray,
+                              portfolio_type: str, num_points: int) -> np.ndarray:
+    """
+    Rank frontiers of a chunk of resampled moment sets (a module-level function so it
+    can run in a worker process).
+    
+    Args:
+        tickers: Asset names
+        means: Annualized means, shape (chunk, n_assets)
+        covariances: Annualized covariances, shape (chunk, n_assets, n_assets)
+        portfolio_type: "long_only" or "long_short"
+        num_points: Number of return ranks
+        
+    Returns:
+        Weights, shape (chunk, num_points, n_assets)
+    """
+    return np.stack([
+        PortfolioOptimizer(moments=MomentsContext(tickers, mean, covariance), objective="min_variance",
+                           portfolio_type=portfolio_type).rank_frontier(num_points)
+        for mean, covariance in zip(means, covariances)
+    ])
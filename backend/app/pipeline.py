@@ -0,0 +1,701 @@
+import logging
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from .schemas import PortfolioRequest, PortfolioResponse, ComparisonRequest, ComparisonResponse, ResampledFrontierRequest
+from .data_loader import DataLoader
+from .optimizer import PortfolioOptimizer, RESTART_SEED
+from .metrics import RiskMetrics, PERIODS_PER_YEAR
+from .moments import MomentsContext
+from .encoding import dumps, format_dates, series_values
+from . import telemetry
+from .cancellation import CancellationToken, check
+
+logger = logging.getLogger(__name__)
+
+
+class MarketData:
+    """Everything /optimize needs from external providers, loaded before any computation."""
+
+    def __init__(self, prices: pd.DataFrame, returns: pd.DataFrame, esg_scores: Optional[Dict[str, float]],
+                 esg_weight: float, benchmark_prices: Optional[pd.DataFrame],
+                 return_panels: Optional[Dict[str, pd.DataFrame]] = None):
+        """
+        Args:
+            prices: Historical prices of the valid tickers (including the rolling-metrics buffer)
+            returns: Daily returns computed from prices
+            esg_scores: ESG scores by ticker, or None if ESG is disabled or unavailable
+            esg_weight: Effective ESG weight (0.0 if the ESG fetch failed)
+            benchmark_prices: SPY prices, or None if the benchmark fetch failed
+            return_panels: Weekly and/or monthly compounded returns already computed
+                (see DataLoader.resample_returns); missing panels are computed on first use
+        """
+        self.prices = prices
+        self.returns = returns
+        self.esg_scores = esg_scores
+        self.esg_weight = esg_weight
+        self.benchmark_prices = benchmark_prices
+        self.return_panels = dict(return_panels or {})
+
+    def returns_at(self, frequency: str = "daily") -> pd.DataFrame:
+        """Daily returns, or the weekly or monthly compounded return panel."""
+        if frequency == "daily":
+            return self.returns
+        if frequency not in self.return_panels:
+            self.return_panels[frequency] = DataLoader.resample_returns(self.returns, frequency)
+        return self.return_panels[frequency]
+
+    def cacheable_as_of(self, request: PortfolioRequest, as_of: date) -> bool:
+        """
+        Whether a response computed from this data may be cached under request_key(request, as_of).
+
+        The prices must end on the as-of close (a provider may not have published it
+        yet), and every source the request depends on must have loaded: a response
+        that fell back to no ESG blend or no benchmark would otherwise be served
+        until the next close to requests that asked for them.
+        """
+        if self.prices.empty or pd.Timestamp(self.prices.index[-1]).date() != as_of:
+            return False
+        if (request.esg_weight or 0.0) > 0 and not self.esg_scores:
+            return False
+        return "benchmark" not in request.sections() or self.benchmark_prices is not None
+
+
+def _fetch_esg_scores(tickers, cancel_token=None):
+    logger.info(f"Fetching ESG scores for {len(tickers)} tickers")
+    return DataLoader.fetch_esg_scores(tickers, cancel_token=cancel_token)
+
+
+@telemetry.span("fetch")
+def load_market_data(request: PortfolioRequest, cancel_token: Optional[CancellationToken] = None) -> MarketData:
+    """
+    Fetch prices, ESG scores and the SPY benchmark for a request (blocking I/O).
+
+    The ESG and benchmark fetches run concurrently with the price download; the
+    benchmark is only fetched if its response section was requested.
+
+    Args:
+        request: Portfolio optimization parameters
+        cancel_token: Stops the downloads between requests (e.g. client disconnected)
+
+    Returns:
+        MarketData for the request
+
+    Raises:
+        ValueError: If no valid price data is retrieved
+        OperationCancelled: If cancel_token was cancelled
+    """
+    data_loader = DataLoader(lookback_days=request.lookback_days, cancel_token=cancel_token)
+    esg_weight = request.esg_weight or 0.0
+    sections = request.sections()
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        esg_future = executor.submit(_fetch_esg_scores, request.tickers, cancel_token) if esg_weight > 0 else None
+        benchmark_future = executor.submit(data_loader.fetch_prices, ["SPY"]) if "benchmark" in sections else None
+
+        prices = data_loader.fetch_prices(request.tickers)
+        returns = data_loader.compute_returns(prices)
+        logger.info(f"Loaded {len(prices)} days of data for {len(request.tickers)} tickers")
+
+        esg_scores = None
+        if esg_future is not None:
+            try:
+                esg_scores = esg_future.result()
+                logger.info(f"Successfully fetched ESG scores for {len(esg_scores)} tickers")
+            except Exception as e:
+                logger.warning(f"Failed to fetch ESG scores: {str(e)}. Continuing without ESG optimization.")
+                esg_scores = None
+                esg_weight = 0.0
+
+        benchmark_prices = None
+        if benchmark_future is not None:
+            try:
+                benchmark_prices = benchmark_future.result()
+            except Exception as e:
+                logger.warning(f"Failed to fetch SPY benchmark data: {str(e)}. Continuing without benchmark.")
+
+    # A cancelled ESG fetch is indistinguishable from a failed one above; do not return partial data
+    check(cancel_token)
+    return MarketData(prices, returns, esg_scores, esg_weight, benchmark_prices)
+
+
+class SolvedPortfolio:
+    """Output of the solve stage, shared by the frontier and metrics stages."""
+
+    def __init__(self, weights: np.ndarray, solver_metrics: Dict[str, Any], moments: MomentsContext,
+                 deadline: Optional[float] = None):
+        """
+        Args:
+            weights: Optimal weights in moments.tickers order
+            solver_metrics: Metrics returned by PortfolioOptimizer.optimize
+            moments: Moments of the optimization window
+            deadline: time.monotonic() value at which the request's time budget runs out
+                (system-wide on Linux, so it holds across worker processes), or None
+        """
+        self.weights = weights
+        self.solver_metrics = solver_metrics
+        self.moments = moments
+        self.deadline = deadline
+    
+    def remaining_budget_ms(self) -> Optional[float]:
+        """Milliseconds left of the time budget, or None without a budget."""
+        if self.deadline is None:
+            return None
+        return max(0.0, (self.deadline - time.monotonic()) * 1000)
+
+
+def _optimization_window(request: PortfolioRequest, market_data: MarketData) -> pd.DataFrame:
+    # Use only the requested lookback period for optimization
+    # But keep all data for rolling metrics and price history
+    window = market_data.returns.tail(request.lookback_days)
+    frequency = request.frequency or "daily"
+    if frequency != "daily":
+        # The weekly/monthly periods ending within the lookback (the panel is built on first use)
+        panel = market_data.returns_at(frequency)
+        first_day = window.index[0]
+        window = panel.loc[panel.index >= first_day]
+        # Drop the leading period if it also compounds days before the lookback
+        earlier = market_data.returns.index[market_data.returns.index < first_day]
+        if len(earlier) and len(window) and panel.index[panel.index.searchsorted(earlier[-1])] == window.index[0]:
+            window = window.iloc[1:]
+    return window
+
+
+def _periods_per_year(request: PortfolioRequest) -> int:
+    return PERIODS_PER_YEAR[request.frequency or "daily"]
+
+
+def _optimizer(request: PortfolioRequest, market_data: MarketData, moments: MomentsContext,
+               time_budget_ms: Optional[float] = None) -> PortfolioOptimizer:
+    return PortfolioOptimizer(
+        returns=_optimization_window(request, market_data),
+        objective=request.objective,
+        portfolio_type=request.portfolio_type,
+        esg_scores=market_data.esg_scores,
+        esg_weight=market_data.esg_weight,
+        moments=moments,
+        time_budget_ms=time_budget_ms,
+        periods_per_year=_periods_per_year(request),
+        seed=RESTART_SEED
+    )
+
+
+@telemetry.span("moments")
+def window_moments(request: PortfolioRequest, market_data: MarketData) -> MomentsContext:
+    """
+    Moments of the request's optimization window with its covariance model.
+
+    Args:
+        request: Portfolio optimization parameters (lookback, frequency, covariance model, factors)
+        market_data: Data of the request's tickers, or of a whole batch universe
+
+    Returns:
+        MomentsContext for the columns of market_data.returns
+    """
+    # pca/shrinkage store the covariance as low-rank plus diagonal for large universes
+    covariance_model = request.covariance_model or "sample"
+    moments = MomentsContext.from_returns(_optimization_window(request, market_data), covariance_model,
+                                          request.n_factors or 10, _periods_per_year(request))
+    if covariance_model != "sample":
+        logger.info(f"Using {covariance_model} covariance with {moments.covariance.n_factors} factors")
+    return moments
+
+
+def solve_portfolio(request: PortfolioRequest, market_data: MarketData,
+                    moments: Optional[MomentsContext] = None,
+                    cancel_token: Optional[CancellationToken] = None) -> SolvedPortfolio:
+    """
+    Solve stage: estimate the moments of the optimization window and optimize.
+
+    The request's time budget (if any) starts here and is shared with the frontier stage.
+
+    Args:
+        request: Portfolio optimization parameters
+        market_data: Data loaded by load_market_data
+        moments: Precomputed moments of the optimization window (e.g. sliced from a batch universe)
+        cancel_token: Checked between optimizer restarts
+
+    Returns:
+        SolvedPortfolio with the optimal weights and shared moments
+    """
+    # Mean, covariance and Cholesky factor of the optimization window, computed once
+    # and shared by the optimizer, frontier, theoretical point and risk decomposition.
+    deadline = None
+    if request.time_budget_ms is not None:
+        deadline = time.monotonic() + request.time_budget_ms / 1000
+    if moments is None:
+        moments = window_moments(request, market_data)
+
+    optimizer = _optimizer(request, market_data, moments, request.time_budget_ms)
+    optimal_weights, solver_metrics = optimizer.optimize(cancel_token=cancel_token)
+    return SolvedPortfolio(optimal_weights, solver_metrics, moments, deadline)
+
+
+def compute_frontier(request: PortfolioRequest, market_data: MarketData, solved: SolvedPortfolio,
+                     on_point: Optional[Callable[[Dict[str, float]], None]] = None,
+                     cancel_token: Optional[CancellationToken] = None) -> Dict[str, Any]:
+    """
+    Frontier stage: efficient frontier and the portfolio's theoretical point on it.
+
+    Args:
+        request: Portfolio optimization parameters
+        market_data: Data loaded by load_market_data
+        solved: Output of the solve stage
+        on_point: Called with each frontier point as soon as it is solved (for streaming)
+        cancel_token: Checked before each frontier solve to abandon the frontier (e.g. client disconnected)
+
+    Returns:
+        Frontier fields of PortfolioResponse (empty if neither frontier nor metrics were
+        requested). Under a time budget it also has "frontier_complete"; combine it with
+        the metrics stage output through merge_frontier.
+    """
+    sections = request.sections()
+    result = {}
+    if "metrics" in sections or "frontier" in sections:
+        # Calculate theoretical expected return and volatility using same method as efficient frontier
+        # This ensures the current portfolio point appears on the frontier line
+        result["expected_return_theoretical"] = solved.moments.portfolio_return(solved.weights)
+        result["volatility_theoretical"] = solved.moments.portfolio_volatility(solved.weights)
+
+    if "frontier" in sections:
+        # Adaptive frontier with a point at the portfolio's return; the portfolio's
+        # risk and return are part of the chart extent the sampling tolerance refers to
+        optimizer = _optimizer(request, market_data, solved.moments, solved.remaining_budget_ms())
+        result["efficient_frontier"] = optimizer.calculate_efficient_frontier(
+            num_points=150,  # Upper bound; smooth frontiers need far fewer points
+            extend_beyond_return=result["expected_return_theoretical"],
+            extend_beyond_risk=result["volatility_theoretical"],
+            on_point=on_point,
+            cancel_token=cancel_token
+        )
+        if solved.deadline is not None:
+            result["frontier_complete"] = optimizer.frontier_complete
+    return result
+
+
+def stream_frontier(request: PortfolioRequest, market_data: MarketData, solved: SolvedPortfolio, points: Any,
+                    cancel_token: Optional[CancellationToken] = None) -> Dict[str, Any]:
+    """
+    compute_frontier that puts each frontier point on a queue as soon as it is solved.
+
+    Args:
+        points: Queue from ComputePool.message_queue
+        cancel_token: Checked before each frontier solve to abandon the frontier
+
+    Returns:
+        Output of compute_frontier
+    """
+    return compute_frontier(request, market_data, solved, on_point=points.put, cancel_token=cancel_token)
+
+
+def merge_frontier(result: Dict[str, Any], frontier: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Add compute_frontier output to compute_metrics output.
+
+    A frontier cut short by the time budget marks the whole result as partial.
+
+    Returns:
+        result, updated in place
+    """
+    frontier = dict(frontier)
+    frontier_complete = frontier.pop("frontier_complete", None)
+    result.update(frontier)
+    if frontier_complete is not None:
+        result["partial"] = bool(result.get("partial")) or not frontier_complete
+        result["convergence"] = {**(result.get("convergence") or {}), "frontier_complete": frontier_complete}
+    return result
+
+
+@telemetry.span("metrics")
+def compute_metrics(request: PortfolioRequest, market_data: MarketData, solved: SolvedPortfolio,
+                    cancel_token: Optional[CancellationToken] = None) -> Dict[str, Any]:
+    """
+    Metrics stage: weights, performance metrics and all requested time series.
+
+    Args:
+        request: Portfolio optimization parameters
+        market_data: Data loaded by load_market_data
+        solved: Output of the solve stage
+        cancel_token: Checked between the response sections
+
+    Returns:
+        PortfolioResponse fields other than the frontier ones
+    """
+    prices = market_data.prices
+    returns = market_data.returns
+    optimal_weights = solved.weights
+
+    # Convert weights array to dictionary (tickers without enough data were dropped by the loader)
+    weights_dict = {ticker: float(weight) for ticker, weight in zip(solved.moments.tickers, optimal_weights)}
+
+    # Calculate portfolio returns for additional metrics using all available data
+    # This ensures rolling metrics have enough historical data
+    portfolio_returns = (returns * optimal_weights).sum(axis=1)
+    result = {
+        "weights": weights_dict,
+        "expected_return": float(portfolio_returns.mean() * 252),
+        "volatility": RiskMetrics.calculate_volatility(portfolio_returns)
+    }
+
+    # Stages below are skipped unless their response section was requested
+    sections = request.sections()
+
+    # Columnar responses share one date axis (the price index) across all time series
+    dates = prices.index if request.series_format == "columnar" else None
+    if dates is not None:
+        result["dates"] = format_dates(dates)
+
+    if "metrics" in sections:
+        result.update(_performance_metrics(portfolio_returns, result["expected_return"]))
+        # Get total leverage from metrics if available
+        result["total_leverage"] = solved.solver_metrics.get("total_leverage", None)
+
+        # Calculate portfolio cumulative returns
+        portfolio_cumulative = (1 + portfolio_returns).cumprod()
+        result["portfolio_returns"] = _format_series(portfolio_cumulative, dates)
+
+    check(cancel_token)
+    result.update(_shared_series(request, market_data, dates))
+
+    check(cancel_token)
+    if "risk" in sections:
+        # Calculate risk decomposition over the optimization window (same covariance as the optimizer)
+        result["risk_decomposition"] = RiskMetrics.calculate_risk_decomposition(
+            _optimization_window(request, market_data), optimal_weights, cov_matrix=solved.moments.covariance,
+            periods_per_year=_periods_per_year(request)
+        )
+
+    check(cancel_token)
+    if "rolling" in sections:
+        result["rolling_metrics"] = _rolling_metrics(portfolio_returns, request.lookback_days, dates)
+
+    if "esg" in sections:
+        result.update(_esg_summary(request.tickers, weights_dict, market_data.esg_scores, market_data.esg_weight))
+
+    if "convergence" in solved.solver_metrics:
+        result["partial"] = solved.solver_metrics["partial"]
+        result["convergence"] = solved.solver_metrics["convergence"]
+
+    return result
+
+
+def load_universe_data(requests: List[PortfolioRequest]) -> MarketData:
+    """
+    Fetch the union of the tickers of many requests once (blocking I/O).
+
+    History covers the longest lookback; ESG scores and the benchmark are fetched
+    if any request needs them.
+
+    Args:
+        requests: Portfolio optimization requests of a batch
+
+    Returns:
+        MarketData for every ticker with sufficient history
+    """
+    # Validation (ticker caps) already ran per request; the union only drives the fetch
+    universe_request = PortfolioRequest.model_construct(
+        tickers=list(dict.fromkeys(ticker for request in requests for ticker in request.tickers)),
+        lookback_days=max(request.lookback_days for request in requests),
+        esg_weight=max(request.esg_weight or 0.0 for request in requests),
+        include=["benchmark"] if any("benchmark" in request.sections() for request in requests) else ["weights"],
+        exclude=None
+    )
+    return load_market_data(universe_request)
+
+
+def market_data_subset(universe: MarketData, request: PortfolioRequest) -> MarketData:
+    """
+    The part of a batch universe a single request would have loaded on its own.
+
+    Rows are limited to the history a standalone fetch with the request's lookback
+    covers, and columns to the request's tickers (in request order).
+
+    Raises:
+        ValueError: If none of the request's tickers have sufficient data
+    """
+    tickers = [ticker for ticker in dict.fromkeys(request.tickers) if ticker in universe.prices.columns]
+    if not tickers:
+        raise ValueError("No tickers with sufficient historical data")
+
+    start = DataLoader(lookback_days=request.lookback_days).history_start()
+    prices = universe.prices.loc[universe.prices.index >= start, tickers]
+    returns = universe.returns.loc[universe.returns.index >= start, tickers]
+    # Panels the universe already built are sliced; any other is built by the subset on first use
+    return_panels = {
+        frequency: panel.loc[panel.index >= start, tickers] for frequency, panel in universe.return_panels.items()
+    }
+
+    esg_scores = None
+    esg_weight = 0.0
+    if universe.esg_scores and (request.esg_weight or 0.0) > 0:
+        esg_scores = {ticker: score for ticker, score in universe.esg_scores.items() if ticker in tickers}
+        esg_weight = request.esg_weight
+    return MarketData(prices, returns, esg_scores, esg_weight, universe.benchmark_prices, return_panels)
+
+
+def compute_portfolio(request: PortfolioRequest, market_data: MarketData,
+                      moments: Optional[MomentsContext] = None,
+                      cancel_token: Optional[CancellationToken] = None) -> Dict[str, Any]:
+    """
+    Run the CPU-bound part of /optimize: optimization, frontier and all metrics.
+
+    Pure function of its (picklable) inputs so it can run in a worker process.
+
+    Args:
+        request: Portfolio optimization parameters
+        market_data: Data loaded by load_market_data
+        moments: Precomputed moments of the optimization window (see solve_portfolio)
+        cancel_token: Checked between restarts, frontier solves and stages; pass it
+            through ComputePool.run to cancel from the parent process
+
+    Returns:
+        Keyword arguments for PortfolioResponse (only the requested sections). With
+        series_format "columnar" the time series are float arrays aligned to a shared
+        "dates" array instead (see encoding.dumps).
+    """
+    solved = solve_portfolio(request, market_data, moments, cancel_token)
+    result = compute_metrics(request, market_data, solved, cancel_token)
+    merge_frontier(result, compute_frontier(request, market_data, solved, cancel_token=cancel_token))
+    logger.info(f"Optimization successful. Sections: {', '.join(sorted(request.sections()))}")
+    return result
+
+
+def comparison_frontier(request: ComparisonRequest, market_data: MarketData,
+                        solved: Dict[str, SolvedPortfolio]) -> List[Dict[str, Any]]:
+    """
+    One efficient frontier for all compared objectives.
+
+    The frontier only depends on the shared moments and constraints; its sampling
+    covers the riskiest and highest-return objective so every portfolio is drawn
+    against a smooth curve.
+
+    Args:
+        request: Comparison parameters
+        market_data: Data loaded by load_market_data
+        solved: Solve stage output by objective (sharing one MomentsContext)
+
+    Returns:
+        Efficient frontier points sorted by risk
+    """
+    moments = next(iter(solved.values())).moments
+    returns = [moments.portfolio_return(portfolio.weights) for portfolio in solved.values()]
+    risks = [moments.portfolio_volatility(portfolio.weights) for portfolio in solved.values()]
+    frontier_request = request.objective_request(request.objectives[0])
+    return _optimizer(frontier_request, market_data, moments).calculate_efficient_frontier(
+        num_points=150,
+        extend_beyond_return=max(returns),
+        extend_beyond_risk=max(risks)
+    )
+
+
+def compute_comparison(request: ComparisonRequest, market_data: MarketData,
+                       solved: Dict[str, SolvedPortfolio]) -> Dict[str, Any]:
+    """
+    Metrics stage of a comparison: a per-objective weights/metrics table and a single
+    copy of the series that do not depend on the weights.
+
+    Args:
+        request: Comparison parameters
+        market_data: Data loaded by load_market_data
+        solved: Solve stage output by objective
+
+    Returns:
+        ComparisonResponse fields other than the frontier
+    """
+    sections = request.sections()
+    dates = market_data.prices.index if request.series_format == "columnar" else None
+    result = {"objectives": {}}
+    if dates is not None:
+        result["dates"] = format_dates(dates)
+    result.update(_shared_series(request, market_data, dates))
+
+    for objective, portfolio in solved.items():
+        # Price history and benchmark were added once above
+        objective_request = request.objective_request(objective).model_copy(
+            update={"exclude": list(set(request.exclude or []) | {"prices", "benchmark"})}
+        )
+        table = compute_metrics(objective_request, market_data, portfolio)
+        table.pop("dates", None)
+        if "esg" in sections:
+            result["esg_weight"] = table.pop("esg_weight")
+            result["ticker_esg_scores"] = table.pop("ticker_esg_scores")
+        if "metrics" in sections or "frontier" in sections:
+            table["expected_return_theoretical"] = portfolio.moments.portfolio_return(portfolio.weights)
+            table["volatility_theoretical"] = portfolio.moments.portfolio_volatility(portfolio.weights)
+        result["objectives"][objective] = table
+
+    logger.info(f"Compared objectives: {', '.join(solved)}")
+    return result
+
+
+def _resampling_optimizer(request: ResampledFrontierRequest, market_data: MarketData) -> PortfolioOptimizer:
+    # The frontier depends only on the moments and the constraints, not on the objective or ESG
+    return PortfolioOptimizer(
+        returns=_optimization_window(request, market_data),
+        objective="min_variance",
+        portfolio_type=request.portfolio_type,
+        periods_per_year=_periods_per_year(request)
+    )
+
+
+def bootstrap_resamples(request: ResampledFrontierRequest, market_data: MarketData) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Draw the bootstrap moment sets of a resampled frontier request.
+
+    Args:
+        request: Resampling parameters (window, resamples, seed)
+        market_data: Data loaded by load_market_data
+
+    Returns:
+        Annualized means and covariances (see PortfolioOptimizer.bootstrap_moments)
+    """
+    return _resampling_optimizer(request, market_data).bootstrap_moments(request.n_resamples, request.seed)
+
+
+def aggregate_resamples(request: ResampledFrontierRequest, market_data: MarketData,
+                        chunks: List[np.ndarray], wall_time_seconds: float) -> Dict[str, Any]:
+    """
+    Average the resampled rank frontiers and compare them with the sample frontier.
+
+    Args:
+        request: Resampling parameters
+        market_data: Data loaded by load_market_data
+        chunks: Rank frontiers of the resamples by chunk (see solve_resampled_frontiers)
+        wall_time_seconds: Time taken to draw and solve the resamples
+
+    Returns:
+        Keyword arguments for ResampledFrontierResponse
+    """
+    result = _resampling_optimizer(request, market_data).aggregate_resampled_frontier(np.concatenate(chunks), wall_time_seconds)
+    logger.info(f"Resampled frontier from {result['resamples_solved']}/{result['n_resamples']} resamples "
+                f"in {wall_time_seconds:.2f}s")
+    return result
+
+
+@telemetry.span("serialize")
+def encode_result(request: PortfolioRequest, result: Dict[str, Any], response_model=PortfolioResponse) -> bytes:
+    """Serialize a compute_portfolio (or compute_comparison) result for the requested series format."""
+    # Columnar payloads hold NumPy arrays and are serialized directly, without
+    # building per-point dicts or validating them
+    if request.series_format == "columnar":
+        return dumps(result)
+    return response_model(**result).model_dump_json().encode("utf-8")
+
+
+def _format_series(series: pd.Series, dates: Optional[pd.Index], value_key: str = "value"):
+    """
+    Time series as a list of {"date", value_key} records, or as a float array
+    aligned to the shared date axis when dates is given (columnar format).
+    """
+    if dates is not None:
+        return series_values(series, dates)
+    return [
+        {"date": str(date), value_key: float(value)}
+        for date, value in series.items()
+    ]
+
+
+def _shared_series(request: PortfolioRequest, market_data: MarketData, dates: Optional[pd.Index]) -> Dict[str, Any]:
+    """Price history and SPY benchmark, which do not depend on the portfolio weights."""
+    sections = request.sections()
+    prices = market_data.prices
+    result = {}
+
+    if "prices" in sections:
+        # Prepare price history data
+        price_history = {}
+        for ticker in request.tickers:
+            if ticker in prices.columns:
+                price_history[ticker] = _format_series(prices[ticker], dates, value_key="price")
+        result["price_history"] = price_history
+
+    # SPY benchmark for comparison
+    benchmark_prices = market_data.benchmark_prices
+    if "benchmark" in sections and benchmark_prices is not None and "SPY" in benchmark_prices.columns:
+        benchmark_returns = benchmark_prices.pct_change().dropna()
+        benchmark_cumulative = (1 + benchmark_returns["SPY"]).cumprod()
+        result["benchmark_returns"] = _format_series(benchmark_cumulative, dates)
+
+    return result
+
+
+def _performance_metrics(portfolio_returns: pd.Series, expected_return: float) -> Dict[str, Any]:
+    """Sharpe, Sortino, Calmar and max drawdown of the (daily) portfolio return series."""
+    max_drawdown = RiskMetrics.calculate_max_drawdown(portfolio_returns)
+
+    # Calculate Calmar ratio
+    calmar_ratio = None
+    if max_drawdown < 0:
+        calmar_ratio = float(expected_return / abs(max_drawdown))
+
+    return {
+        "sharpe_ratio": RiskMetrics.calculate_sharpe_ratio(portfolio_returns),
+        "sortino_ratio": RiskMetrics.calculate_sortino_ratio(portfolio_returns),
+        "calmar_ratio": calmar_ratio,
+        "max_drawdown": max_drawdown
+    }
+
+
+def _rolling_metrics(portfolio_returns: pd.Series, lookback_days: int,
+                     dates: Optional[pd.Index] = None) -> Dict[str, Any]:
+    """
+    Rolling Sharpe ratio and volatility (30/60/90 days) over the lookback period.
+
+    Metrics are computed on all available data (the data loader fetches extra buffer
+    days before the lookback period) and only the lookback period is returned, so the
+    first returned value already has the full rolling window history. In columnar
+    format, days outside the lookback period are null.
+    """
+    lookback_start_index = len(portfolio_returns) - lookback_days
+    rolling_metrics_data = {}
+    for window in (30, 60, 90):
+        rolling_metrics_data[f"sharpe_{window}"] = RiskMetrics.calculate_rolling_sharpe_ratio(portfolio_returns, window=window)
+    for window in (30, 60, 90):
+        rolling_metrics_data[f"volatility_{window}"] = RiskMetrics.calculate_rolling_volatility(portfolio_returns, window=window)
+
+    if dates is not None:
+        return {
+            name: series_values(series.iloc[lookback_start_index:], dates)
+            for name, series in rolling_metrics_data.items()
+        }
+
+    # Filter out NaN values and convert to response format
+    return {
+        name: [
+            {"date": str(date), "value": float(value)}
+            for date, value in series.iloc[lookback_start_index:].items()
+            if pd.notna(value) and not np.isnan(value)
+        ]
+        for name, series in rolling_metrics_data.items()
+    }
+
+
+def _esg_summary(tickers: List[str], weights: Dict[str, float], esg_scores: Optional[Dict[str, float]],
+                 esg_weight: float) -> Dict[str, Any]:
+    """ESG weight used, weighted average portfolio ESG score and per-ticker scores."""
+    portfolio_esg_score = None
+    ticker_esg_scores_dict = None
+    if esg_scores:
+        # Calculate weighted average ESG score
+        portfolio_esg = 0.0
+        total_weight = 0.0
+        ticker_esg_scores_dict = {}
+
+        for ticker in tickers:
+            if ticker in esg_scores:
+                ticker_esg_scores_dict[ticker] = float(esg_scores[ticker])
+                weight = weights.get(ticker, 0.0)
+                portfolio_esg += abs(weight) * esg_scores[ticker]  # Use absolute weight
+                total_weight += abs(weight)
+
+        if total_weight > 0:
+            portfolio_esg_score = float(portfolio_esg / total_weight)
+
+    return {
+        "esg_weight": float(esg_weight) if esg_weight > 0 else None,
+        "portfolio_esg_score": portfolio_esg_score,
+        "ticker_esg_scores": ticker_esg_scores_dict
+    }
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import time
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+from .schemas import PortfolioRequest
+from .compute_pool import ComputePool
+from .pipeline import load_market_data, compute_portfolio, encode_result
+from .result_cache import ResultCache, request_key, last_market_close
+from .scheduling import MarketCloseSchedule
+
+logger = logging.getLogger(__name__)
+
+
+def preset_request(preset: Dict[str, Any], lookback_days: int = 252) -> PortfolioRequest:
+    """The /optimize request a preset click sends by default (long-only, suggested objective and ESG weight)."""
+    return PortfolioRequest(
+        tickers=preset["tickers"],
+        objective=preset.get("suggested_objective", "sharpe"),
+        portfolio_type="long_only",
+        lookback_days=lookback_days,
+        esg_weight=preset.get("suggested_esg_weight", 0.0)
+    )
+
+
+class PresetRefresher:
+    """
+    Precomputes every portfolio preset after each market close.
+
+    Full /optimize responses are kept in a dedicated cache (never evicted by other
+    requests) under the same canonical key /optimize uses, and a summary per preset
+    is kept for /portfolio-presets.
+    """
+
+    def __init__(self, presets: List[Dict[str, Any]], compute_pool: ComputePool, lookback_days: int = 252,
+                 max_concurrency: int = 1, delay_after_close: timedelta = timedelta(minutes=30)):
+        """
+        Initialize refresher.
+
+        Args:
+            presets: Presets from portfolio_presets.json
+            compute_pool: Pool used for downloads and optimizations
+            lookback_days: Lookback of the precomputed requests
+            max_concurrency: Presets refreshed at the same time
+            delay_after_close: See MarketCloseSchedule
+        """
+        self.presets = presets
+        self.compute_pool = compute_pool
+        self.lookback_days = lookback_days
+        self.max_concurrency = max_concurrency
+
+        self.cache = ResultCache(max_entries=max(1, len(presets)), name="preset")
+        self.summaries: Dict[str, Dict[str, Any]] = {}
+        # Only a refresh in which every preset failed (e.g. a provider outage) is retried
+        self.schedule = MarketCloseSchedule("preset", self._refresh_any, delay_after_close)
+
+    async def _refresh_preset(self, preset: Dict[str, Any], slots: asyncio.Semaphore) -> bool:
+        as_of = last_market_close().date()
+        async with slots:
+            try:
+                request = preset_request(preset, self.lookback_days)
+                market_data = await self.compute_pool.run_io(load_market_data, request)
+                # Background work waits for a compute slot instead of being rejected
+                result = await self.compute_pool.run(compute_portfolio, request, market_data, wait=True)
+                body = await self.compute_pool.run_io(encode_result, request, result)
+            except Exception as e:
+                logger.warning(f"Failed to precompute preset {preset.get('id')}: {str(e)}")
+                return False
+
+        if not market_data.cacheable_as_of(request, as_of):
+            # Retried by the schedule if no preset could be refreshed yet
+            logger.warning(f"Not caching preset {preset.get('id')}: data incomplete as of {as_of}")
+            return False
+
+        self.cache.put(request_key(request, as_of), body)
+        self.summaries[preset["id"]] = {
+            "objective": request.objective,
+            "lookback_days": request.lookback_days,
+            "as_of": as_of.isoformat(),
+            "weights": result["weights"],
+            "expected_return": result["expected_return"],
+            "volatility": result["volatility"],
+            "sharpe_ratio": result.get("sharpe_ratio"),
+            "max_drawdown": result.get("max_drawdown")
+        }
+        return True
+
+    async def refresh(self) -> int:
+        """
+        Optimize every preset with bounded concurrency.
+
+        Returns:
+            Number of presets refreshed successfully
+        """
+        started = time.monotonic()
+        slots = asyncio.Semaphore(self.max_concurrency)
+        outcomes = await asyncio.gather(*[self._refresh_preset(preset, slots) for preset in self.presets])
+        refreshed = sum(outcomes)
+        logger.info(f"Precomputed {refreshed}/{len(self.presets)} presets in {time.monotonic() - started:.1f}s")
+        return refreshed
+
+    def summary(self, preset_id: str) -> Optional[Dict[str, Any]]:
+        """Summary of the precomputed result for a preset, if it is still current."""
+        summary = self.summaries.get(preset_id)
+        if summary is None or summary["as_of"] != last_market_close().date().isoformat():
+            return None
+        return summary
+
+    async def _refresh_any(self) -> bool:
+        return await self.refresh() > 0
+
+    def start(self) -> None:
+        """Refresh now and then after every market close, in the background."""
+        if self.presets:
+            self.schedule.start()
+
+    async def stop(self) -> None:
+        await self.schedule.stop()
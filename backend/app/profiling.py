@@ -0,0 +1,95 @@
+import cProfile
+import hmac
+import os
+import pstats
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Rows of the hot-function table attached to profiled responses
+PROFILE_TOP_N = 25
+
+# Functions whose cumulative time is reported as the per-stage breakdown
+STAGE_FUNCTIONS = {
+    "moments": ("pipeline.py", "window_moments"),
+    "optimize": ("optimizer.py", "optimize"),
+    "frontier": ("optimizer.py", "calculate_efficient_frontier"),
+    "metrics": ("pipeline.py", "compute_metrics"),
+}
+
+
+def profiling_allowed(admin_token: Optional[str]) -> bool:
+    """
+    Whether a request may be profiled: always when PROFILING_ENABLED=1, otherwise
+    only with an X-Admin-Token header matching the ADMIN_TOKEN environment variable.
+    """
+    if os.getenv("PROFILING_ENABLED") == "1":
+        return True
+    expected = os.getenv("ADMIN_TOKEN")
+    return bool(expected) and admin_token is not None and hmac.compare_digest(admin_token, expected)
+
+
+def _short_path(filename: str) -> str:
+    """Path relative to site-packages or the backend directory, for readable tables."""
+    for marker in ("site-packages/", "backend/"):
+        if marker in filename:
+            return filename.split(marker, 1)[1]
+    return filename
+
+
+def _hot_functions(stats: pstats.Stats, top: int) -> List[Dict[str, Any]]:
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:top]
+    return [
+        {
+            "function": f"{_short_path(filename)}:{line}({name})",
+            "calls": calls,
+            "total_time": round(total_time, 6),
+            "cumulative_time": round(cumulative_time, 6)
+        }
+        for (filename, line, name), (_, calls, total_time, cumulative_time, _) in rows
+    ]
+
+
+def _stage_times(stats: pstats.Stats) -> Dict[str, float]:
+    stages = {}
+    for (filename, _, name), (_, _, _, cumulative_time, _) in stats.stats.items():
+        for stage, (module, function) in STAGE_FUNCTIONS.items():
+            if name == function and filename.endswith(module):
+                stages[stage] = round(stages.get(stage, 0.0) + cumulative_time, 6)
+    return stages
+
+
+def profile_call(fn: Callable, *args: Any) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Run fn under cProfile (deterministic profiler) in the current process.
+
+    If PROFILE_DIR is set, the raw stats are also written there as a .prof file
+    (readable with pstats or snakeviz).
+
+    Args:
+        fn: Function to profile (e.g. compute_portfolio)
+        *args: Its arguments
+
+    Returns:
+        Tuple of (fn's result, profile report with "total_seconds", "stages",
+        "hot_functions" sorted by own time, and "artifact" path or None)
+    """
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    result = profiler.runcall(fn, *args)
+    elapsed = time.perf_counter() - started
+
+    stats = pstats.Stats(profiler)
+    artifact = None
+    profile_dir = os.getenv("PROFILE_DIR")
+    if profile_dir:
+        os.makedirs(profile_dir, exist_ok=True)
+        artifact = os.path.join(profile_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.prof")
+        stats.dump_stats(artifact)
+
+    return result, {
+        "total_seconds": round(elapsed, 6),
+        "stages": _stage_times(stats),
+        "hot_functions": _hot_functions(stats, PROFILE_TOP_N),
+        "artifact": artifact
+    }
@@ -0,0 +1,145 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, time, timedelta
+from typing import Optional, Tuple
+from zoneinfo import ZoneInfo
+from .schemas import PortfolioRequest
+from . import telemetry
+
+MARKET_TIMEZONE = ZoneInfo("America/New_York")
+MARKET_CLOSE = time(16, 0)
+
+
+def last_market_close(now: Optional[datetime] = None) -> datetime:
+    """
+    Most recent weekday 16:00 New York close at or before now.
+
+    Exchange holidays are not modelled; on a holiday the cache simply expires one
+    session early, which only costs a recomputation.
+    """
+    now = (now or datetime.now(MARKET_TIMEZONE)).astimezone(MARKET_TIMEZONE)
+    close = datetime.combine(now.date(), MARKET_CLOSE, tzinfo=MARKET_TIMEZONE)
+    if now < close:
+        close -= timedelta(days=1)
+    while close.weekday() >= 5:
+        close -= timedelta(days=1)
+    return close
+
+
+def next_market_close(now: Optional[datetime] = None) -> datetime:
+    """First weekday 16:00 New York close strictly after now."""
+    now = (now or datetime.now(MARKET_TIMEZONE)).astimezone(MARKET_TIMEZONE)
+    close = datetime.combine(now.date(), MARKET_CLOSE, tzinfo=MARKET_TIMEZONE)
+    if now >= close:
+        close += timedelta(days=1)
+    while close.weekday() >= 5:
+        close += timedelta(days=1)
+    return close
+
+
+def request_key(request: PortfolioRequest, as_of: date) -> str:
+    """
+    Canonical hash of everything that determines an /optimize response.
+
+    Tickers are de-duplicated and sorted so equivalent requests share an entry, and
+    the data as-of date makes entries roll over when a new close becomes available.
+
+    Args:
+        request: Portfolio optimization parameters
+        as_of: Date of the last market close included in the data
+
+    Returns:
+        Hex digest used as cache key
+    """
+    canonical = {
+        "tickers": sorted(set(request.tickers)),
+        "objective": request.objective,
+        "portfolio_type": request.portfolio_type,
+        "lookback_days": request.lookback_days,
+        "esg_weight": round(float(request.esg_weight or 0.0), 6),
+        "covariance_model": request.covariance_model or "sample",
+        "n_factors": request.n_factors if request.covariance_model == "pca" else None,
+        "sections": sorted(request.sections()),
+        "series_format": request.series_format or "records",
+        "time_budget_ms": request.time_budget_ms,
+        "frequency": request.frequency or "daily",
+        "as_of": as_of.isoformat()
+    }
+    encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:32]
+
+
+def body_etag(body: bytes) -> str:
+    """Strong ETag (quoted) of a response body."""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+class ResultCache:
+    """
+    Bounded LRU cache of serialized /optimize responses and their ETags.
+
+    Entries expire at the next market close after they were stored, when new prices
+    (and therefore a new as-of date in the key) become available. The ETag is a hash
+    of the stored body, so it changes whenever the same key produces a different body.
+    """
+
+    def __init__(self, max_entries: int = 256, name: str = "result"):
+        """
+        Initialize cache.
+
+        Args:
+            max_entries: Maximum number of cached responses (least recently used are evicted)
+            name: Label of the cache in the cache_requests_total metric
+        """
+        self.max_entries = max_entries
+        self.name = name
+        self._entries: "OrderedDict[str, Tuple[bytes, str, datetime]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key: str, now: Optional[datetime] = None) -> Optional[Tuple[bytes, str]]:
+        """Cached response body and its ETag for key, or None if missing or expired."""
+        now = now or datetime.now(MARKET_TIMEZONE)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[2] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                telemetry.inc("cache_requests_total", cache=self.name, outcome="miss")
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            telemetry.inc("cache_requests_total", cache=self.name, outcome="hit")
+            return entry[0], entry[1]
+
+    def get(self, key: str, now: Optional[datetime] = None) -> Optional[bytes]:
+        """Cached response body for key, or None if missing or expired."""
+        entry = self.lookup(key, now)
+        return entry[0] if entry is not None else None
+
+    def put(self, key: str, body: bytes, now: Optional[datetime] = None) -> str:
+        """
+        Store a response body until the next market close.
+
+        Returns:
+            ETag of the body
+        """
+        expires = next_market_close(now)
+        etag = body_etag(body)
+        with self._lock:
+            self._entries[key] = (body, etag, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return etag
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
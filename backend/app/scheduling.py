@@ -0,0 +1,61 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+from .result_cache import next_market_close, MARKET_TIMEZONE
+
+logger = logging.getLogger(__name__)
+
+
+class MarketCloseSchedule:
+    """
+    Runs a background refresh at startup and again after every market close.
+
+    A refresh that fails (e.g. a provider outage at startup) is retried with
+    exponential backoff, capped at max_retry_delay, until it succeeds or the next
+    scheduled refresh is due.
+    """
+
+    def __init__(self, name: str, refresh: Callable[[], Awaitable[bool]],
+                 delay_after_close: timedelta = timedelta(minutes=30),
+                 retry_delay: timedelta = timedelta(minutes=1),
+                 max_retry_delay: timedelta = timedelta(minutes=30)):
+        """
+        Initialize schedule.
+
+        Args:
+            name: Name of the refreshed data in log messages
+            refresh: Coroutine function returning whether the refresh succeeded
+            delay_after_close: Wait after the close before refreshing, so providers have published prices
+            retry_delay: Wait before the first retry of a failed refresh (doubled after each failure)
+            max_retry_delay: Longest wait between retries
+        """
+        self.name = name
+        self.refresh = refresh
+        self.delay_after_close = delay_after_close
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run_forever(self) -> None:
+        while True:
+            scheduled = next_market_close(datetime.now(MARKET_TIMEZONE)) + self.delay_after_close
+            retry_delay = self.retry_delay
+            while not await self.refresh():
+                if datetime.now(MARKET_TIMEZONE) + retry_delay >= scheduled:
+                    break
+                logger.info(f"Retrying the {self.name} refresh in {retry_delay.total_seconds():.0f}s")
+                await asyncio.sleep(retry_delay.total_seconds())
+                retry_delay = min(2 * retry_delay, self.max_retry_delay)
+            await asyncio.sleep(max(0.0, (scheduled - datetime.now(MARKET_TIMEZONE)).total_seconds()))
+
+    def start(self) -> None:
+        """Start refreshing in the background (no-op if already started)."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
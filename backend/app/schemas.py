@@ -1,13 +1,96 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from typing import List, Dict, Literal, Optional, Any
+from .metrics import PERIODS_PER_YEAR
+
+# The dense sample covariance is only allowed for small universes; factored
+# covariance models (pca, shrinkage) raise the cap to MAX_TICKERS
+MAX_SAMPLE_COVARIANCE_TICKERS = 30
+MAX_TICKERS = 500
+
+# Optional parts of the /optimize response; stages for sections that are not
+# requested are skipped. Weights, expected return and volatility are always returned.
+ResponseSection = Literal["weights", "metrics", "frontier", "rolling", "prices", "benchmark", "risk", "esg"]
+RESPONSE_SECTIONS = ("weights", "metrics", "frontier", "rolling", "prices", "benchmark", "risk", "esg")
+
+Objective = Literal["sharpe", "sortino", "calmar", "min_variance", "hrp", "risk_parity"]
+
+# Fewest weekly/monthly periods a lookback must span for a usable covariance estimate
+MIN_WINDOW_PERIODS = 24
 
 
 class PortfolioRequest(BaseModel):
-    tickers: List[str] = Field(..., min_items=1, max_items=30, description="List of stock tickers")
-    objective: Literal["sharpe", "sortino", "calmar", "min_variance"] = Field(..., description="Optimization objective")
+    tickers: List[str] = Field(..., min_items=1, max_items=MAX_TICKERS, description="List of stock tickers")
+    objective: Objective = Field(..., description="Optimization objective")
     portfolio_type: Literal["long_only", "long_short"] = Field(..., description="Portfolio constraint type")
     lookback_days: Optional[int] = Field(252, ge=30, le=2520, description="Number of trading days for historical data")
     esg_weight: Optional[float] = Field(0.0, ge=0.0, le=1.0, description="ESG importance weight (0.0 to 1.0)")
+    covariance_model: Optional[Literal["sample", "pca", "shrinkage"]] = Field("sample", description="Covariance estimator (pca/shrinkage are stored as low-rank plus diagonal)")
+    n_factors: Optional[int] = Field(10, ge=1, le=50, description="Number of factors for the pca covariance model")
+    include: Optional[List[ResponseSection]] = Field(None, description="Response sections to compute (default: all)")
+    exclude: Optional[List[ResponseSection]] = Field(None, description="Response sections to skip")
+    series_format: Optional[Literal["records", "columnar"]] = Field("records", description="Time series as date/value records or as float arrays sharing one date array")
+    time_budget_ms: Optional[int] = Field(None, ge=10, le=600000, description="Compute time budget for the solve and frontier stages; when it runs out the best solution so far is returned, flagged as partial")
+    frequency: Optional[Literal["daily", "weekly", "monthly"]] = Field("daily", description="Return frequency of the optimization window; weekly/monthly compounded returns cut long lookbacks to 5x/~21x fewer rows")
+    
+    def sections(self) -> set:
+        """Response sections to compute: include (default: all) minus exclude."""
+        sections = set(self.include) if self.include is not None else set(RESPONSE_SECTIONS)
+        if self.exclude:
+            sections -= set(self.exclude)
+        return sections
+    
+    @model_validator(mode="after")
+    def check_ticker_cap(self):
+        if (self.covariance_model or "sample") == "sample" and len(self.tickers) > MAX_SAMPLE_COVARIANCE_TICKERS:
+            raise ValueError(
+                f"At most {MAX_SAMPLE_COVARIANCE_TICKERS} tickers are allowed with the sample covariance; "
+                f"use covariance_model 'pca' or 'shrinkage' for up to {MAX_TICKERS}"
+            )
+        frequency = self.frequency or "daily"
+        if frequency != "daily" and self.lookback_days * PERIODS_PER_YEAR[frequency] / 252 < MIN_WINDOW_PERIODS:
+            min_days = -(-MIN_WINDOW_PERIODS * 252 // PERIODS_PER_YEAR[frequency])
+            raise ValueError(f"A {frequency} window needs lookback_days of at least {min_days} ({MIN_WINDOW_PERIODS} periods)")
+        return self
+
+
+class BatchPortfolioRequest(BaseModel):
+    portfolios: List[PortfolioRequest] = Field(..., min_length=1, max_length=200, description="Portfolios to optimize")
+    
+    @model_validator(mode="after")
+    def check_universe_size(self):
+        universe = set(ticker for portfolio in self.portfolios for ticker in portfolio.tickers)
+        if len(universe) > MAX_TICKERS:
+            raise ValueError(f"At most {MAX_TICKERS} distinct tickers are allowed across a batch")
+        return self
+
+
+class ComparisonRequest(PortfolioRequest):
+    objective: Optional[Objective] = Field(None, description="Unused; see objectives")
+    objectives: List[Objective] = Field(..., min_length=2, max_length=6, description="Objectives to compare on the same data")
+    
+    @model_validator(mode="after")
+    def dedupe_objectives(self):
+        self.objectives = list(dict.fromkeys(self.objectives))
+        if len(self.objectives) < 2:
+            raise ValueError("At least two distinct objectives are required for a comparison")
+        return self
+    
+    def objective_request(self, objective: str) -> PortfolioRequest:
+        """The single-objective /optimize request for one of the compared objectives."""
+        return PortfolioRequest(**self.model_dump(exclude={"objective", "objectives"}), objective=objective)
+
+
+class ResampledFrontierRequest(PortfolioRequest):
+    objective: Optional[Objective] = Field(None, description="Unused; the frontier does not depend on the objective")
+    n_resamples: int = Field(200, ge=10, le=1000, description="Number of bootstrap resamples of the returns window")
+    num_points: int = Field(20, ge=5, le=50, description="Number of return ranks per frontier")
+    seed: Optional[int] = Field(None, description="Seed of the bootstrap draws, for reproducible results")
+    
+    @model_validator(mode="after")
+    def check_sample_covariance(self):
+        if (self.covariance_model or "sample") != "sample":
+            raise ValueError("Resampled frontiers use the sample covariance of each resample")
+        return self
 
 
 class PortfolioResponse(BaseModel):
@@ -22,7 +105,7 @@ class PortfolioResponse(BaseModel):
     price_history: Optional[Dict[str, List[Dict[str, Any]]]] = Field(None, description="Historical price data by ticker")
     portfolio_returns: Optional[List[Dict[str, Any]]] = Field(None, description="Portfolio cumulative returns over time")
     benchmark_returns: Optional[List[Dict[str, Any]]] = Field(None, description="SPY benchmark cumulative returns over time")
-    efficient_frontier: Optional[List[Dict[str, float]]] = Field(None, description="Efficient frontier points (risk-return pairs)")
+    efficient_frontier: Optional[List[Dict[str, Any]]] = Field(None, description="Efficient frontier points (risk, return and the weights of each point)")
     rolling_metrics: Optional[Dict[str, List[Dict[str, Any]]]] = Field(None, description="Rolling Sharpe ratio and volatility over time")
     risk_decomposition: Optional[Dict[str, float]] = Field(None, description="Risk contribution percentage by asset")
     esg_weight: Optional[float] = Field(None, description="ESG importance weight used in optimization (0.0 to 1.0)")
@@ -30,6 +113,68 @@ class PortfolioResponse(BaseModel):
     ticker_esg_scores: Optional[Dict[str, float]] = Field(None, description="Individual ESG scores for each ticker (lower is better)")
     expected_return_theoretical: Optional[float] = Field(None, description="Theoretical expected return using mean returns (for efficient frontier display)")
     volatility_theoretical: Optional[float] = Field(None, description="Theoretical volatility using covariance matrix (for efficient frontier display)")
+    partial: Optional[bool] = Field(None, description="True if the time budget ran out before the solve or frontier finished (only with time_budget_ms)")
+    convergence: Optional[Dict[str, Any]] = Field(None, description="Solver diagnostics: restarts, iterations, objective evaluations, elapsed time (only with time_budget_ms)")
+    profile: Optional[Dict[str, Any]] = Field(None, description="Profiler report (only for profile=true requests)")
+
+
+class ObjectiveComparison(BaseModel):
+    weights: Dict[str, float] = Field(..., description="Optimal weights for each ticker")
+    expected_return: float = Field(..., description="Expected annualized return")
+    volatility: float = Field(..., description="Annualized volatility")
+    sharpe_ratio: Optional[float] = Field(None, description="Sharpe ratio")
+    sortino_ratio: Optional[float] = Field(None, description="Sortino ratio")
+    calmar_ratio: Optional[float] = Field(None, description="Calmar ratio")
+    max_drawdown: Optional[float] = Field(None, description="Maximum drawdown")
+    total_leverage: Optional[float] = Field(None, description="Total leverage (L1 norm) for long/short")
+    portfolio_returns: Optional[List[Dict[str, Any]]] = Field(None, description="Portfolio cumulative returns over time")
+    rolling_metrics: Optional[Dict[str, List[Dict[str, Any]]]] = Field(None, description="Rolling Sharpe ratio and volatility over time")
+    risk_decomposition: Optional[Dict[str, float]] = Field(None, description="Risk contribution percentage by asset")
+    portfolio_esg_score: Optional[float] = Field(None, description="Weighted average ESG score of the portfolio (lower is better)")
+    expected_return_theoretical: Optional[float] = Field(None, description="Theoretical expected return (position on the efficient frontier)")
+    volatility_theoretical: Optional[float] = Field(None, description="Theoretical volatility (position on the efficient frontier)")
+    partial: Optional[bool] = Field(None, description="True if the time budget ran out before the solve finished (only with time_budget_ms)")
+    convergence: Optional[Dict[str, Any]] = Field(None, description="Solver diagnostics (only with time_budget_ms)")
+
+
+class ComparisonResponse(BaseModel):
+    objectives: Dict[str, ObjectiveComparison] = Field(..., description="Weights and metrics by objective")
+    price_history: Optional[Dict[str, List[Dict[str, Any]]]] = Field(None, description="Historical price data by ticker")
+    benchmark_returns: Optional[List[Dict[str, Any]]] = Field(None, description="SPY benchmark cumulative returns over time")
+    efficient_frontier: Optional[List[Dict[str, Any]]] = Field(None, description="Efficient frontier points (risk, return and the weights of each point)")
+    esg_weight: Optional[float] = Field(None, description="ESG importance weight used in optimization (0.0 to 1.0)")
+    ticker_esg_scores: Optional[Dict[str, float]] = Field(None, description="Individual ESG scores for each ticker (lower is better)")
+
+
+class ResampledFrontierResponse(BaseModel):
+    resampled_frontier: List[Dict[str, Any]] = Field(..., description="Averaged portfolio per return rank: risk, return, weights, weights_std, and the return_std and risk_std of the resampled portfolios")
+    sample_frontier: List[Dict[str, Any]] = Field(..., description="Frontier of the unresampled moments at the same return ranks (risk, return, weights)")
+    n_resamples: int = Field(..., description="Number of bootstrap resamples")
+    resamples_solved: int = Field(..., description="Resamples whose frontier was solved at every rank")
+    spread: Dict[str, float] = Field(..., description="Spread between resamples averaged over ranks: weight_std, return_std, risk_std")
+    wall_time_seconds: float = Field(..., description="Time taken to draw and solve the resamples")
+
+
+ScreenColumn = Literal["annual_return", "volatility", "sharpe_ratio", "max_drawdown", "beta", "avg_correlation"]
+
+
+class ScreenResult(BaseModel):
+    symbol: str = Field(..., description="Stock ticker symbol")
+    name: str = Field(..., description="Company name")
+    annual_return: Optional[float] = Field(None, description="Annualized mean return")
+    volatility: Optional[float] = Field(None, description="Annualized volatility")
+    sharpe_ratio: Optional[float] = Field(None, description="Sharpe ratio (2% risk-free rate)")
+    max_drawdown: Optional[float] = Field(None, description="Maximum drawdown over the lookback")
+    beta: Optional[float] = Field(None, description="Beta to SPY")
+    avg_correlation: Optional[float] = Field(None, description="Average correlation with the other tickers of the universe")
+
+
+class ScreenResponse(BaseModel):
+    as_of: str = Field(..., description="Last market close included (ISO 8601)")
+    lookback_days: int = Field(..., description="Trading days of returns the statistics cover")
+    total: int = Field(..., description="Number of tickers matching the filters")
+    offset: int = Field(..., description="Matching tickers skipped")
+    results: List[ScreenResult] = Field(..., description="Page of matching tickers in sort order")
 
 
 class TickerInfo(BaseModel):
@@ -38,4 +183,37 @@ class TickerInfo(BaseModel):
 
 
 class TickerSearchResponse(BaseModel):
-    results: List[TickerInfo] = Field(..., description="List of matching tickers")
\ No newline at end of file
+    results: List[TickerInfo] = Field(..., description="List of matching tickers")
+
+class BacktestRequest(BaseModel):
+    tickers: List[str] = Field(..., min_length=1, max_length=30, description="List of stock tickers")
+    objective: Objective = Field(..., description="Optimization objective")
+    portfolio_type: Literal["long_only", "long_short"] = Field(..., description="Portfolio constraint type")
+    lookback_days: Optional[int] = Field(252, ge=30, le=2520, description="Trailing trading days used for each re-optimization")
+    backtest_days: Optional[int] = Field(756, ge=21, le=2520, description="Number of out-of-sample trading days to simulate")
+    rebalance_days: Optional[int] = Field(21, ge=1, le=252, description="Trading days between rebalances")
+    esg_weight: Optional[float] = Field(0.0, ge=0.0, le=1.0, description="ESG importance weight (0.0 to 1.0)")
+
+
+class BacktestResponse(BaseModel):
+    expected_return: float = Field(..., description="Annualized out-of-sample return")
+    volatility: float = Field(..., description="Annualized out-of-sample volatility")
+    sharpe_ratio: Optional[float] = Field(None, description="Out-of-sample Sharpe ratio")
+    max_drawdown: Optional[float] = Field(None, description="Out-of-sample maximum drawdown")
+    total_turnover: float = Field(..., description="Sum of L1 weight changes across rebalances (excluding initial allocation)")
+    average_turnover: float = Field(..., description="Average L1 weight change per rebalance (excluding initial allocation)")
+    portfolio_returns: List[Dict[str, Any]] = Field(..., description="Out-of-sample portfolio cumulative returns over time")
+    rebalances: List[Dict[str, Any]] = Field(..., description="Rebalance dates with target weights and turnover")
+
+
+class JobStatusResponse(BaseModel):
+    job_id: str = Field(..., description="Job identifier")
+    status: Literal["queued", "running", "succeeded", "failed", "cancelled"] = Field(..., description="Job status")
+    stage: Optional[str] = Field(None, description="Stage currently running")
+    stages: Dict[str, str] = Field(..., description="Status of each stage (fetch, solve, frontier, metrics)")
+    progress: float = Field(..., description="Fraction of stages completed (0.0 to 1.0)")
+    error: Optional[str] = Field(None, description="Error message if the job failed")
+    created_at: str = Field(..., description="Submission time (ISO 8601)")
+    updated_at: str = Field(..., description="Last status change (ISO 8601)")
+    expires_at: Optional[str] = Field(None, description="When the finished job and its result are discarded (ISO 8601)")
+    result: Optional[PortfolioResponse] = Field(None, description="Optimization result once the job succeeded")
@@ -0,0 +1,235 @@
+import logging
+import time
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple, get_args
+import numpy as np
+import pandas as pd
+from .schemas import PortfolioRequest, ScreenColumn
+from .compute_pool import ComputePool
+from .pipeline import MarketData, load_market_data
+from .scheduling import MarketCloseSchedule
+from . import telemetry
+
+logger = logging.getLogger(__name__)
+
+# Per-ticker statistics of the screen, in column order of ScreenTable.values
+SCREEN_COLUMNS = get_args(ScreenColumn)
+
+
+class ScreenTable:
+    """
+    Screening statistics of a ticker universe, one row per ticker.
+
+    Columns are stored as a single float array so filtering, sorting and paging
+    thousands of tickers are a few vectorized operations.
+    """
+
+    def __init__(self, symbols: Sequence[str], names: Sequence[str], values: np.ndarray,
+                 as_of: str, lookback_days: int):
+        """
+        Args:
+            symbols: Ticker symbols
+            names: Company names, aligned to symbols
+            values: Statistics, shape (len(symbols), len(SCREEN_COLUMNS)); NaN where undefined
+            as_of: Date of the last market close included (ISO 8601)
+            lookback_days: Trading days the statistics cover
+        """
+        self.symbols = np.asarray(symbols, dtype=object)
+        self.names = np.asarray(names, dtype=object)
+        self.values = np.asarray(values, dtype=float)
+        self.as_of = as_of
+        self.lookback_days = lookback_days
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def column(self, name: str) -> np.ndarray:
+        return self.values[:, SCREEN_COLUMNS.index(name)]
+
+    def query(self, sort_by: str = "sharpe_ratio", descending: bool = True,
+              filters: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+              offset: int = 0, limit: int = 50) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Filter, sort and page the table.
+
+        Args:
+            sort_by: Column to sort by; tickers where it is undefined come last
+            descending: Sort from the largest value
+            filters: Column to (min, max) bounds, either of which may be None; rows
+                where a filtered column is undefined are excluded
+            offset: Matching rows to skip
+            limit: Maximum rows to return
+
+        Returns:
+            Number of matching rows and the requested page of rows
+
+        Raises:
+            ValueError: If a column name is unknown
+        """
+        if sort_by not in SCREEN_COLUMNS:
+            raise ValueError(f"Unknown screen column: {sort_by}")
+
+        mask = np.ones(len(self), dtype=bool)
+        for name, (low, high) in (filters or {}).items():
+            if name not in SCREEN_COLUMNS:
+                raise ValueError(f"Unknown screen column: {name}")
+            values = self.column(name)
+            # Comparisons with NaN are False, so undefined values never match a bound
+            if low is not None:
+                mask &= values >= low
+            if high is not None:
+                mask &= values <= high
+
+        matching = np.flatnonzero(mask)
+        keys = self.column(sort_by)[matching]
+        # A stable argsort keeps NaN last in both directions and ties in symbol order
+        order = np.argsort(-keys if descending else keys, kind="stable")
+        page = matching[order[offset:offset + limit]]
+
+        rows = []
+        for i in page:
+            row = {"symbol": self.symbols[i], "name": self.names[i]}
+            row.update((name, float(value) if np.isfinite(value) else None) for name, value in zip(SCREEN_COLUMNS, self.values[i]))
+            rows.append(row)
+        return len(matching), rows
+
+
+@telemetry.span("screen")
+def compute_screen(returns: pd.DataFrame, benchmark_returns: Optional[pd.Series] = None,
+                   names: Optional[Dict[str, str]] = None, as_of: Optional[str] = None,
+                   risk_free_rate: float = 0.02, periods_per_year: int = 252) -> ScreenTable:
+    """
+    Screening statistics of every column of a returns matrix in one vectorized pass.
+
+    The average pairwise correlation of each ticker is its correlation with the sum
+    of all standardized returns, minus its own, so no n x n correlation matrix is formed.
+
+    Args:
+        returns: Returns of the universe (one column per ticker, no missing values)
+        benchmark_returns: Benchmark (SPY) returns for beta; beta is undefined without it
+        names: Company name by ticker
+        as_of: Date of the last close in returns (default: the last index date)
+        risk_free_rate: Annual risk-free rate of the Sharpe ratio
+        periods_per_year: Return periods per year (252 for daily returns)
+
+    Returns:
+        ScreenTable over the columns of returns
+    """
+    values = returns.to_numpy(dtype=float)
+    n_periods, n_assets = values.shape
+    if n_periods < 2:
+        raise ValueError("At least 2 periods of returns are needed to screen")
+
+    mean = values.mean(axis=0)
+    centered = values - mean
+    std = np.sqrt(np.einsum('ti,ti->i', centered, centered) / (n_periods - 1))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        annual_return = mean * periods_per_year
+        volatility = std * np.sqrt(periods_per_year)
+        sharpe_ratio = np.where(volatility > 0, (annual_return - risk_free_rate) / volatility, np.nan)
+
+        cumulative = np.cumprod(1 + values, axis=0)
+        running_max = np.maximum.accumulate(cumulative, axis=0)
+        max_drawdown = np.minimum(((cumulative - running_max) / running_max).min(axis=0), 0.0)
+
+        beta = np.full(n_assets, np.nan)
+        if benchmark_returns is not None:
+            # Beta over the dates both series have
+            benchmark = benchmark_returns.reindex(returns.index).to_numpy(dtype=float)
+            shared = ~np.isnan(benchmark)
+            if shared.sum() > 2:
+                benchmark_centered = benchmark[shared] - benchmark[shared].mean()
+                benchmark_variance = np.dot(benchmark_centered, benchmark_centered)
+                if benchmark_variance > 0:
+                    beta = benchmark_centered @ (values[shared] - values[shared].mean(axis=0)) / benchmark_variance
+
+        avg_correlation = np.full(n_assets, np.nan)
+        if n_assets > 1:
+            standardized = np.where(std > 0, centered / std, 0.0)
+            total = standardized.sum(axis=1)
+            # z_i . z_i = n_periods - 1 for every column with nonzero variance
+            correlation_sums = standardized.T @ total - (n_periods - 1)
+            avg_correlation = np.where(std > 0, correlation_sums / ((n_periods - 1) * (n_assets - 1)), np.nan)
+
+    names = names or {}
+    symbols = list(returns.columns)
+    return ScreenTable(
+        symbols,
+        [names.get(symbol, symbol) for symbol in symbols],
+        np.column_stack([annual_return, volatility, sharpe_ratio, max_drawdown, beta, avg_correlation]),
+        as_of or pd.Timestamp(returns.index[-1]).date().isoformat(),
+        n_periods
+    )
+
+
+def load_screen_data(symbols: List[str], lookback_days: int) -> MarketData:
+    """Prices of the whole universe and the SPY benchmark (blocking I/O)."""
+    request = PortfolioRequest.model_construct(
+        tickers=list(symbols), lookback_days=lookback_days, esg_weight=0.0, include=["benchmark"], exclude=None
+    )
+    return load_market_data(request)
+
+
+def screen_market_data(market_data: MarketData, lookback_days: int, names: Dict[str, str]) -> ScreenTable:
+    """ScreenTable of the last lookback_days of a universe's MarketData (runs in a worker)."""
+    returns = market_data.returns.tail(lookback_days)
+    benchmark_returns = None
+    benchmark_prices = market_data.benchmark_prices
+    if benchmark_prices is not None and "SPY" in benchmark_prices.columns:
+        benchmark_returns = benchmark_prices["SPY"].pct_change()
+    return compute_screen(returns, benchmark_returns, names)
+
+
+class UniverseScreener:
+    """
+    Recomputes the screen of the ticker database after each market close.
+
+    The universe is downloaded once per refresh and the statistics are computed in a
+    worker process; requests only query the resulting ScreenTable.
+    """
+
+    def __init__(self, tickers: List[Dict[str, str]], compute_pool: ComputePool, lookback_days: int = 252,
+                 delay_after_close: timedelta = timedelta(minutes=30)):
+        """
+        Initialize screener.
+
+        Args:
+            tickers: Ticker database entries ("symbol" and "name")
+            compute_pool: Pool used for the download and the computation
+            lookback_days: Trading days of returns the statistics cover
+            delay_after_close: See MarketCloseSchedule
+        """
+        self.names = {ticker["symbol"]: ticker["name"] for ticker in tickers}
+        self.compute_pool = compute_pool
+        self.lookback_days = lookback_days
+        self.table: Optional[ScreenTable] = None
+        self.schedule = MarketCloseSchedule("screen", self.refresh, delay_after_close)
+
+    async def refresh(self) -> bool:
+        """
+        Download the universe and recompute the table.
+
+        Returns:
+            True if the table was replaced; on failure the previous table is kept
+        """
+        started = time.monotonic()
+        try:
+            market_data = await self.compute_pool.run_io(load_screen_data, list(self.names), self.lookback_days)
+            table = await self.compute_pool.run(screen_market_data, market_data, self.lookback_days, self.names,
+                                                wait=True)
+        except Exception as e:
+            logger.warning(f"Failed to refresh the screen: {str(e)}")
+            return False
+
+        self.table = table
+        logger.info(f"Screened {len(table)}/{len(self.names)} tickers as of {table.as_of} "
+                    f"in {time.monotonic() - started:.1f}s")
+        return True
+
+    def start(self) -> None:
+        """Refresh now and then after every market close, in the background."""
+        if self.names:
+            self.schedule.start()
+
+    async def stop(self) -> None:
+        await self.schedule.stop()
@@ -0,0 +1,210 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Upper bounds (seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Every exported metric with its Prometheus type and help text
+METRICS = {
+    "http_request_duration_seconds": ("histogram", "HTTP request latency by route and status code"),
+    "portfolio_stage_duration_seconds": ("histogram", "Duration of each optimization stage"),
+    "optimizer_objective_evaluations_total": ("counter", "Objective function evaluations by SLSQP"),
+    "optimizer_slsqp_iterations_total": ("counter", "SLSQP iterations"),
+    "optimizer_restarts_total": ("counter", "SLSQP restarts by outcome (converged, failed, error)"),
+    "optimizer_fallbacks_total": ("counter", "Optimizations that fell back to another allocation"),
+    "frontier_points_total": ("counter", "Efficient frontier target returns attempted and points kept"),
+    "resampled_frontier_solves_total": ("counter", "Resampled frontier solves by method (qp, lp, slsqp) and failures"),
+    "cache_requests_total": ("counter", "Result cache lookups by cache and outcome (hit, miss)"),
+}
+
+_Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+_local = threading.local()
+
+
+def _key(name: str, labels: Dict[str, Any]) -> _Key:
+    return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+
+class MetricsRegistry:
+    """
+    Counters and histograms of one process, rendered in the Prometheus text format.
+
+    Worker processes do not write here directly: samples recorded while a function
+    runs under collect() are returned with its result and merged by the parent.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Args:
+            buckets: Upper bounds of the histogram buckets (an implicit +Inf is added)
+        """
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters: Dict[_Key, float] = {}
+        # Per histogram: count per bucket (+Inf last), then sum and count of observations
+        self._histograms: Dict[_Key, List[float]] = {}
+
+    def inc(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0.0] * (len(self.buckets) + 3)
+            histogram[bisect.bisect_left(self.buckets, value)] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def record(self, sample: Tuple[str, str, Dict[str, Any], float]) -> None:
+        kind, name, labels, value = sample
+        if kind == "counter":
+            self.inc(name, value, **labels)
+        else:
+            self.observe(name, value, **labels)
+
+    def merge(self, samples: List[Tuple[str, str, Dict[str, Any], float]]) -> None:
+        """Add samples collected in another process or thread."""
+        for sample in samples:
+            self.record(sample)
+
+    def counter_value(self, name: str, **labels: Any) -> float:
+        return self._counters.get(_key(name, labels), 0.0)
+
+    def histogram_count(self, name: str, **labels: Any) -> int:
+        histogram = self._histograms.get(_key(name, labels))
+        return int(histogram[-1]) if histogram else 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: list(values) for key, values in self._histograms.items()}
+
+        lines = []
+        for name, (kind, help_text) in METRICS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "counter":
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                continue
+            for (metric, labels), values in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0.0
+                for bound, count in zip(self.buckets + (float("inf"),), values):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else _format_value(bound)
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {_format_value(cumulative)}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(values[-2])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {_format_value(values[-1])}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{label}="{value}"' for (label, _), value in zip(labels, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+# Metrics of this process, served by GET /metrics
+REGISTRY = MetricsRegistry()
+
+
+def _record(kind: str, name: str, labels: Dict[str, Any], value: float) -> None:
+    samples: Optional[list] = getattr(_local, "samples", None)
+    if samples is not None:
+        samples.append((kind, name, labels, value))
+    else:
+        REGISTRY.record((kind, name, labels, value))
+
+
+def inc(name: str, value: float = 1.0, **labels: Any) -> None:
+    """Increment a counter."""
+    _record("counter", name, labels, value)
+
+
+def observe(name: str, value: float, **labels: Any) -> None:
+    """Add an observation to a histogram."""
+    _record("histogram", name, labels, value)
+
+
+@contextmanager
+def span(stage: str):
+    """Time a block (or, as a decorator, a function) as an optimization stage."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe("portfolio_stage_duration_seconds", time.perf_counter() - started, stage=stage)
+
+
+def collect(fn: Callable, *args: Any) -> Tuple[Any, list]:
+    """
+    Run fn and return its result with the samples it recorded, instead of writing
+    them to this process's registry (used for functions run in worker processes).
+    """
+    _local.samples = []
+    try:
+        return fn(*args), _local.samples
+    finally:
+        _local.samples = None
+
+
+class RequestLatencyMiddleware:
+    """
+    ASGI middleware recording http_request_duration_seconds by method, route
+    template and status code, up to the start of the response.
+
+    Written against plain ASGI rather than as an @app.middleware("http") function:
+    Starlette's BaseHTTPMiddleware wraps the receive channel, which hides client
+    disconnects from Request.is_disconnected in the endpoints.
+    """
+
+    def __init__(self, app: Callable):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        recorded = False
+
+        def record(status: int) -> None:
+            nonlocal recorded
+            recorded = True
+            # The router adds the matched route to the shared scope
+            route = scope.get("route")
+            observe("http_request_duration_seconds", time.perf_counter() - started, method=scope["method"],
+                    route=route.path if route is not None else "unmatched", status=status)
+
+        async def send_recorded(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start" and not recorded:
+                record(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_recorded)
+        finally:
+            if not recorded:
+                record(500)
@@ -0,0 +1,143 @@
+import heapq
+from functools import lru_cache
+from typing import Dict, Iterable, List, Set, Tuple
+
+# Substrings up to this length are indexed; longer queries intersect their n-grams
+MAX_GRAM = 3
+
+
+def _grams(text: str) -> Set[str]:
+    """All substrings of text with length 1..MAX_GRAM."""
+    return {
+        text[start:start + size]
+        for size in range(1, MAX_GRAM + 1)
+        for start in range(len(text) - size + 1)
+    }
+
+
+class _TrieNode:
+    __slots__ = ("children", "ids")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        # Ids of all symbols with this prefix, kept sorted by symbol
+        self.ids: List[int] = []
+
+
+class TickerIndex:
+    """
+    Search index over the ticker database, built once at startup.
+
+    Symbols go into a prefix trie and an n-gram inverted index, company names into
+    an n-gram inverted index. Matches are ranked like the original linear scan
+    (exact symbol 100, symbol prefix 50, symbol substring 30, name substring 20,
+    then by symbol), tier by tier, so lower tiers are only searched when the higher
+    ones hold fewer than `limit` results. Recent queries are served from an LRU cache.
+    """
+
+    def __init__(self, tickers: Iterable[Dict[str, str]], limit: int = 20, cache_size: int = 4096):
+        """
+        Build the index.
+
+        Args:
+            tickers: Ticker records with "symbol" and "name" keys
+            limit: Maximum number of results per query
+            cache_size: Number of recent queries kept in the LRU cache
+        """
+        self.limit = limit
+        self.records: List[Tuple[str, str]] = []
+        for ticker_info in tickers:
+            self.records.append((ticker_info.get("symbol", ""), ticker_info.get("name", "")))
+
+        # Ids ordered by symbol, so trie nodes and tiers are sorted by construction
+        order = sorted(range(len(self.records)), key=lambda i: self.records[i][0])
+        self._symbols = [symbol.upper() for symbol, _ in self.records]
+        self._names = [name.upper() for _, name in self.records]
+
+        self._trie = _TrieNode()
+        self._exact: Dict[str, List[int]] = {}
+        self._symbol_grams: Dict[str, Set[int]] = {}
+        self._name_grams: Dict[str, Set[int]] = {}
+
+        for i in order:
+            symbol = self._symbols[i]
+            node = self._trie
+            node.ids.append(i)
+            for char in symbol:
+                node = node.children.setdefault(char, _TrieNode())
+                node.ids.append(i)
+            self._exact.setdefault(symbol, []).append(i)
+            for gram in _grams(symbol):
+                self._symbol_grams.setdefault(gram, set()).add(i)
+            for gram in _grams(self._names[i]):
+                self._name_grams.setdefault(gram, set()).add(i)
+
+        self._search = lru_cache(maxsize=cache_size)(self._search_uncached)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def _prefix_ids(self, query: str) -> List[int]:
+        node = self._trie
+        for char in query:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return node.ids
+
+    def _substring_ids(self, grams: Dict[str, Set[int]], texts: List[str], query: str) -> Set[int]:
+        """Ids whose text contains query, via the n-gram index."""
+        if len(query) <= MAX_GRAM:
+            return grams.get(query, set())
+
+        # Candidates contain every n-gram of the query; verify the full substring
+        query_grams = [query[start:start + MAX_GRAM] for start in range(len(query) - MAX_GRAM + 1)]
+        postings = sorted((grams.get(gram, set()) for gram in query_grams), key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates &= posting
+            if not candidates:
+                break
+        return {i for i in candidates if query in texts[i]}
+
+    def _search_uncached(self, query: str) -> Tuple[Tuple[str, str], ...]:
+        results: List[int] = []
+        seen: Set[int] = set()
+
+        def take(ids: Iterable[int], presorted: bool) -> None:
+            needed = self.limit - len(results)
+            if needed <= 0:
+                return
+            fresh = (i for i in ids if i not in seen)
+            if presorted:
+                chosen = []
+                for i in fresh:
+                    chosen.append(i)
+                    if len(chosen) == needed:
+                        break
+            else:
+                # Bounded heap: top `needed` by symbol without sorting every match
+                chosen = heapq.nsmallest(needed, fresh, key=lambda i: (self.records[i][0], i))
+            results.extend(chosen)
+            seen.update(chosen)
+
+        take(self._exact.get(query, []), presorted=True)
+        take(self._prefix_ids(query), presorted=True)
+        if len(results) < self.limit:
+            take(self._substring_ids(self._symbol_grams, self._symbols, query), presorted=False)
+        if len(results) < self.limit:
+            take(self._substring_ids(self._name_grams, self._names, query), presorted=False)
+
+        return tuple(self.records[i] for i in results)
+
+    def search(self, query: str) -> List[Dict[str, str]]:
+        """
+        Top matches for a symbol or company name query.
+
+        Args:
+            query: Search text (case-insensitive)
+
+        Returns:
+            Up to `limit` records with "symbol" and "name", best matches first
+        """
+        return [{"symbol": symbol, "name": name} for symbol, name in self._search(query.upper().strip())]
@@ -0,0 +1,108 @@
+import os
+import random
+import threading
+import time
+import zlib
+from functools import lru_cache
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from app import telemetry
+from app.cancellation import check
+from app.data_loader import DataLoader
+
+# Business days of history generated per ticker (enough for the longest lookback plus buffer)
+HISTORY_DAYS = 4200
+
+
+class FakeProvider:
+    """
+    Local stand-in for Yahoo Finance prices and FMP ESG scores.
+
+    Every ticker gets a deterministic price history (a shared market factor plus a
+    ticker-specific drift, beta and noise), so repeated requests see the same data.
+    Calls sleep for a configurable latency and fail at a configurable rate.
+    """
+
+    def __init__(self, latency_ms: float = 50.0, error_rate: float = 0.0, seed: int = 0):
+        """
+        Args:
+            latency_ms: Mean delay of each price or ESG call (jittered by +/-50%)
+            error_rate: Probability that a call fails like a provider outage
+            seed: Seed of the generated histories
+        """
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.seed = seed
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self._market = np.random.default_rng(seed).standard_normal(HISTORY_DAYS)
+        self._history = lru_cache(maxsize=4096)(self._history_uncached)
+
+    @classmethod
+    def from_env(cls) -> "FakeProvider":
+        """Build a provider from FAKE_PROVIDER_LATENCY_MS, FAKE_PROVIDER_ERROR_RATE and FAKE_PROVIDER_SEED."""
+        return cls(
+            latency_ms=float(os.getenv("FAKE_PROVIDER_LATENCY_MS", "50")),
+            error_rate=float(os.getenv("FAKE_PROVIDER_ERROR_RATE", "0")),
+            seed=int(os.getenv("FAKE_PROVIDER_SEED", "0"))
+        )
+
+    def _call(self, what: str) -> None:
+        with self._lock:
+            self.calls += 1
+            delay = self.latency_ms * self._random.uniform(0.5, 1.5) / 1000
+            failed = self._random.random() < self.error_rate
+        time.sleep(delay)
+        if failed:
+            raise ValueError(f"Failed to fetch {what}: simulated provider error")
+
+    def _history_uncached(self, ticker: str) -> np.ndarray:
+        rng = np.random.default_rng([self.seed, zlib.crc32(ticker.encode("utf-8"))])
+        drift = rng.uniform(-0.05, 0.25) / 252
+        volatility = rng.uniform(0.15, 0.45) / np.sqrt(252)
+        beta = rng.uniform(0.3, 0.8)
+        shocks = beta * self._market + np.sqrt(1 - beta ** 2) * rng.standard_normal(HISTORY_DAYS)
+        return 100 * np.cumprod(1 + drift + volatility * shocks)
+
+    def fetch_prices(self, tickers: List[str], days: int) -> pd.DataFrame:
+        """Closing prices of the last `days` business days, like DataLoader.fetch_prices."""
+        if not tickers:
+            raise ValueError("Tickers list cannot be empty")
+        self._call("data")
+        days = min(days, HISTORY_DAYS)
+        index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=days)
+        return pd.DataFrame({ticker: self._history(ticker)[-days:] for ticker in tickers}, index=index)
+
+    def fetch_esg_scores(self, tickers: List[str]) -> Dict[str, float]:
+        """ESG scores between 10 and 40, like DataLoader.fetch_esg_scores."""
+        self._call("ESG scores")
+        return {ticker: round(10 + zlib.crc32(ticker.encode("utf-8")) % 3000 / 100, 2) for ticker in tickers}
+
+
+def install(provider: Optional[FakeProvider] = None) -> FakeProvider:
+    """
+    Replace the DataLoader downloads with a FakeProvider in this process.
+
+    Args:
+        provider: Provider to use (default: FakeProvider.from_env())
+
+    Returns:
+        The installed provider
+    """
+    provider = provider or FakeProvider.from_env()
+
+    def fetch_prices(loader: DataLoader, tickers: List[str]) -> pd.DataFrame:
+        check(loader.cancel_token)
+        with telemetry.span("download_prices"):
+            return provider.fetch_prices(tickers, loader.total_days_needed())
+
+    def fetch_esg_scores(tickers: List[str], cancel_token=None) -> Dict[str, float]:
+        check(cancel_token)
+        with telemetry.span("download_esg"):
+            return provider.fetch_esg_scores(tickers)
+
+    DataLoader.fetch_prices = fetch_prices
+    DataLoader.fetch_esg_scores = staticmethod(fetch_esg_scores)
+    return provider
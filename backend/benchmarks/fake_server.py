@@ -0,0 +1,10 @@
+"""
+The API with market-data downloads served by FakeProvider, for load tests:
+
+    FAKE_PROVIDER_LATENCY_MS=50 uvicorn benchmarks.fake_server:app --workers 2
+"""
+from .fake_provider import install
+
+install()
+
+from app.main import app  # noqa: E402
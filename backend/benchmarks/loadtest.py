@@ -0,0 +1,333 @@
+"""
+Load test the API against the local FakeProvider.
+
+Starts `uvicorn benchmarks.fake_server:app` (or targets --url), replays a mix of
+/optimize, /search/tickers and /portfolio-presets traffic at a target rate and
+reports throughput, latency percentiles, error rates and per-process CPU/RSS.
+
+Usage (from the backend directory):
+    python -m benchmarks.loadtest --rps 20 --duration 60 --workers 2 --compute-workers 4
+    python -m benchmarks.loadtest --url http://localhost:8000 --rps 5 --mix optimize=1
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import httpx
+import numpy as np
+
+BACKEND_DIR = Path(__file__).parent.parent
+DEFAULT_MIX = {"optimize": 0.2, "search": 0.6, "presets": 0.2}
+OBJECTIVES = ("sharpe", "sortino", "calmar", "min_variance", "hrp", "risk_parity")
+
+
+class TrafficMix:
+    """Random requests in the configured proportions, drawn from a fixed pool of portfolios."""
+
+    def __init__(self, mix: Dict[str, float], tickers: List[Dict[str, str]], portfolios: int = 50,
+                 seed: int = 0):
+        """
+        Args:
+            mix: Relative weight of "optimize", "search" and "presets" requests
+            tickers: Ticker records used for portfolios and search queries
+            portfolios: Distinct /optimize bodies (repeats exercise the result cache)
+            seed: Random seed of the request sequence
+        """
+        self.kinds = [kind for kind, weight in mix.items() if weight > 0]
+        self.weights = [mix[kind] for kind in self.kinds]
+        self._random = random.Random(seed)
+        symbols = [ticker["symbol"] for ticker in tickers]
+        self.portfolios = [
+            {
+                "tickers": self._random.sample(symbols, self._random.randint(3, min(8, len(symbols)))),
+                "objective": self._random.choice(OBJECTIVES),
+                "portfolio_type": self._random.choice(("long_only", "long_only", "long_short")),
+                "lookback_days": self._random.choice((252, 252, 504)),
+                "include": ["weights", "metrics", "prices", "risk"]
+            }
+            for _ in range(portfolios)
+        ]
+        self.queries = [symbol[:self._random.randint(1, len(symbol))] for symbol in symbols] + \
+            [ticker["name"].split()[0] for ticker in tickers]
+
+    def next(self) -> Tuple[str, str, str, Optional[Dict[str, Any]]]:
+        """(kind, method, path, json body) of the next request."""
+        kind = self._random.choices(self.kinds, self.weights)[0]
+        if kind == "optimize":
+            return kind, "POST", "/optimize", self._random.choice(self.portfolios)
+        if kind == "search":
+            return kind, "GET", f"/search/tickers?q={self._random.choice(self.queries)}", None
+        return kind, "GET", "/portfolio-presets", None
+
+
+class ProcessSampler:
+    """Samples CPU time and RSS of a process and its descendants from /proc (Linux)."""
+
+    def __init__(self, pid: int, interval: float = 0.5):
+        self.pid = pid
+        self.interval = interval
+        self.samples: Dict[int, Dict[str, Any]] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._ticks = os.sysconf("SC_CLK_TCK")
+        self._page_size = os.sysconf("SC_PAGE_SIZE")
+
+    def _stat(self, pid: int) -> Optional[Tuple[int, float, int]]:
+        """(parent pid, CPU seconds, RSS bytes) of a process, or None if it is gone."""
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                # The command name may contain spaces; fields after it are space separated
+                fields = f.read().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            return None
+        return int(fields[1]), (int(fields[11]) + int(fields[12])) / self._ticks, int(fields[21]) * self._page_size
+
+    def _tree(self) -> List[int]:
+        parents = {}
+        for entry in os.listdir("/proc"):
+            if entry.isdigit():
+                stat = self._stat(int(entry))
+                if stat is not None:
+                    parents[int(entry)] = stat[0]
+        tree = [self.pid]
+        for pid in tree:
+            tree.extend(child for child, parent in parents.items() if parent == pid)
+        return tree
+
+    def _sample(self) -> None:
+        now = time.monotonic()
+        for pid in self._tree():
+            stat = self._stat(pid)
+            if stat is None:
+                continue
+            parent, cpu, rss = stat
+            sample = self.samples.setdefault(pid, {"first_time": now, "first_cpu": cpu, "max_rss": 0, "ppid": parent})
+            sample.update(last_time=now, last_cpu=cpu, max_rss=max(sample["max_rss"], rss))
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._sample()
+            self._stop.wait(self.interval)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> List[Dict[str, Any]]:
+        """Stop sampling and return average CPU percent and peak RSS per process."""
+        self._stop.set()
+        self._thread.join()
+        report = []
+        for pid, sample in sorted(self.samples.items()):
+            elapsed = sample["last_time"] - sample["first_time"]
+            report.append({
+                "pid": pid,
+                "ppid": sample["ppid"],
+                # Uvicorn workers are children of the server; compute workers are children of those
+                "role": "server" if pid == self.pid else "child",
+                "cpu_percent": round(100 * (sample["last_cpu"] - sample["first_cpu"]) / elapsed, 1) if elapsed > 0 else None,
+                "max_rss_mb": round(sample["max_rss"] / 2 ** 20, 1)
+            })
+        return report
+
+
+def _latency_summary(latencies: List[float]) -> Dict[str, Optional[float]]:
+    if not latencies:
+        return {"p50": None, "p95": None, "p99": None, "mean": None, "max": None}
+    values = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": round(float(p50), 2), "p95": round(float(p95), 2), "p99": round(float(p99), 2),
+            "mean": round(float(values.mean()), 2), "max": round(float(values.max()), 2)}
+
+
+def summarize(records: List[Tuple[str, Any, float]], elapsed: float) -> Dict[str, Any]:
+    """
+    Per-endpoint and overall statistics of a run.
+
+    Args:
+        records: (kind, status code or exception name, latency in seconds) per request
+        elapsed: Wall time of the run in seconds
+
+    Returns:
+        Request counts, throughput, error rates, status codes and latency percentiles (ms)
+    """
+    def stats(subset):
+        errors = [record for record in subset if not (isinstance(record[1], int) and record[1] < 400)]
+        status_codes: Dict[str, int] = {}
+        for _, status, _ in subset:
+            status_codes[str(status)] = status_codes.get(str(status), 0) + 1
+        return {
+            "requests": len(subset),
+            "throughput_rps": round(len(subset) / elapsed, 2) if elapsed > 0 else None,
+            "errors": len(errors),
+            "error_rate": round(len(errors) / len(subset), 4) if subset else 0.0,
+            "status_codes": status_codes,
+            "latency_ms": _latency_summary([latency for _, _, latency in subset])
+        }
+
+    kinds = sorted({kind for kind, _, _ in records})
+    return {
+        "overall": stats(records),
+        "endpoints": {kind: stats([record for record in records if record[0] == kind]) for kind in kinds}
+    }
+
+
+async def run_load(url: str, mix: TrafficMix, rps: float, duration: float, max_inflight: int = 1000,
+                   timeout: float = 120.0, transport: Optional[httpx.AsyncBaseTransport] = None) -> Dict[str, Any]:
+    """
+    Send requests at a constant arrival rate (open loop) and collect their outcomes.
+
+    Requests are issued on schedule regardless of how many are still in flight, so
+    a saturated server shows up as growing latency and errors. Arrivals beyond
+    max_inflight outstanding requests are dropped and counted.
+
+    Args:
+        url: Base URL of the API
+        mix: Request generator
+        rps: Target requests per second
+        duration: Seconds to send requests for
+        max_inflight: Client-side cap on outstanding requests
+        timeout: Per-request timeout in seconds
+        transport: Optional httpx transport (e.g. httpx.ASGITransport for in-process tests)
+
+    Returns:
+        summarize() report plus the target rate, duration and dropped arrivals
+    """
+    records: List[Tuple[str, Any, float]] = []
+    inflight: set = set()
+    dropped = 0
+    limits = httpx.Limits(max_connections=max_inflight, max_keepalive_connections=max_inflight)
+
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits, transport=transport) as client:
+        async def send(kind, method, path, body):
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                status: Any = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            records.append((kind, status, time.perf_counter() - started))
+
+        started = time.perf_counter()
+        total = int(rps * duration)
+        for i in range(total):
+            delay = started + i / rps - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if len(inflight) >= max_inflight:
+                dropped += 1
+                continue
+            task = asyncio.create_task(send(*mix.next()))
+            inflight.add(task)
+            task.add_done_callback(inflight.discard)
+        if inflight:
+            await asyncio.gather(*inflight)
+        elapsed = time.perf_counter() - started
+
+    report = summarize(records, elapsed)
+    report.update({"target_rps": rps, "duration": round(elapsed, 2), "dropped": dropped})
+    return report
+
+
+def launch_server(port: int, workers: int, env: Dict[str, str]) -> subprocess.Popen:
+    """Start uvicorn with the fake provider and wait until /health answers."""
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.fake_server:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env={**os.environ, **env}
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    process.terminate()
+    raise RuntimeError("Server did not start within 60 seconds")
+
+
+def _parse_mix(text: str) -> Dict[str, float]:
+    mix = {kind: 0.0 for kind in DEFAULT_MIX}
+    for part in text.split(","):
+        kind, _, weight = part.partition("=")
+        if kind not in mix:
+            raise argparse.ArgumentTypeError(f"Unknown request kind: {kind}")
+        mix[kind] = float(weight or 1)
+    return mix
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test the API against a fake market-data provider")
+    parser.add_argument("--rps", type=float, default=10, help="Target requests per second")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of traffic")
+    parser.add_argument("--mix", type=_parse_mix, default=DEFAULT_MIX,
+                        help="Request mix, e.g. optimize=0.2,search=0.6,presets=0.2")
+    parser.add_argument("--portfolios", type=int, default=50, help="Distinct /optimize bodies")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the request sequence")
+    parser.add_argument("--url", help="Target a running server instead of starting one")
+    parser.add_argument("--port", type=int, default=8765, help="Port of the started server")
+    parser.add_argument("--workers", type=int, default=1, help="Uvicorn worker processes")
+    parser.add_argument("--compute-workers", type=int, help="COMPUTE_WORKERS of each server process")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Fake provider latency per call")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fake provider failure probability")
+    parser.add_argument("--max-inflight", type=int, default=1000, help="Client-side cap on outstanding requests")
+    parser.add_argument("--output", help="Write the JSON report to this file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    with open(BACKEND_DIR / "data" / "tickers.json") as f:
+        tickers = json.load(f)
+    mix = TrafficMix(args.mix, tickers, portfolios=args.portfolios, seed=args.seed)
+
+    process = None
+    sampler = None
+    url = args.url
+    if url is None:
+        env = {
+            "FAKE_PROVIDER_LATENCY_MS": str(args.latency_ms),
+            "FAKE_PROVIDER_ERROR_RATE": str(args.error_rate),
+            "PRESET_REFRESH": "0"
+        }
+        if args.compute_workers is not None:
+            env["COMPUTE_WORKERS"] = str(args.compute_workers)
+        process = launch_server(args.port, args.workers, env)
+        sampler = ProcessSampler(process.pid)
+        sampler.start()
+        url = f"http://127.0.0.1:{args.port}"
+
+    try:
+        report = asyncio.run(run_load(url, mix, args.rps, args.duration, args.max_inflight))
+    finally:
+        if process is not None:
+            report_processes = sampler.stop()
+            process.send_signal(signal.SIGINT)
+            try:
+                process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    report["config"] = {key: value for key, value in vars(args).items() if key != "output"}
+    if sampler is not None:
+        report["processes"] = report_processes
+
+    encoded = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(encoded + "\n")
+    else:
+        print(encoded)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,271 @@
+"""
+Performance benchmarks on deterministic synthetic data.
+
+Usage (from the backend directory):
+    python -m benchmarks.run [--quick] [--only optimizer,frontier] [--output results.json]
+    python -m benchmarks.run --compare baseline.json results.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+import scipy
+import pandas as pd
+from app.metrics import RiskMetrics
+from app.optimizer import PortfolioOptimizer
+from app.ticker_index import TickerIndex
+from .synthetic import synthetic_market_data, synthetic_tickers
+
+OBJECTIVES = ("sharpe", "sortino", "calmar", "min_variance", "hrp", "risk_parity")
+PORTFOLIO_TYPES = ("long_only", "long_short")
+
+CONFIGS = {
+    "full": {"assets": 20, "days": 756, "lookback": 252, "repeat": 5, "frontier_points": 150,
+             "frontier_repeat": 3, "search_symbols": 50000, "endpoint_repeat": 3},
+    "quick": {"assets": 8, "days": 504, "lookback": 252, "repeat": 2, "frontier_points": 30,
+              "frontier_repeat": 1, "search_symbols": 5000, "endpoint_repeat": 1},
+}
+
+
+def _measure(fn: Callable[[], Any], repeat: int, warmup: int = 1) -> Dict[str, float]:
+    """Wall-clock statistics (seconds) of repeated calls after warm-up calls."""
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return {
+        "repeat": repeat,
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+        "max": max(timings)
+    }
+
+
+def _result(group: str, name: str, params: Dict[str, Any], timings: Dict[str, float]) -> Dict[str, Any]:
+    return {"group": group, "name": name, "params": params, **timings}
+
+
+def bench_optimizer(config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    returns = synthetic_market_data(config["assets"], config["days"]).returns.tail(config["lookback"])
+    results = []
+    for portfolio_type in PORTFOLIO_TYPES:
+        for objective in OBJECTIVES:
+            def solve():
+                # Seeded restarts, so every run solves the same problems
+                PortfolioOptimizer(returns, objective=objective, portfolio_type=portfolio_type, seed=0).optimize()
+            results.append(_result(
+                "optimizer", f"optimize[{objective},{portfolio_type}]",
+                {"assets": config["assets"], "days": config["lookback"]},
+                _measure(solve, config["repeat"])
+            ))
+    return results
+
+
+def bench_frontier(config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    returns = synthetic_market_data(config["assets"], config["days"]).returns.tail(config["lookback"])
+    results = []
+    for portfolio_type in PORTFOLIO_TYPES:
+        optimizer = PortfolioOptimizer(returns, objective="sharpe", portfolio_type=portfolio_type)
+        weights, _ = optimizer.optimize()
+        point_return = optimizer.moments.portfolio_return(weights)
+        point_risk = optimizer.moments.portfolio_volatility(weights)
+        results.append(_result(
+            "frontier", f"efficient_frontier[{portfolio_type}]",
+            {"assets": config["assets"], "num_points": config["frontier_points"]},
+            _measure(lambda: optimizer.calculate_efficient_frontier(
+                num_points=config["frontier_points"], extend_beyond_return=point_return,
+                extend_beyond_risk=point_risk
+            ), config["frontier_repeat"], warmup=0)
+        ))
+    return results
+
+
+def bench_metrics(config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    returns = synthetic_market_data(config["assets"], config["days"]).returns
+    weights = np.ones(returns.shape[1]) / returns.shape[1]
+    portfolio_returns = (returns * weights).sum(axis=1)
+    cases = {
+        "calculate_volatility": lambda: RiskMetrics.calculate_volatility(portfolio_returns),
+        "calculate_sharpe_ratio": lambda: RiskMetrics.calculate_sharpe_ratio(portfolio_returns),
+        "calculate_max_drawdown": lambda: RiskMetrics.calculate_max_drawdown(portfolio_returns),
+        "calculate_var": lambda: RiskMetrics.calculate_var(portfolio_returns),
+        "calculate_cvar": lambda: RiskMetrics.calculate_cvar(portfolio_returns),
+        "calculate_rolling_sharpe_ratio": lambda: RiskMetrics.calculate_rolling_sharpe_ratio(portfolio_returns, window=60),
+        "calculate_rolling_volatility": lambda: RiskMetrics.calculate_rolling_volatility(portfolio_returns, window=60),
+        "calculate_risk_decomposition": lambda: RiskMetrics.calculate_risk_decomposition(returns, weights),
+    }
+    # Metrics take microseconds to milliseconds; time batches of calls for stable numbers
+    repeat = config["repeat"] * 20
+    return [
+        _result("metrics", name, {"assets": config["assets"], "days": config["days"]}, _measure(fn, repeat))
+        for name, fn in cases.items()
+    ]
+
+
+def bench_search(config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    tickers = synthetic_tickers(config["search_symbols"])
+    results = [_result("search", "build_index", {"symbols": len(tickers)},
+                       _measure(lambda: TickerIndex(tickers), config["repeat"], warmup=0))]
+
+    index = TickerIndex(tickers, cache_size=0)
+    queries = ["A", "AB", "ABC", "GLOBAL", "ENERGY SY", "ZZZZ", "HEALTH", "Q"]
+
+    def search_all():
+        for query in queries:
+            index.search(query)
+
+    results.append(_result("search", "search", {"symbols": len(tickers), "queries": len(queries)},
+                           _measure(search_all, config["repeat"] * 20)))
+    return results
+
+
+def bench_endpoint(config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """End-to-end POST /optimize with the data provider stubbed out (compute pool included)."""
+    from fastapi.testclient import TestClient
+    from app import main
+
+    market_data = synthetic_market_data(config["assets"], config["days"])
+    tickers = list(market_data.prices.columns)
+    original_loader = main.load_market_data
+    main.load_market_data = lambda request, cancel_token=None: market_data
+    results = []
+    # Without the lifespan, so the preset refresher does not download real prices
+    client = TestClient(main.app)
+    try:
+        for objective in ("sharpe", "min_variance"):
+            body = {"tickers": tickers, "objective": objective, "portfolio_type": "long_only",
+                    "lookback_days": config["lookback"]}
+
+            def request():
+                # Measure the computation, not the result cache
+                main.result_cache.clear()
+                response = client.post("/optimize", json=body)
+                response.raise_for_status()
+
+            results.append(_result("endpoint", f"POST /optimize[{objective}]",
+                                   {"assets": config["assets"], "lookback": config["lookback"]},
+                                   _measure(request, config["endpoint_repeat"])))
+    finally:
+        main.load_market_data = original_loader
+        main.compute_pool.shutdown()
+    return results
+
+
+BENCHMARKS = {
+    "optimizer": bench_optimizer,
+    "frontier": bench_frontier,
+    "metrics": bench_metrics,
+    "search": bench_search,
+    "endpoint": bench_endpoint,
+}
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        output = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        return output.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(groups: List[str], config_name: str = "full") -> Dict[str, Any]:
+    """
+    Run benchmark groups.
+
+    Args:
+        groups: Names from BENCHMARKS
+        config_name: "full" or "quick" (see CONFIGS)
+
+    Returns:
+        Report with environment information and one entry per benchmark
+    """
+    config = CONFIGS[config_name]
+    results = []
+    for group in groups:
+        started = time.perf_counter()
+        results.extend(BENCHMARKS[group](config))
+        print(f"{group}: {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    return {
+        "commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {"name": config_name, **config},
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "scipy": scipy.__version__
+        },
+        "results": results
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Median timings of two reports side by side.
+
+    Returns:
+        One row per benchmark present in both reports, with "ratio" = current / baseline
+    """
+    baseline_medians = {(r["group"], r["name"]): r["median"] for r in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        key = (result["group"], result["name"])
+        if key in baseline_medians and baseline_medians[key] > 0:
+            rows.append({
+                "group": result["group"],
+                "name": result["name"],
+                "baseline": baseline_medians[key],
+                "current": result["median"],
+                "ratio": result["median"] / baseline_medians[key]
+            })
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run performance benchmarks on synthetic data")
+    parser.add_argument("--quick", action="store_true", help="Smaller problems and fewer repeats")
+    parser.add_argument("--only", help=f"Comma-separated groups ({', '.join(BENCHMARKS)})")
+    parser.add_argument("--output", help="Write the JSON report to this file (default: stdout)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"), help="Compare two JSON reports")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            baseline = json.load(f)
+        with open(args.compare[1]) as f:
+            current = json.load(f)
+        print(f"{'benchmark':<50} {'baseline':>10} {'current':>10} {'ratio':>7}")
+        for row in compare(baseline, current):
+            print(f"{row['group'] + '/' + row['name']:<50} {row['baseline'] * 1000:>8.2f}ms "
+                  f"{row['current'] * 1000:>8.2f}ms {row['ratio']:>6.2f}x")
+        return 0
+
+    groups = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [group for group in groups if group not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown benchmark groups: {', '.join(unknown)}")
+
+    report = run(groups, "quick" if args.quick else "full")
+    encoded = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(encoded + "\n")
+    else:
+        print(encoded)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+import string
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+from app.pipeline import MarketData
+
+
+def synthetic_returns(n_assets: int = 20, n_days: int = 756, market_correlation: float = 0.3,
+                      sector_correlation: float = 0.2, n_sectors: int = 5, seed: int = 0,
+                      end: str = "2024-12-31", tickers: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Deterministic daily returns with a market + sector correlation structure.
+
+    Standardized shocks are z = sqrt(m) * market + sqrt(s) * sector + sqrt(1 - m - s) * idiosyncratic,
+    so assets in the same sector have correlation m + s and other pairs m. Annual
+    drifts (-5% to 25%) and volatilities (15% to 45%) are drawn per asset.
+
+    Args:
+        n_assets: Number of assets
+        n_days: Number of business days
+        market_correlation: Correlation shared by all pairs (m)
+        sector_correlation: Additional correlation within a sector (s)
+        n_sectors: Number of sectors (assets are assigned round-robin)
+        seed: Random seed; the same arguments always give the same panel
+        end: Last date of the business-day index
+        tickers: Column names (default: S0000, S0001, ...)
+
+    Returns:
+        DataFrame of daily returns indexed by business day
+    """
+    if market_correlation + sector_correlation >= 1:
+        raise ValueError("market_correlation + sector_correlation must be below 1")
+
+    rng = np.random.default_rng(seed)
+    market = rng.standard_normal((n_days, 1))
+    sectors = rng.standard_normal((n_days, n_sectors))
+    idiosyncratic = rng.standard_normal((n_days, n_assets))
+    sector_of = np.arange(n_assets) % n_sectors
+    shocks = (np.sqrt(market_correlation) * market
+              + np.sqrt(sector_correlation) * sectors[:, sector_of]
+              + np.sqrt(1 - market_correlation - sector_correlation) * idiosyncratic)
+
+    drift = rng.uniform(-0.05, 0.25, n_assets) / 252
+    volatility = rng.uniform(0.15, 0.45, n_assets) / np.sqrt(252)
+    index = pd.bdate_range(end=end, periods=n_days)
+    columns = tickers or [f"S{i:04d}" for i in range(n_assets)]
+    return pd.DataFrame(drift + volatility * shocks, index=index, columns=columns)
+
+
+def synthetic_market_data(n_assets: int = 20, n_days: int = 756, esg: bool = False, benchmark: bool = True,
+                          seed: int = 0, **kwargs) -> MarketData:
+    """
+    MarketData as load_market_data would return it, without any download.
+
+    Args:
+        n_assets: Number of assets
+        n_days: Number of business days of prices
+        esg: Include ESG scores (10 to 40) and an ESG weight of 0.3
+        benchmark: Include SPY prices (the equal-weighted market)
+        seed: Random seed
+        **kwargs: Passed to synthetic_returns (correlations, sectors, tickers)
+
+    Returns:
+        MarketData with prices starting at 100
+    """
+    returns = synthetic_returns(n_assets, n_days + 1, seed=seed, **kwargs)
+    prices = 100 * (1 + returns).cumprod()
+    returns = prices.pct_change().dropna()
+
+    esg_scores = None
+    if esg:
+        rng = np.random.default_rng(seed + 1)
+        esg_scores = dict(zip(prices.columns, rng.uniform(10, 40, len(prices.columns)).round(1)))
+
+    benchmark_prices = None
+    if benchmark:
+        benchmark_prices = pd.DataFrame({"SPY": 100 * (1 + returns.mean(axis=1)).cumprod()})
+
+    return MarketData(prices, returns, esg_scores, 0.3 if esg else 0.0, benchmark_prices)
+
+
+def synthetic_tickers(n: int, seed: int = 0) -> List[Dict[str, str]]:
+    """Ticker records with unique 1-5 letter symbols and two-word company names."""
+    rng = np.random.default_rng(seed)
+    letters = np.array(list(string.ascii_uppercase))
+    words = ["Global", "Capital", "Energy", "Systems", "Health", "Bank", "Digital", "Foods", "Motors", "Labs",
+             "Pharma", "Retail", "Networks", "Holdings", "Industries", "Power", "Media", "Materials"]
+    symbols = set()
+    while len(symbols) < n:
+        symbols.add("".join(rng.choice(letters, rng.integers(1, 6))))
+    return [
+        {"symbol": symbol, "name": f"{rng.choice(words)} {rng.choice(words)} Inc."}
+        for symbol in sorted(symbols)
+    ]
@@ -0,0 +1,52 @@
+import pytest
+import pandas as pd
+import numpy as np
+from app.allocation import hrp_weights, risk_parity_weights
+from app.covariance import FactorCovariance
+from app.metrics import RiskMetrics
+from app.optimizer import PortfolioOptimizer
+
+
+def _sample_returns(days=252, assets=8):
+    market = np.random.normal(0.0005, 0.01, (days, 1))
+    noise = np.random.normal(0.0003, 0.015, (days, assets)) * np.linspace(0.5, 2.0, assets)
+    return pd.DataFrame(market + noise, columns=[f"T{i}" for i in range(assets)])
+
+
+def test_risk_parity_equalizes_risk_contributions():
+    """Test that risk parity gives every asset the same share of risk."""
+    returns = _sample_returns()
+    
+    weights = risk_parity_weights(returns.cov().values * 252)
+    decomposition = RiskMetrics.calculate_risk_decomposition(returns, weights)
+    
+    assert np.isclose(np.sum(weights), 1.0)
+    assert np.all(weights > 0)
+    for contribution in decomposition.values():
+        assert contribution == pytest.approx(100.0 / returns.shape[1], abs=1e-4)
+
+
+def test_hrp_weights_are_valid():
+    """Test HRP on dense and factored covariance."""
+    returns = _sample_returns()
+    cov = FactorCovariance.from_pca(returns, n_factors=3)
+    
+    for matrix in (returns.cov().values * 252, cov):
+        weights = hrp_weights(matrix)
+        assert np.isclose(np.sum(weights), 1.0)
+        assert np.all(weights > 0)
+    
+    # Lower-volatility assets get more capital
+    weights = hrp_weights(returns.cov().values * 252)
+    assert weights[0] > weights[-1]
+
+
+def test_allocation_objectives_in_optimizer():
+    """Test the hrp and risk_parity objectives for both portfolio types."""
+    returns = _sample_returns()
+    
+    for objective in ("hrp", "risk_parity"):
+        for portfolio_type in ("long_only", "long_short"):
+            weights, metrics = PortfolioOptimizer(returns, objective=objective, portfolio_type=portfolio_type).optimize()
+            assert np.isclose(np.sum(weights), 1.0)
+            assert "sharpe_ratio" in metrics
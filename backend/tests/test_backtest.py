@@ -0,0 +1,81 @@
+import pytest
+import pandas as pd
+import numpy as np
+from app.backtest import WalkForwardBacktester
+from app.optimizer import PortfolioOptimizer
+
+
+def _sample_returns(days=400):
+    index = pd.bdate_range("2020-01-01", periods=days)
+    return pd.DataFrame({
+        'AAPL': np.random.normal(0.001, 0.02, days),
+        'MSFT': np.random.normal(0.001, 0.015, days),
+        'GOOGL': np.random.normal(0.0008, 0.018, days)
+    }, index=index)
+
+
+def test_walk_forward_is_out_of_sample():
+    """Test that returns start after the first training window and rebalances are periodic."""
+    returns = _sample_returns()
+    
+    backtester = WalkForwardBacktester(returns, objective="sharpe", window=252, rebalance_every=21, max_workers=1)
+    result = backtester.run()
+    
+    assert len(result["portfolio_returns"]) == len(returns) - 252
+    assert result["portfolio_returns"].index[0] == returns.index[252]
+    assert len(result["rebalances"]) == len(range(252, len(returns), 21))
+    
+    for rebalance in result["rebalances"]:
+        assert np.isclose(sum(rebalance["weights"].values()), 1.0, atol=1e-6)
+    
+    assert result["total_turnover"] >= 0
+    assert np.isfinite(result["sharpe_ratio"])
+
+
+def test_walk_forward_process_pool_matches_sequential():
+    """Test that splitting rebalance dates across processes gives the same schedule."""
+    returns = _sample_returns(320)
+    
+    sequential = WalkForwardBacktester(returns, objective="min_variance", window=252, rebalance_every=21, max_workers=1).run()
+    pooled = WalkForwardBacktester(returns, objective="min_variance", window=252, rebalance_every=21, max_workers=2).run()
+    
+    assert [r["date"] for r in sequential["rebalances"]] == [r["date"] for r in pooled["rebalances"]]
+    for a, b in zip(sequential["rebalances"], pooled["rebalances"]):
+        for ticker in a["weights"]:
+            assert a["weights"][ticker] == pytest.approx(b["weights"][ticker], abs=1e-3)
+
+
+def test_block_tasks_run_externally_match_run():
+    """Test that solving the block tasks elsewhere and passing the results to run() changes nothing."""
+    returns = _sample_returns(320)
+    backtester = WalkForwardBacktester(returns, objective="min_variance", window=252, rebalance_every=21, max_workers=2)
+
+    tasks = backtester.block_tasks()
+    solved = [solve for fn, args in tasks for solve in fn(*args)]
+    assert len(tasks) == 2
+    assert [position for position, _ in solved] == backtester.rebalance_positions()
+
+    external = backtester.run(solved)
+    internal = backtester.run()
+    assert np.allclose(external["portfolio_returns"], internal["portfolio_returns"], atol=1e-4)
+
+
+def test_calmar_gradient_matches_finite_differences():
+    """Test the analytic Calmar gradient that keeps Calmar rebalances affordable."""
+    returns = _sample_returns(252)
+    optimizer = PortfolioOptimizer(returns, objective="calmar", portfolio_type="long_only")
+    weights = np.random.default_rng(1).dirichlet(np.ones(3))
+    
+    step = 1e-7
+    finite_differences = np.array([
+        (optimizer._objective_function(weights + step * unit) - optimizer._objective_function(weights - step * unit)) / (2 * step)
+        for unit in np.eye(3)
+    ])
+    assert optimizer._objective_jacobian() is not None
+    assert np.allclose(optimizer._objective_gradient(weights), finite_differences, atol=1e-5)
+
+
+def test_walk_forward_requires_history():
+    """Test that a window longer than the data is rejected."""
+    with pytest.raises(ValueError):
+        WalkForwardBacktester(_sample_returns(100), window=252)
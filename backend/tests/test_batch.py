@@ -0,0 +1,61 @@
+import json
+import pandas as pd
+import numpy as np
+from fastapi.testclient import TestClient
+from app import main
+from app.pipeline import MarketData, compute_portfolio, market_data_subset, window_moments
+from app.schemas import PortfolioRequest
+
+
+def _universe(days=400):
+    np.random.seed(11)
+    index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=days)
+    tickers = ["AAPL", "MSFT", "GOOGL", "AMZN", "JPM"]
+    returns = pd.DataFrame(np.random.normal(0.0008, 0.02, (days, len(tickers))), index=index, columns=tickers)
+    return MarketData(100 * (1 + returns).cumprod(), returns, None, 0.0, None)
+
+
+def test_sliced_moments_match_standalone_solve():
+    """Test that slicing the universe covariance gives the same portfolio as a standalone run."""
+    universe = _universe()
+    request = PortfolioRequest(tickers=["MSFT", "JPM", "AAPL"], objective="min_variance", portfolio_type="long_only",
+                               lookback_days=200, include=["weights"])
+    
+    subset = market_data_subset(universe, request)
+    assert list(subset.returns.columns) == ["MSFT", "JPM", "AAPL"]
+    
+    sliced = window_moments(request, universe).subset(list(subset.returns.columns))
+    batched = compute_portfolio(request, subset, sliced)
+    standalone = compute_portfolio(request, subset)
+    
+    for ticker, weight in standalone["weights"].items():
+        assert np.isclose(batched["weights"][ticker], weight, atol=1e-6)
+
+
+def test_batch_endpoint_streams_in_order(monkeypatch):
+    """Test that the batch endpoint fetches once and returns one line per portfolio in order."""
+    universe = _universe()
+    fetches = []
+    
+    def fake_load(requests):
+        fetches.append([request.tickers for request in requests])
+        return universe
+    
+    monkeypatch.setattr(main, "load_universe_data", fake_load)
+    main.result_cache.clear()
+    portfolios = [
+        {"tickers": ["AAPL", "MSFT"], "objective": "sharpe", "portfolio_type": "long_only", "include": ["weights"]},
+        {"tickers": ["GOOGL", "AMZN", "JPM"], "objective": "min_variance", "portfolio_type": "long_only",
+         "lookback_days": 120, "include": ["weights"]},
+        {"tickers": ["NOPE"], "objective": "sharpe", "portfolio_type": "long_only", "include": ["weights"]},
+    ]
+    
+    response = TestClient(main.app).post("/optimize/batch", json={"portfolios": portfolios})
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    
+    assert len(fetches) == 1
+    assert [line["index"] for line in lines] == [0, 1, 2]
+    assert set(lines[0]["result"]["weights"]) == {"AAPL", "MSFT"}
+    assert set(lines[1]["result"]["weights"]) == {"GOOGL", "AMZN", "JPM"}
+    assert lines[2]["status_code"] == 400
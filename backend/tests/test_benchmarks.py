@@ -0,0 +1,34 @@
+import json
+import numpy as np
+from benchmarks.run import compare, run
+from benchmarks.synthetic import synthetic_returns, synthetic_tickers
+
+
+def test_synthetic_returns_are_deterministic_with_target_correlation():
+    """Test that the generator is reproducible and has market + sector correlation."""
+    returns = synthetic_returns(n_assets=10, n_days=5000, market_correlation=0.3, sector_correlation=0.2,
+                                n_sectors=5, seed=7)
+    assert returns.equals(synthetic_returns(n_assets=10, n_days=5000, market_correlation=0.3,
+                                            sector_correlation=0.2, n_sectors=5, seed=7))
+    
+    correlation = returns.corr().to_numpy()
+    # Assets 0 and 5 share a sector, assets 0 and 1 do not
+    assert np.isclose(correlation[0, 5], 0.5, atol=0.05)
+    assert np.isclose(correlation[0, 1], 0.3, atol=0.05)
+
+
+def test_synthetic_tickers_are_unique():
+    """Test that generated ticker symbols are unique."""
+    tickers = synthetic_tickers(2000)
+    assert len({ticker["symbol"] for ticker in tickers}) == 2000
+
+
+def test_report_is_json_and_comparable():
+    """Test that a quick run produces a JSON report that can be compared with another."""
+    report = run(["metrics", "search"], "quick")
+    assert json.loads(json.dumps(report))["config"]["name"] == "quick"
+    assert {"group", "name", "params", "median", "min", "max"} <= set(report["results"][0])
+    
+    rows = compare(report, report)
+    assert len(rows) == len(report["results"])
+    assert all(row["ratio"] == 1.0 for row in rows)
@@ -0,0 +1,58 @@
+import asyncio
+import pytest
+from app import main
+from app.cancellation import CancellationToken, OperationCancelled
+from app.data_loader import DataLoader
+from app.optimizer import PortfolioOptimizer
+from benchmarks.synthetic import synthetic_market_data
+
+
+def _cancelled_token():
+    token = CancellationToken()
+    token.cancel()
+    return token
+
+
+def test_optimizer_and_frontier_stop_on_cancelled_token():
+    """Test that optimize and calculate_efficient_frontier raise once their token is cancelled."""
+    optimizer = PortfolioOptimizer(synthetic_market_data(5, 300).returns, objective="sharpe", portfolio_type="long_only")
+    with pytest.raises(OperationCancelled):
+        optimizer.optimize(cancel_token=_cancelled_token())
+    with pytest.raises(OperationCancelled):
+        optimizer.calculate_efficient_frontier(num_points=20, cancel_token=_cancelled_token())
+    # An uncancelled token changes nothing
+    weights, _ = optimizer.optimize(cancel_token=CancellationToken())
+    assert abs(weights.sum() - 1) < 1e-6
+
+
+def test_data_loader_skips_downloads_when_cancelled():
+    """Test that a cancelled DataLoader raises before downloading anything."""
+    with pytest.raises(OperationCancelled):
+        DataLoader(cancel_token=_cancelled_token()).fetch_prices(["AAPL"])
+    with pytest.raises(OperationCancelled):
+        DataLoader.fetch_esg_scores(["AAPL"], cancel_token=_cancelled_token())
+
+
+class _DisconnectingRequest:
+    class url:
+        path = "/optimize"
+
+    def __init__(self, polls_before_disconnect):
+        self.polls = 0
+        self.polls_before_disconnect = polls_before_disconnect
+
+    async def is_disconnected(self):
+        self.polls += 1
+        return self.polls > self.polls_before_disconnect
+
+
+@pytest.mark.asyncio
+async def test_disconnect_cancels_token(monkeypatch):
+    """Test that the disconnect watcher cancels the request's token."""
+    monkeypatch.setattr(main, "DISCONNECT_POLL_SECONDS", 0.01)
+    async with main._disconnect_token(_DisconnectingRequest(3)) as token:
+        await asyncio.sleep(0.2)
+        assert token.is_cancelled()
+    async with main._disconnect_token(_DisconnectingRequest(1000)) as token:
+        await asyncio.sleep(0.05)
+    assert not token.is_cancelled()
@@ -0,0 +1,69 @@
+import pandas as pd
+import numpy as np
+from fastapi.testclient import TestClient
+from app import main
+from app.pipeline import MarketData, compute_portfolio, solve_portfolio, window_moments, compute_comparison
+from app.schemas import ComparisonRequest
+
+
+def _market_data(days=300):
+    np.random.seed(5)
+    index = pd.bdate_range(end="2024-06-28", periods=days)
+    tickers = ["AAPL", "MSFT", "GOOGL", "JPM"]
+    returns = pd.DataFrame(np.random.normal(0.0006, 0.015, (days, len(tickers))), index=index, columns=tickers)
+    return MarketData(100 * (1 + returns).cumprod(), returns, None, 0.0, None)
+
+
+def test_comparison_matches_single_objective_runs():
+    """Test that each compared objective gets the weights a separate /optimize run would return."""
+    market_data = _market_data()
+    request = ComparisonRequest(tickers=["AAPL", "MSFT", "GOOGL", "JPM"], objectives=["sharpe", "min_variance"],
+                                portfolio_type="long_only", include=["weights", "metrics", "prices"])
+    
+    moments = window_moments(request, market_data)
+    solved = {objective: solve_portfolio(request.objective_request(objective), market_data, moments)
+              for objective in request.objectives}
+    result = compute_comparison(request, market_data, solved)
+    
+    assert set(result["objectives"]) == {"sharpe", "min_variance"}
+    assert set(result["price_history"]) == {"AAPL", "MSFT", "GOOGL", "JPM"}
+    for objective in request.objectives:
+        table = result["objectives"][objective]
+        assert "price_history" not in table
+        standalone = compute_portfolio(request.objective_request(objective), market_data)
+        for ticker, weight in standalone["weights"].items():
+            assert np.isclose(table["weights"][ticker], weight, atol=1e-6)
+        assert np.isclose(table["sharpe_ratio"], standalone["sharpe_ratio"])
+
+
+def test_compare_endpoint_loads_data_once(monkeypatch):
+    """Test that /optimize/compare fetches once and returns one frontier for all objectives."""
+    market_data = _market_data()
+    loads = []
+    
+    def fake_load(request):
+        loads.append(request.tickers)
+        return market_data
+    
+    monkeypatch.setattr(main, "load_market_data", fake_load)
+    response = TestClient(main.app).post("/optimize/compare", json={
+        "tickers": ["AAPL", "MSFT", "GOOGL", "JPM"],
+        "objectives": ["sharpe", "min_variance", "sharpe"],
+        "portfolio_type": "long_only",
+        "include": ["weights", "metrics", "frontier"]
+    })
+    
+    assert response.status_code == 200
+    body = response.json()
+    assert len(loads) == 1
+    assert list(body["objectives"]) == ["sharpe", "min_variance"]
+    assert len(body["efficient_frontier"]) > 10
+    assert body["objectives"]["min_variance"]["volatility_theoretical"] <= body["objectives"]["sharpe"]["volatility_theoretical"] + 1e-9
+
+
+def test_compare_requires_two_objectives():
+    """Test that a comparison needs at least two objectives."""
+    response = TestClient(main.app).post("/optimize/compare", json={
+        "tickers": ["AAPL", "MSFT"], "objectives": ["sharpe"], "portfolio_type": "long_only"
+    })
+    assert response.status_code == 422
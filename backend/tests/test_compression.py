@@ -0,0 +1,64 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+from app.compression import CompressionMiddleware, accepts_encoding
+
+brotli = pytest.importorskip("brotli")
+
+
+def _client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+    @app.get("/large")
+    async def large():
+        return PlainTextResponse("0.0123," * 1000)
+
+    @app.get("/small")
+    async def small():
+        return PlainTextResponse("ok")
+
+    @app.get("/stream")
+    async def stream():
+        async def lines():
+            for i in range(3):
+                yield f'{{"point": {i}}}\n' * 200
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    return TestClient(app)
+
+
+def test_accepts_encoding_honours_q_values():
+    """Test Accept-Encoding parsing."""
+    assert accepts_encoding("gzip, deflate, br", "br")
+    assert accepts_encoding("br;q=0.5, gzip", "br")
+    assert not accepts_encoding("br;q=0, gzip", "br")
+    assert not accepts_encoding("gzip", "br")
+
+
+def test_brotli_is_preferred_and_gzip_is_the_fallback():
+    """Test that br-capable clients get Brotli and everyone else gzip."""
+    client = _client()
+
+    br = client.get("/large", headers={"Accept-Encoding": "gzip, br"})
+    assert br.headers["content-encoding"] == "br"
+    assert "Accept-Encoding" in br.headers["vary"]
+    assert br.text == "0.0123," * 1000
+
+    gzip = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert gzip.headers["content-encoding"] == "gzip"
+    assert gzip.text == "0.0123," * 1000
+
+    small = client.get("/small", headers={"Accept-Encoding": "br"})
+    assert "content-encoding" not in small.headers
+    assert small.text == "ok"
+
+
+def test_streamed_brotli_body_decodes():
+    """Test that a streamed body is compressed chunk by chunk into one valid stream."""
+    response = _client().get("/stream", headers={"Accept-Encoding": "br"})
+
+    assert response.headers["content-encoding"] == "br"
+    assert "content-length" not in response.headers
+    assert response.text == "".join(f'{{"point": {i}}}\n' * 200 for i in range(3))
@@ -0,0 +1,117 @@
+import asyncio
+import os
+import time
+import pytest
+from app.cancellation import CancellationToken, OperationCancelled
+from app.compute_pool import ComputePool, OverloadedError
+
+
+def _square(x):
+    return x * x
+
+
+def _sleep(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def _exit_worker():
+    os._exit(1)
+
+
+def _work_until_cancelled(seconds, cancel_token=None):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        cancel_token.raise_if_cancelled()
+        time.sleep(0.01)
+    return seconds
+
+
+@pytest.mark.asyncio
+async def test_run_in_process_pool():
+    """Test that work is dispatched to worker processes and results come back."""
+    pool = ComputePool(max_workers=2)
+    try:
+        results = await asyncio.gather(*[pool.run(_square, i) for i in range(5)])
+        assert results == [0, 1, 4, 9, 16]
+        assert pool.pending == 0
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_full_queue_is_rejected_with_retry_after():
+    """Test that requests beyond workers + queue get a 429 immediately."""
+    pool = ComputePool(max_workers=0, max_queue=1)
+    try:
+        running = [asyncio.ensure_future(pool.run(_sleep, 0.3)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        
+        with pytest.raises(OverloadedError) as exc_info:
+            await pool.run(_sleep, 0.3)
+        assert exc_info.value.status_code == 429
+        assert exc_info.value.retry_after >= 1
+        
+        assert await asyncio.gather(*running) == [0.3, 0.3]
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_queue_timeout_returns_503():
+    """Test that waiting too long for a worker is rejected with a 503."""
+    pool = ComputePool(max_workers=0, max_queue=5, queue_timeout=0.1)
+    try:
+        running = asyncio.ensure_future(pool.run(_sleep, 0.4))
+        await asyncio.sleep(0.05)
+        
+        with pytest.raises(OverloadedError) as exc_info:
+            await pool.run(_sleep, 0.1)
+        assert exc_info.value.status_code == 503
+        
+        await running
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_cancel_token_reaches_worker_process():
+    """Test that cancelling a token in the parent stops the task running in a worker."""
+    pool = ComputePool(max_workers=1)
+    token = CancellationToken()
+    try:
+        task = asyncio.ensure_future(pool.run(_work_until_cancelled, 10, cancel_token=token))
+        await asyncio.sleep(0.5)
+        started = time.monotonic()
+        token.cancel()
+        with pytest.raises(OperationCancelled):
+            await task
+        assert time.monotonic() - started < 2
+        # The flag slot is released and reset for the next task
+        assert await pool.run(_work_until_cancelled, 0.05, cancel_token=CancellationToken()) == 0.05
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_token_never_reaches_a_worker():
+    """Test that a token cancelled before admission raises without running the task."""
+    pool = ComputePool(max_workers=0)
+    token = CancellationToken()
+    token.cancel()
+    with pytest.raises(OperationCancelled):
+        await pool.run(_sleep, 5, cancel_token=token)
+    pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_broken_pool_is_replaced():
+    """Test that a dead worker fails its task with a 503 and later tasks get a fresh pool."""
+    pool = ComputePool(max_workers=1)
+    try:
+        with pytest.raises(OverloadedError) as excinfo:
+            await pool.run(_exit_worker)
+        assert excinfo.value.status_code == 503
+        assert await pool.run(_square, 3) == 9
+    finally:
+        pool.shutdown()
@@ -0,0 +1,78 @@
+import pytest
+import pandas as pd
+import numpy as np
+from app.covariance import FactorCovariance, estimate_covariance
+from app.metrics import RiskMetrics
+from app.optimizer import PortfolioOptimizer
+
+
+def _sample_returns(days=120, assets=40):
+    market = np.random.normal(0.0005, 0.01, (days, 1))
+    noise = np.random.normal(0.0003, 0.015, (days, assets))
+    return pd.DataFrame(market + noise, columns=[f"T{i}" for i in range(assets)])
+
+
+def test_factored_products_match_dense():
+    """Test that O(n*k) products agree with the materialized matrix."""
+    returns = _sample_returns()
+    weights = np.random.dirichlet(np.ones(returns.shape[1]))
+    
+    for cov in (FactorCovariance.from_pca(returns, n_factors=5), FactorCovariance.from_shrinkage(returns)):
+        dense = cov.to_dense()
+        assert np.allclose(cov @ weights, dense @ weights)
+        assert cov.variance(weights) == pytest.approx(weights @ dense @ weights)
+        assert np.allclose(cov.diagonal(), np.diag(dense))
+        assert np.all(np.linalg.eigvalsh(dense) > 0)
+
+
+def test_shrinkage_rank_is_capped_by_assets_and_days():
+    """Test that long histories do not add a loading column per day."""
+    long_history = _sample_returns(days=400, assets=5)
+    short_history = _sample_returns(days=30, assets=40)
+    
+    long_cov = FactorCovariance.from_shrinkage(long_history)
+    short_cov = FactorCovariance.from_shrinkage(short_history)
+    
+    assert long_cov.n_factors == 5
+    assert short_cov.n_factors == 29
+    # The factored matrix is still the shrunk sample covariance
+    sample = long_history.cov().values * 252
+    off_diagonal = ~np.eye(5, dtype=bool)
+    ratio = long_cov.to_dense()[off_diagonal] / sample[off_diagonal]
+    assert np.allclose(ratio, ratio[0])
+    assert np.isclose(np.trace(long_cov.to_dense()), np.trace(sample))
+
+
+def test_full_rank_pca_recovers_sample_covariance():
+    """Test that keeping every component reproduces the sample covariance."""
+    returns = _sample_returns(days=200, assets=5)
+    
+    cov = FactorCovariance.from_pca(returns, n_factors=5)
+    
+    assert np.allclose(cov.to_dense(), returns.cov().values * 252, rtol=1e-3, atol=1e-6)
+
+
+def test_risk_decomposition_accepts_factored_covariance():
+    """Test that risk decomposition gives the same result for factored and dense inputs."""
+    returns = _sample_returns()
+    weights = np.ones(returns.shape[1]) / returns.shape[1]
+    cov = estimate_covariance(returns, "pca", n_factors=3)
+    
+    factored = RiskMetrics.calculate_risk_decomposition(returns, weights, cov_matrix=cov)
+    dense = RiskMetrics.calculate_risk_decomposition(returns, weights, cov_matrix=cov.to_dense())
+    
+    assert factored.keys() == dense.keys()
+    for ticker in factored:
+        assert factored[ticker] == pytest.approx(dense[ticker])
+
+
+def test_optimizer_with_factored_covariance():
+    """Test optimizing a larger universe with a factor model."""
+    returns = _sample_returns(days=252, assets=80)
+    cov = estimate_covariance(returns, "pca", n_factors=5)
+    
+    optimizer = PortfolioOptimizer(returns, objective="min_variance", covariance=cov)
+    weights, metrics = optimizer.optimize(num_restarts=1)
+    
+    assert np.allclose(np.sum(weights), 1.0, atol=1e-6)
+    assert np.all(weights >= -1e-6)
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pydantic import ValidationError
+from app.metrics import RiskMetrics
+from app.pipeline import _optimization_window, compute_portfolio, market_data_subset, window_moments
+from app.schemas import PortfolioRequest
+from benchmarks.synthetic import synthetic_market_data
+
+
+def _request(**overrides):
+    fields = {"tickers": ["S0000", "S0001", "S0002", "S0003", "S0004"], "objective": "sharpe", "portfolio_type": "long_only",
+              "lookback_days": 2000, "include": ["weights", "metrics"]}
+    return PortfolioRequest(**{**fields, **overrides})
+
+
+def test_return_panels_compound_daily_returns():
+    """Test that weekly and monthly panels equal the returns between period-end prices."""
+    market_data = synthetic_market_data(3, 300)
+    assert market_data.return_panels == {}
+    panels = {frequency: market_data.returns_at(frequency) for frequency in ("weekly", "monthly")}
+
+    for frequency, rule in (("weekly", "W-FRI"), ("monthly", "ME")):
+        period_prices = market_data.prices.resample(rule).last()
+        expected = period_prices.pct_change().iloc[1:]
+        # The first period only compounds the days after the first price
+        assert np.allclose(panels[frequency].iloc[1:].to_numpy(), expected.to_numpy())
+    assert len(panels["weekly"]) < len(market_data.returns) / 4.5
+
+
+def test_annualization_factor_scales_metrics():
+    """Test that RiskMetrics annualizes with the given number of periods per year."""
+    returns = pd.Series(np.random.default_rng(0).normal(0.004, 0.02, 200))
+    assert np.isclose(RiskMetrics.calculate_volatility(returns, periods_per_year=52), returns.std() * np.sqrt(52))
+    assert np.isclose(RiskMetrics.calculate_sharpe_ratio(returns, periods_per_year=12),
+                      (returns.mean() * 12 - 0.02) / (returns.std() * np.sqrt(12)))
+
+
+@pytest.mark.parametrize("frequency,business_days", [("weekly", 5), ("monthly", 260 / 12)])
+def test_optimization_window_uses_panel(frequency, business_days):
+    """Test that a weekly/monthly request optimizes on far fewer rows with comparable annualized moments."""
+    market_data = synthetic_market_data(5, 2600)
+    daily = window_moments(_request(), market_data)
+    resampled = window_moments(_request(frequency=frequency), market_data)
+
+    rows = len(market_data.returns_at(frequency).loc[lambda panel: panel.index > market_data.returns.index[-2000]])
+    assert abs(rows - 2000 / business_days) <= 1
+    assert np.allclose(resampled.mean, daily.mean, atol=0.06)
+    assert np.allclose(np.sqrt(np.diag(resampled.covariance)), np.sqrt(np.diag(daily.covariance)), rtol=0.25)
+
+    result = compute_portfolio(_request(frequency=frequency, objective="calmar"), market_data)
+    assert np.isclose(sum(result["weights"].values()), 1.0, atol=1e-6)
+
+
+@pytest.mark.parametrize("frequency", ["weekly", "monthly"])
+def test_optimization_window_drops_partial_leading_period(frequency):
+    """Test that the window holds exactly the periods lying entirely within the lookback."""
+    market_data = synthetic_market_data(3, 900)
+    panel = market_data.returns_at(frequency)
+    # Period end of every trading day
+    period_of_day = pd.Series(panel.index[panel.index.searchsorted(market_data.returns.index)],
+                              index=market_data.returns.index)
+
+    for lookback_days in range(600, 625):
+        request = _request(tickers=["S0000", "S0001", "S0002"], frequency=frequency, lookback_days=lookback_days)
+        first_day = market_data.returns.index[-lookback_days]
+        partial = set(period_of_day[period_of_day.index < first_day])
+        expected = [end for end in panel.index if end >= first_day and end not in partial]
+
+        assert list(_optimization_window(request, market_data).index) == expected
+
+
+def test_batch_subset_keeps_panels():
+    """Test that a batch subset slices the universe panels and gives the standalone moments."""
+    universe = synthetic_market_data(8, 2600)
+    request = _request(frequency="weekly", lookback_days=1000)
+    assert market_data_subset(universe, request).return_panels == {}
+    
+    universe.returns_at("weekly")
+    subset = market_data_subset(universe, request)
+
+    assert list(subset.return_panels["weekly"].columns) == request.tickers
+    sliced = window_moments(request, universe).subset(request.tickers)
+    assert np.allclose(sliced.covariance, window_moments(request, subset).covariance)
+
+
+def test_short_monthly_window_is_rejected():
+    """Test that a lookback spanning too few monthly periods fails validation."""
+    with pytest.raises(ValidationError, match="at least 504"):
+        _request(frequency="monthly", lookback_days=252)
+    assert _request(frequency="weekly", lookback_days=252).frequency == "weekly"
@@ -0,0 +1,54 @@
+import numpy as np
+from scipy.optimize import minimize
+from app import telemetry
+from app.optimizer import PortfolioOptimizer, FRONTIER_TOLERANCE
+from benchmarks.synthetic import synthetic_market_data
+
+
+def _optimizer(portfolio_type="long_only"):
+    returns = synthetic_market_data(8, 504).returns.tail(252)
+    return PortfolioOptimizer(returns, objective="sharpe", portfolio_type=portfolio_type)
+
+
+def test_frontier_points_carry_consistent_weights():
+    """Test that every frontier point has feasible weights reproducing its risk and return."""
+    optimizer = _optimizer("long_short")
+    frontier = optimizer.calculate_efficient_frontier(num_points=150)
+
+    assert 10 < len(frontier) < 150
+    risks = [point["risk"] for point in frontier]
+    assert risks == sorted(risks)
+    for point in frontier:
+        weights = np.array([point["weights"].get(ticker, 0.0) for ticker in optimizer.tickers])
+        assert np.isclose(weights.sum(), 1.0, atol=1e-6)
+        assert np.abs(weights).sum() <= 1.5 + 1e-6
+        assert np.isclose(optimizer.moments.portfolio_return(weights), point["return"], atol=1e-6)
+        assert np.isclose(optimizer.moments.portfolio_volatility(weights), point["risk"], atol=1e-6)
+
+
+def test_adaptive_frontier_matches_dense_reference():
+    """Test that interpolating the adaptive points stays within tolerance of densely solved targets."""
+    optimizer = _optimizer()
+    telemetry.REGISTRY.clear()
+    frontier = sorted(optimizer.calculate_efficient_frontier(num_points=150), key=lambda point: point["return"])
+    returns = np.array([point["return"] for point in frontier])
+    risks = np.array([point["risk"] for point in frontier])
+    assert telemetry.REGISTRY.counter_value("frontier_points_total", outcome="attempted") < 60
+
+    for target in np.linspace(returns[0], returns[-1], 40)[1:-1]:
+        result = minimize(optimizer._portfolio_variance, np.ones(8) / 8, jac=optimizer._portfolio_variance_gradient,
+                          method="SLSQP", bounds=optimizer._bounds(), constraints=optimizer._frontier_constraints(target),
+                          options={"maxiter": 2000, "ftol": 1e-12})
+        error = np.interp(target, returns, risks) - np.sqrt(optimizer._portfolio_variance(result.x))
+        assert -1e-6 <= error / (risks.max() - risks.min()) < 3 * FRONTIER_TOLERANCE
+
+
+def test_frontier_has_point_at_portfolio_return():
+    """Test that the frontier is solved at the shown portfolio's return."""
+    optimizer = _optimizer()
+    weights, _ = optimizer.optimize()
+    portfolio_return = optimizer.moments.portfolio_return(weights)
+    frontier = optimizer.calculate_efficient_frontier(
+        extend_beyond_return=portfolio_return, extend_beyond_risk=optimizer.moments.portfolio_volatility(weights)
+    )
+    assert any(np.isclose(point["return"], portfolio_return, atol=1e-8) for point in frontier)
@@ -0,0 +1,84 @@
+import json
+import pytest
+import pandas as pd
+import numpy as np
+from app import main
+from app.pipeline import MarketData, solve_portfolio
+from app.optimizer import PortfolioOptimizer
+from app.schemas import PortfolioRequest
+from app.compute_pool import ComputePool
+
+
+def _frontier_inputs():
+    np.random.seed(3)
+    index = pd.bdate_range("2020-01-01", periods=300)
+    returns = pd.DataFrame(np.random.normal(0.0008, 0.02, (300, 4)), index=index, columns=["A", "B", "C", "D"])
+    market_data = MarketData(100 * (1 + returns).cumprod(), returns, None, 0.0, None)
+    request = PortfolioRequest(tickers=["A", "B", "C", "D"], objective="sharpe", portfolio_type="long_only",
+                               include=["frontier"])
+    return request, market_data, solve_portfolio(request, market_data)
+
+
+def test_frontier_callbacks_report_points_and_stop():
+    """Test that on_point sees every solved point and should_stop ends the sweep early."""
+    returns = _frontier_inputs()[1].returns
+    optimizer = PortfolioOptimizer(returns, objective="sharpe", portfolio_type="long_only")
+    
+    seen = []
+    frontier = optimizer.calculate_efficient_frontier(num_points=20, on_point=seen.append)
+    assert len(seen) >= len(frontier) > 0
+    
+    stopped = []
+    optimizer.calculate_efficient_frontier(num_points=20, on_point=stopped.append,
+                                           should_stop=lambda: len(stopped) >= 3)
+    assert len(stopped) == 3
+
+
+@pytest.mark.asyncio
+async def test_stream_emits_points_then_final_curve():
+    """Test the NDJSON message sequence of the frontier stream."""
+    request, market_data, solved = _frontier_inputs()
+    events = [json.loads(line) async for line in main._frontier_events(request, market_data, solved, sse=False)]
+    
+    assert events[0]["type"] == "portfolio"
+    assert events[-1]["type"] == "frontier"
+    points = [event for event in events if event["type"] == "point"]
+    assert len(points) >= len(events[-1]["points"]) > 0
+    risks = [point["risk"] for point in events[-1]["points"]]
+    assert risks == sorted(risks)
+
+
+@pytest.mark.asyncio
+async def test_closing_stream_stops_remaining_solves():
+    """Test that closing the stream early releases the compute slot."""
+    request, market_data, solved = _frontier_inputs()
+    stream = main._frontier_events(request, market_data, solved, sse=True)
+    
+    first = await stream.__anext__()
+    assert first.startswith(b"event: portfolio\n")
+    assert (await stream.__anext__()).startswith(b"event: point\n")
+    await stream.aclose()
+    
+    assert main.compute_pool.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_stream_solves_in_worker_process(monkeypatch):
+    """Test that points cross back from a worker process and an early close waits for the worker."""
+    request, market_data, solved = _frontier_inputs()
+    pool = ComputePool(max_workers=1)
+    monkeypatch.setattr(main, "compute_pool", pool)
+    try:
+        events = [json.loads(line) async for line in main._frontier_events(request, market_data, solved, sse=False)]
+        assert [event["type"] for event in events[:2]] == ["portfolio", "point"]
+        assert events[-1]["type"] == "frontier"
+
+        stream = main._frontier_events(request, market_data, solved, sse=False)
+        await stream.__anext__()
+        await stream.__anext__()
+        await stream.aclose()
+        # The slot and the worker's cancellation flag are only released once the worker stopped
+        assert pool.pending == 0
+        assert len(pool._free_flags) == 1
+    finally:
+        pool.shutdown()
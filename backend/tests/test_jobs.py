@@ -0,0 +1,163 @@
+import asyncio
+import time
+import pytest
+import pandas as pd
+import numpy as np
+from app import jobs
+from app.compute_pool import ComputePool
+from app.jobs import Job, JobManager, SQLiteJobStore
+from app.pipeline import MarketData
+from app.schemas import PortfolioRequest
+
+
+def _fake_load(delay=0.0):
+    index = pd.bdate_range("2020-01-01", periods=300)
+    returns = pd.DataFrame(np.random.normal(0.001, 0.02, (300, 2)), index=index, columns=["AAPL", "MSFT"])
+    
+    def load(request, cancel_token=None):
+        time.sleep(delay)
+        return MarketData(100 * (1 + returns).cumprod(), returns, None, 0.0, None)
+    return load
+
+
+def _request(**kwargs):
+    return PortfolioRequest(tickers=["AAPL", "MSFT"], objective="min_variance", portfolio_type="long_only", **kwargs)
+
+
+async def _wait_finished(manager, job_id, timeout=20.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.get(job_id)
+        if job.finished:
+            return job
+        await asyncio.sleep(0.05)
+    raise AssertionError("Job did not finish in time")
+
+
+@pytest.mark.asyncio
+async def test_job_runs_all_stages(monkeypatch):
+    """Test that a job reports stage progress and stores the serialized result."""
+    monkeypatch.setattr(jobs, "load_market_data", _fake_load())
+    pool = ComputePool(max_workers=0)
+    manager = JobManager(pool, workers=1)
+    try:
+        job = manager.submit(_request(include=["weights", "metrics"]))
+        assert job.status == "queued"
+        
+        job = await _wait_finished(manager, job.job_id)
+        assert job.status == "succeeded"
+        assert job.progress == 1.0
+        assert job.stages == {"fetch": "done", "solve": "done", "frontier": "skipped", "metrics": "done"}
+        assert b'"weights"' in job.result
+        assert job.expires_at is not None
+    finally:
+        await manager.stop()
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_cancel_between_stages(monkeypatch):
+    """Test that a cancelled job stops after the running stage and keeps no result."""
+    monkeypatch.setattr(jobs, "load_market_data", _fake_load(delay=0.3))
+    pool = ComputePool(max_workers=0)
+    manager = JobManager(pool, workers=1)
+    try:
+        job = manager.submit(_request())
+        await asyncio.sleep(0.1)
+        assert manager.get(job.job_id).stages["fetch"] == "running"
+        
+        manager.cancel(job.job_id)
+        await asyncio.sleep(0.5)
+        job = manager.get(job.job_id)
+        assert job.status == "cancelled"
+        assert job.stages["solve"] == "pending"
+        assert job.result is None
+    finally:
+        await manager.stop()
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_store_resumes_unfinished_jobs(monkeypatch, tmp_path):
+    """Test that jobs persisted by a previous process are picked up again on start."""
+    monkeypatch.setattr(jobs, "load_market_data", _fake_load())
+    store = SQLiteJobStore(str(tmp_path / "jobs.db"))
+    interrupted = Job("interrupted", _request(include=["weights"]), status="running")
+    store.save(interrupted)
+    
+    pool = ComputePool(max_workers=0)
+    manager = JobManager(pool, store=SQLiteJobStore(str(tmp_path / "jobs.db")), workers=1)
+    try:
+        manager.start()
+        job = await _wait_finished(manager, "interrupted")
+        assert job.status == "succeeded"
+        assert store.get("interrupted").status == "succeeded"
+    finally:
+        await manager.stop()
+        pool.shutdown()
+
+
+def _slow_solve(calls):
+    """Solve stage that runs until its cancel token is cancelled (or 10s pass)."""
+    def solve(request, market_data, cancel_token=None):
+        calls.append(request)
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            cancel_token.raise_if_cancelled()
+            time.sleep(0.01)
+        raise AssertionError("Stage was not cancelled")
+    return solve
+
+
+@pytest.mark.asyncio
+async def test_cancel_reaches_running_stage(monkeypatch):
+    """Test that DELETE stops a compute stage mid-run through the job's cancel token."""
+    calls = []
+    monkeypatch.setattr(jobs, "load_market_data", _fake_load())
+    monkeypatch.setattr(jobs, "solve_portfolio", _slow_solve(calls))
+    pool = ComputePool(max_workers=0)
+    manager = JobManager(pool, workers=1)
+    try:
+        job = manager.submit(_request())
+        while manager.get(job.job_id).stages["solve"] != "running":
+            await asyncio.sleep(0.02)
+        
+        started = time.monotonic()
+        manager.cancel(job.job_id)
+        while manager._tokens:
+            await asyncio.sleep(0.02)
+        assert time.monotonic() - started < 2
+        assert manager.get(job.job_id).status == "cancelled"
+    finally:
+        await manager.stop()
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_jobs_are_claimed_once_and_cancels_survive(monkeypatch, tmp_path):
+    """Test two processes sharing a database: one runs the job, a cancel from the other stops it and sticks."""
+    calls = []
+    monkeypatch.setattr(jobs, "load_market_data", _fake_load())
+    monkeypatch.setattr(jobs, "solve_portfolio", _slow_solve(calls))
+    path = str(tmp_path / "jobs.db")
+    SQLiteJobStore(path).save(Job("shared", _request()))
+    
+    pool = ComputePool(max_workers=0)
+    first = JobManager(pool, store=SQLiteJobStore(path), workers=1, poll_interval=0.05)
+    second = JobManager(pool, store=SQLiteJobStore(path), workers=1, poll_interval=0.05)
+    try:
+        first.start()
+        second.start()
+        while second.get("shared").stages["solve"] != "running":
+            await asyncio.sleep(0.02)
+        
+        assert second.cancel("shared").status == "cancelled"
+        while first._tokens or second._tokens:
+            await asyncio.sleep(0.02)
+        assert len(calls) == 1
+        assert first.get("shared").status == "cancelled"
+        assert first.get("shared").stages["solve"] == "running"
+    finally:
+        await first.stop()
+        await second.stop()
+        pool.shutdown()
@@ -0,0 +1,51 @@
+import httpx
+import pytest
+from app import main
+from app.data_loader import DataLoader
+from benchmarks.fake_provider import FakeProvider
+from benchmarks.loadtest import TrafficMix, run_load, summarize
+
+TICKERS = [{"symbol": "AAPL", "name": "Apple Inc."}, {"symbol": "MSFT", "name": "Microsoft Corporation"},
+           {"symbol": "JPM", "name": "JPMorgan Chase & Co."}, {"symbol": "XOM", "name": "Exxon Mobil Corporation"}]
+
+
+def test_fake_provider_is_deterministic_and_fails_at_rate():
+    """Test that histories are stable per ticker and failures follow the error rate."""
+    provider = FakeProvider(latency_ms=0, seed=3)
+    prices = provider.fetch_prices(["AAPL", "MSFT"], days=500)
+    assert prices.shape == (500, 2)
+    assert prices["AAPL"].equals(provider.fetch_prices(["MSFT", "AAPL"], days=500)["AAPL"])
+    assert prices["AAPL"].iloc[-1] == provider.fetch_prices(["AAPL"], days=DataLoader(252).total_days_needed())["AAPL"].iloc[-1]
+    
+    failing = FakeProvider(latency_ms=0, error_rate=0.5, seed=1)
+    failures = 0
+    for _ in range(400):
+        try:
+            failing.fetch_esg_scores(["AAPL"])
+        except ValueError:
+            failures += 1
+    assert 150 < failures < 250
+
+
+def test_summarize_counts_errors_and_percentiles():
+    """Test per-endpoint error rates and latency percentiles."""
+    records = [("search", 200, 0.01)] * 98 + [("search", 500, 0.5), ("optimize", "ReadTimeout", 2.0)]
+    report = summarize(records, elapsed=10.0)
+    
+    assert report["overall"]["requests"] == 100
+    assert report["overall"]["throughput_rps"] == 10.0
+    assert report["endpoints"]["search"]["errors"] == 1
+    assert report["endpoints"]["optimize"]["status_codes"] == {"ReadTimeout": 1}
+    assert report["endpoints"]["search"]["latency_ms"]["p50"] == 10.0
+
+
+@pytest.mark.asyncio
+async def test_run_load_in_process():
+    """Test a short open-loop run against the app without a server."""
+    mix = TrafficMix({"optimize": 0, "search": 3, "presets": 1}, TICKERS, seed=2)
+    report = await run_load("http://testserver", mix, rps=50, duration=0.4,
+                            transport=httpx.ASGITransport(app=main.app))
+    
+    assert report["overall"]["requests"] == 20
+    assert report["overall"]["errors"] == 0
+    assert set(report["endpoints"]) <= {"search", "presets"}
@@ -0,0 +1,68 @@
+import pytest
+import pandas as pd
+import numpy as np
+from app.moments import RollingMoments, MomentsContext
+from app.optimizer import PortfolioOptimizer
+
+
+def _sample_returns(days=300):
+    return pd.DataFrame({
+        'AAPL': np.random.normal(0.001, 0.02, days),
+        'MSFT': np.random.normal(0.001, 0.015, days),
+        'GOOGL': np.random.normal(0.0008, 0.018, days)
+    })
+
+
+def test_sliding_window_matches_pandas():
+    """Test that add/remove updates track the full recomputation."""
+    returns = _sample_returns()
+    moments = RollingMoments.from_returns(returns.iloc[:100], reanchor_every=1000)
+    
+    for i in range(100, len(returns)):
+        moments.slide(returns.values[i])
+    
+    window = returns.iloc[-100:]
+    assert moments.count == 100
+    assert np.allclose(moments.mean(), window.mean().values * 252)
+    assert np.allclose(moments.covariance(), window.cov().values * 252)
+
+
+def test_reanchor_keeps_estimates():
+    """Test that periodic re-anchoring does not change the estimates."""
+    returns = _sample_returns()
+    moments = RollingMoments.from_returns(returns.iloc[:50], reanchor_every=7)
+    
+    for i in range(50, len(returns)):
+        moments.slide(returns.values[i])
+    
+    window = returns.iloc[-50:]
+    assert np.allclose(moments.covariance(annualize=False), window.cov().values)
+
+
+def test_optimizer_accepts_moments():
+    """Test optimizing from moments instead of a returns DataFrame."""
+    returns = _sample_returns()
+    moments = RollingMoments.from_returns(returns)
+    
+    from_moments, metrics = PortfolioOptimizer(moments=moments, objective="min_variance").optimize()
+    from_returns, _ = PortfolioOptimizer(returns, objective="min_variance").optimize()
+    
+    assert np.allclose(from_moments, from_returns, atol=1e-4)
+    assert "volatility" in metrics
+    
+    with pytest.raises(ValueError):
+        PortfolioOptimizer(moments=moments, objective="calmar")
+
+
+def test_moments_context_is_shared():
+    """Test that the optimizer reuses the request's moments instead of recomputing them."""
+    returns = _sample_returns()
+    context = MomentsContext.from_returns(returns)
+    
+    optimizer = PortfolioOptimizer(returns, objective="sharpe", moments=context)
+    weights, metrics = optimizer.optimize()
+    
+    assert optimizer.moments is context
+    assert context.portfolio_volatility(weights) == pytest.approx(metrics["volatility"])
+    assert context.portfolio_return(weights) == pytest.approx(metrics["expected_return"])
+    assert np.allclose(context.cholesky @ context.cholesky.T, context.covariance)
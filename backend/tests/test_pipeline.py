@@ -0,0 +1,81 @@
+import json
+import pytest
+import pandas as pd
+import numpy as np
+from app.schemas import PortfolioRequest, PortfolioResponse
+from app.pipeline import MarketData, compute_portfolio
+from app.encoding import dumps
+
+
+def _market_data(days=400):
+    np.random.seed(7)
+    index = pd.bdate_range("2020-01-01", periods=days)
+    returns = pd.DataFrame({
+        'AAPL': np.random.normal(0.001, 0.02, days),
+        'MSFT': np.random.normal(0.001, 0.015, days),
+        'GOOGL': np.random.normal(0.0008, 0.018, days)
+    }, index=index)
+    prices = 100 * (1 + returns).cumprod()
+    return MarketData(prices, returns, esg_scores=None, esg_weight=0.0, benchmark_prices=None)
+
+
+def test_all_sections_by_default():
+    """Test that a request without include/exclude computes every section."""
+    request = PortfolioRequest(tickers=["AAPL", "MSFT", "GOOGL"], objective="min_variance", portfolio_type="long_only")
+    result = compute_portfolio(request, _market_data())
+    
+    response = PortfolioResponse(**result)
+    assert response.efficient_frontier
+    assert set(response.rolling_metrics) == {"sharpe_30", "sharpe_60", "sharpe_90", "volatility_30", "volatility_60", "volatility_90"}
+    assert set(response.price_history) == {"AAPL", "MSFT", "GOOGL"}
+    assert response.risk_decomposition is not None
+    assert response.sharpe_ratio is not None
+
+
+def test_include_weights_skips_other_stages():
+    """Test that only the solve runs when just weights are requested."""
+    request = PortfolioRequest(tickers=["AAPL", "MSFT", "GOOGL"], objective="sharpe",
+                               portfolio_type="long_only", include=["weights"])
+    result = compute_portfolio(request, _market_data())
+    
+    assert set(result) == {"weights", "expected_return", "volatility"}
+    assert np.isclose(sum(result["weights"].values()), 1.0, atol=1e-6)
+
+
+def test_exclude_removes_sections():
+    """Test that excluded sections are not computed."""
+    request = PortfolioRequest(tickers=["AAPL", "MSFT", "GOOGL"], objective="min_variance",
+                               portfolio_type="long_only", exclude=["frontier", "prices", "rolling"])
+    result = compute_portfolio(request, _market_data())
+    
+    assert "efficient_frontier" not in result
+    assert "price_history" not in result
+    assert "rolling_metrics" not in result
+    assert "risk_decomposition" in result
+    assert "sharpe_ratio" in result
+
+
+def test_unknown_section_is_rejected():
+    """Test that unknown section names fail validation."""
+    with pytest.raises(ValueError):
+        PortfolioRequest(tickers=["AAPL"], objective="sharpe", portfolio_type="long_only", include=["everything"])
+
+
+def test_columnar_series_share_date_axis():
+    """Test that columnar time series are float arrays aligned to one date array."""
+    market_data = _market_data()
+    request = PortfolioRequest(tickers=["AAPL", "MSFT", "GOOGL"], objective="min_variance", portfolio_type="long_only",
+                               include=["metrics", "prices", "rolling"], series_format="columnar")
+    result = compute_portfolio(request, market_data)
+    
+    n_dates = len(result["dates"])
+    assert n_dates == len(market_data.prices)
+    assert len(result["portfolio_returns"]) == n_dates
+    assert all(len(values) == n_dates for values in result["price_history"].values())
+    assert all(len(values) == n_dates for values in result["rolling_metrics"].values())
+    assert np.allclose(result["price_history"]["AAPL"], market_data.prices["AAPL"].to_numpy())
+    
+    payload = json.loads(dumps(result))
+    assert payload["dates"][0] == "2020-01-01"
+    # Days before the lookback period have no rolling value
+    assert payload["rolling_metrics"]["sharpe_30"][0] is None
@@ -0,0 +1,44 @@
+import pytest
+import pandas as pd
+import numpy as np
+from app import presets
+from app.compute_pool import ComputePool
+from app.pipeline import MarketData
+from app.presets import PresetRefresher
+from app.result_cache import request_key, last_market_close
+from app.schemas import PortfolioRequest
+
+PRESETS = [
+    {"id": "pair", "name": "Pair", "tickers": ["AAPL", "MSFT"], "suggested_objective": "min_variance", "suggested_esg_weight": 0.0},
+    {"id": "broken", "name": "Broken", "tickers": ["FAIL"], "suggested_objective": "sharpe", "suggested_esg_weight": 0.0},
+]
+
+
+def _fake_load(request):
+    if request.tickers == ["FAIL"]:
+        raise ValueError("No valid data retrieved")
+    # Prices through the close the cache keys on, with a benchmark, as a complete fetch returns them
+    index = pd.bdate_range(end=last_market_close().date(), periods=300)
+    returns = pd.DataFrame(np.random.normal(0.001, 0.02, (300, 2)), index=index, columns=request.tickers)
+    prices = 100 * (1 + returns).cumprod()
+    return MarketData(prices, returns, None, 0.0, prices.iloc[:, :1].set_axis(["SPY"], axis=1))
+
+
+@pytest.mark.asyncio
+async def test_refresh_serves_default_preset_request(monkeypatch):
+    """Test that a refresh caches the response a default preset click asks for."""
+    monkeypatch.setattr(presets, "load_market_data", _fake_load)
+    pool = ComputePool(max_workers=0)
+    refresher = PresetRefresher(PRESETS, pool, max_concurrency=2)
+    try:
+        assert await refresher.refresh() == 1
+    finally:
+        pool.shutdown()
+    
+    click = PortfolioRequest(tickers=["MSFT", "AAPL"], objective="min_variance", portfolio_type="long_only", lookback_days=252)
+    assert refresher.cache.get(request_key(click, last_market_close().date())) is not None
+    
+    summary = refresher.summary("pair")
+    assert set(summary["weights"]) == {"AAPL", "MSFT"}
+    assert summary["sharpe_ratio"] is not None
+    assert refresher.summary("broken") is None
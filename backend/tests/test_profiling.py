@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+from app import main
+from app.pipeline import MarketData, compute_portfolio
+from app.profiling import profiling_allowed, profile_call
+from app.schemas import PortfolioRequest
+
+
+def _market_data(days=300):
+    np.random.seed(8)
+    index = pd.bdate_range(end="2024-06-28", periods=days)
+    returns = pd.DataFrame(np.random.normal(0.0005, 0.012, (days, 3)), index=index, columns=["AAPL", "MSFT", "JPM"])
+    return MarketData(100 * (1 + returns).cumprod(), returns, None, 0.0, None)
+
+
+def test_profiling_gate(monkeypatch):
+    """Test that profiling needs the environment flag or the admin token."""
+    monkeypatch.delenv("PROFILING_ENABLED", raising=False)
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    assert not profiling_allowed(None)
+    assert not profiling_allowed("secret")
+    
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    assert profiling_allowed("secret")
+    assert not profiling_allowed("wrong")
+    
+    monkeypatch.setenv("PROFILING_ENABLED", "1")
+    assert profiling_allowed(None)
+
+
+def test_profile_call_reports_stages_and_artifact(monkeypatch, tmp_path):
+    """Test that the report holds stage times, hot functions and the written profile."""
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+    request = PortfolioRequest(tickers=["AAPL", "MSFT", "JPM"], objective="sharpe", portfolio_type="long_only",
+                               include=["weights", "metrics", "risk"])
+    
+    result, report = profile_call(compute_portfolio, request, _market_data())
+    
+    assert set(result["weights"]) == {"AAPL", "MSFT", "JPM"}
+    assert {"moments", "optimize", "metrics"} <= set(report["stages"])
+    assert report["stages"]["optimize"] <= report["total_seconds"]
+    assert 0 < len(report["hot_functions"]) <= 25
+    assert report["artifact"].startswith(str(tmp_path))
+
+
+def test_optimize_profile_flag(monkeypatch):
+    """Test that profile=true is rejected without permission and bypasses the cache with it."""
+    monkeypatch.setattr(main, "load_market_data", lambda request: _market_data())
+    monkeypatch.delenv("PROFILING_ENABLED", raising=False)
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    client = TestClient(main.app)
+    body = {"tickers": ["AAPL", "MSFT", "JPM"], "objective": "min_variance", "portfolio_type": "long_only",
+            "include": ["weights"]}
+    
+    assert client.post("/optimize?profile=true", json=body).status_code == 403
+    
+    response = client.post("/optimize?profile=true", json=body, headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "no-store"
+    profile = response.json()["profile"]
+    assert "fetch" in profile["stages"]
+    assert profile["hot_functions"]
@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from scipy.optimize import minimize
+from app import main
+from app import optimizer as optimizer_module
+from app.compute_pool import ComputePool
+from app.moments import MomentsContext
+from app.optimizer import PortfolioOptimizer
+from app.schemas import ResampledFrontierRequest
+from benchmarks.synthetic import synthetic_market_data
+
+
+def _optimizer(portfolio_type="long_only"):
+    returns = synthetic_market_data(8, 504).returns.tail(252)
+    return PortfolioOptimizer(returns, objective="min_variance", portfolio_type=portfolio_type)
+
+
+def test_bootstrap_moments_match_resampled_rows():
+    """Test that each vectorized bootstrap moment set equals the moments of its resampled rows."""
+    optimizer = _optimizer()
+    means, covariances = optimizer.bootstrap_moments(5, seed=3)
+    rows = np.random.default_rng(3).integers(0, 252, size=(5, 252))
+
+    assert means.shape == (5, 8) and covariances.shape == (5, 8, 8)
+    sample = optimizer.returns.iloc[rows[2]]
+    assert np.allclose(means[2], sample.mean().to_numpy() * 252)
+    assert np.allclose(covariances[2], sample.cov().to_numpy() * 252)
+
+
+def test_parametric_bootstrap_is_independent_of_block_size(monkeypatch):
+    """Test that drawing parametric resamples in small blocks gives the same moment sets."""
+    base = _optimizer()
+    optimizer = PortfolioOptimizer(moments=base.moments, objective="min_variance")
+    means, covariances = optimizer.bootstrap_moments(7, seed=5)
+    monkeypatch.setattr(optimizer_module, "BOOTSTRAP_BLOCK_VALUES", 2 * 252 * 8)
+    blocked_means, blocked_covariances = optimizer.bootstrap_moments(7, seed=5)
+
+    assert np.allclose(means, blocked_means) and np.allclose(covariances, blocked_covariances)
+
+
+def test_rank_frontier_matches_slsqp():
+    """Test that the KKT (QP) path finds the same minimum-variance portfolios as SLSQP."""
+    base = _optimizer()
+    means, covariances = base.bootstrap_moments(3, seed=1)
+    for portfolio_type in ("long_only", "long_short"):
+        for mean, covariance in zip(means, covariances):
+            optimizer = PortfolioOptimizer(moments=MomentsContext(base.tickers, mean, covariance),
+                                           objective="min_variance", portfolio_type=portfolio_type)
+            weights = optimizer.rank_frontier(8)
+            returns = weights @ mean
+            assert np.all(np.diff(returns) > 0)
+            for rank in range(1, 7):
+                assert optimizer._is_feasible(weights[rank])
+                reference = minimize(optimizer._portfolio_variance, weights[-1], jac=optimizer._portfolio_variance_gradient,
+                                     method="SLSQP", bounds=optimizer._bounds(),
+                                     constraints=optimizer._frontier_constraints(returns[rank]),
+                                     options={"maxiter": 2000, "ftol": 1e-12})
+                assert optimizer._portfolio_variance(weights[rank]) <= reference.fun + 1e-8
+
+
+def test_resampled_frontier_is_reproducible_across_executors():
+    """Test that a seeded resampled frontier is the same serially and on an executor, with feasible averages."""
+    optimizer = _optimizer("long_short")
+    serial = optimizer.resampled_frontier(n_resamples=20, num_points=6, seed=7)
+    with ThreadPoolExecutor(2) as executor:
+        parallel = optimizer.resampled_frontier(n_resamples=20, num_points=6, seed=7, executor=executor, chunk_size=3)
+
+    assert serial["resamples_solved"] == 20 and len(serial["resampled_frontier"]) == 6
+    assert [point["weights"] for point in serial["resampled_frontier"]] == [point["weights"] for point in parallel["resampled_frontier"]]
+    assert serial["spread"]["weight_std"] > 0 and serial["wall_time_seconds"] > 0
+    for point in serial["resampled_frontier"]:
+        weights = np.array([point["weights"].get(ticker, 0.0) for ticker in optimizer.tickers])
+        assert optimizer._is_feasible(weights)
+        assert np.isclose(optimizer.moments.portfolio_return(weights), point["return"])
+    # Averaging over resamples pulls the top of the frontier away from the sample's corner portfolio
+    assert serial["resampled_frontier"][-1]["return"] < serial["sample_frontier"][-1]["return"]
+
+
+def test_resampled_endpoint(monkeypatch):
+    """Test that /optimize/resampled returns the averaged frontier and rejects factor covariances."""
+    market_data = synthetic_market_data(8, 504)
+    monkeypatch.setattr(main, "load_market_data", lambda request, cancel_token=None: market_data)
+    client = TestClient(main.app)
+    request = {"tickers": list(market_data.prices.columns), "portfolio_type": "long_only",
+               "n_resamples": 20, "num_points": 5, "seed": 1}
+
+    response = client.post("/optimize/resampled", json=request)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["n_resamples"] == 20 and len(body["resampled_frontier"]) == 5
+    assert set(body["spread"]) == {"weight_std", "return_std", "risk_std"}
+    assert client.post("/optimize/resampled", json=request).json()["resampled_frontier"] == body["resampled_frontier"]
+
+    assert client.post("/optimize/resampled", json={**request, "covariance_model": "pca"}).status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_resampled_chunks_are_admitted(monkeypatch):
+    """Test that the frontier chunks go through admission, so a full queue rejects the request."""
+    market_data = synthetic_market_data(8, 504)
+    monkeypatch.setattr(main, "load_market_data", lambda request, cancel_token=None: market_data)
+    pool = ComputePool(max_workers=2, max_queue=0)
+    monkeypatch.setattr(main, "compute_pool", pool)
+    request = ResampledFrontierRequest(tickers=list(market_data.prices.columns), portfolio_type="long_only",
+                                       n_resamples=20, num_points=5, seed=1)
+    try:
+        # Another request holds one of the two slots: the bootstrap fits, the second chunk does not
+        async with pool.admit():
+            with pytest.raises(HTTPException) as excinfo:
+                await main.resampled_frontier(request)
+        assert excinfo.value.status_code == 429
+        assert pool.pending == 0
+    finally:
+        pool.shutdown()
@@ -0,0 +1,120 @@
+from datetime import datetime, date
+import pandas as pd
+import numpy as np
+from fastapi.testclient import TestClient
+from app import main
+from app.pipeline import MarketData
+from app.schemas import PortfolioRequest
+from app.result_cache import ResultCache, body_etag, request_key, last_market_close, next_market_close, MARKET_TIMEZONE
+
+
+def test_request_key_is_canonical():
+    """Test that ticker order does not change the key but parameters and as-of date do."""
+    as_of = date(2024, 3, 1)
+    a = PortfolioRequest(tickers=["MSFT", "AAPL"], objective="sharpe", portfolio_type="long_only")
+    b = PortfolioRequest(tickers=["AAPL", "MSFT"], objective="sharpe", portfolio_type="long_only")
+    c = PortfolioRequest(tickers=["AAPL", "MSFT"], objective="min_variance", portfolio_type="long_only")
+    
+    assert request_key(a, as_of) == request_key(b, as_of)
+    assert request_key(a, as_of) != request_key(c, as_of)
+    assert request_key(a, as_of) != request_key(a, date(2024, 3, 4))
+
+
+def test_market_close_boundaries():
+    """Test last/next close around the close and over a weekend."""
+    friday_noon = datetime(2024, 3, 1, 12, 0, tzinfo=MARKET_TIMEZONE)
+    friday_evening = datetime(2024, 3, 1, 17, 0, tzinfo=MARKET_TIMEZONE)
+    
+    assert last_market_close(friday_noon).date() == date(2024, 2, 29)
+    assert next_market_close(friday_noon) == datetime(2024, 3, 1, 16, 0, tzinfo=MARKET_TIMEZONE)
+    assert last_market_close(friday_evening).date() == date(2024, 3, 1)
+    assert next_market_close(friday_evening).date() == date(2024, 3, 4)
+
+
+def test_entries_expire_and_are_evicted():
+    """Test TTL expiry at the next close and LRU eviction."""
+    cache = ResultCache(max_entries=2)
+    stored_at = datetime(2024, 3, 1, 12, 0, tzinfo=MARKET_TIMEZONE)
+    cache.put("a", b"1", now=stored_at)
+    cache.put("b", b"2", now=stored_at)
+    
+    assert cache.get("a", now=stored_at) == b"1"
+    cache.put("c", b"3", now=stored_at)
+    assert cache.get("b", now=stored_at) is None  # least recently used
+    assert cache.get("a", now=datetime(2024, 3, 1, 16, 0, tzinfo=MARKET_TIMEZONE)) is None
+
+
+def test_optimize_etag_revalidation(monkeypatch):
+    """Test that repeat requests are served from the cache and revalidate with a 304."""
+    index = pd.bdate_range(end=last_market_close().date(), periods=300)
+    returns = pd.DataFrame(np.random.normal(0.001, 0.02, (300, 2)), index=index, columns=["AAPL", "MSFT"])
+    calls = []
+    
+    def fake_load(request, cancel_token=None):
+        calls.append(request)
+        return MarketData(100 * (1 + returns).cumprod(), returns, None, 0.0, None)
+    
+    monkeypatch.setattr(main, "load_market_data", fake_load)
+    main.result_cache.clear()
+    client = TestClient(main.app)
+    payload = {"tickers": ["AAPL", "MSFT"], "objective": "min_variance", "portfolio_type": "long_only",
+               "include": ["weights"]}
+    
+    first = client.post("/optimize", json=payload)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    
+    second = client.post("/optimize", json=payload)
+    assert second.json() == first.json()
+    assert len(calls) == 1
+    
+    revalidated = client.post("/optimize", json=payload, headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["ETag"] == etag
+
+
+def test_etag_follows_the_body(monkeypatch):
+    """Test that the ETag hashes the body, so a changed body for the same request is not revalidated."""
+    index = pd.bdate_range(end=last_market_close().date(), periods=300)
+    returns = pd.DataFrame(np.random.normal(0.001, 0.02, (300, 2)), index=index, columns=["AAPL", "MSFT"])
+    monkeypatch.setattr(main, "load_market_data",
+                        lambda request, cancel_token=None: MarketData(100 * (1 + returns).cumprod(), returns, None, 0.0, None))
+    main.result_cache.clear()
+    client = TestClient(main.app)
+    payload = {"tickers": ["AAPL", "MSFT"], "objective": "min_variance", "portfolio_type": "long_only",
+               "include": ["weights"]}
+
+    first = client.post("/optimize", json=payload)
+    assert first.headers["ETag"] == body_etag(first.content)
+
+    # New data under the same key produces a new body and a new ETag
+    main.result_cache.clear()
+    returns.iloc[-1] += 0.01
+    changed = client.post("/optimize", json=payload, headers={"If-None-Match": first.headers["ETag"]})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != first.headers["ETag"]
+
+
+def test_incomplete_data_is_not_cached(monkeypatch):
+    """Test that stale prices or a failed ESG fetch are served but not cached under the request's key."""
+    index = pd.bdate_range(end=last_market_close().date(), periods=300)
+    returns = pd.DataFrame(np.random.normal(0.001, 0.02, (300, 2)), index=index, columns=["AAPL", "MSFT"])
+    prices = 100 * (1 + returns).cumprod()
+    esg_request = PortfolioRequest(tickers=["AAPL", "MSFT"], objective="sharpe", portfolio_type="long_only",
+                                   esg_weight=0.5, include=["weights"])
+    as_of = last_market_close().date()
+    
+    # The ESG fetch failed, so load_market_data fell back to esg_weight 0
+    assert not MarketData(prices, returns, None, 0.0, None).cacheable_as_of(esg_request, as_of)
+    assert MarketData(prices, returns, {"AAPL": 20.0, "MSFT": 15.0}, 0.5, None).cacheable_as_of(esg_request, as_of)
+    # The provider has not published the last close yet
+    stale = MarketData(prices.iloc[:-1], returns.iloc[:-1], {"AAPL": 20.0, "MSFT": 15.0}, 0.5, None)
+    assert not stale.cacheable_as_of(esg_request, as_of)
+    
+    monkeypatch.setattr(main, "load_market_data",
+                        lambda request, cancel_token=None: MarketData(prices, returns, None, 0.0, None))
+    main.result_cache.clear()
+    response = TestClient(main.app).post("/optimize", json=esg_request.model_dump(exclude_none=True))
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "no-store"
+    assert main.result_cache.get(request_key(esg_request, as_of)) is None
@@ -0,0 +1,49 @@
+import asyncio
+import time
+from datetime import timedelta
+import pytest
+from app.scheduling import MarketCloseSchedule
+
+
+@pytest.mark.asyncio
+async def test_failed_refresh_is_retried_with_capped_backoff():
+    """Test that failed refreshes are retried with doubling delays up to the cap, until one succeeds."""
+    calls = []
+
+    async def refresh():
+        calls.append(time.monotonic())
+        return len(calls) > 3
+
+    schedule = MarketCloseSchedule("test", refresh, retry_delay=timedelta(milliseconds=20),
+                                   max_retry_delay=timedelta(milliseconds=40))
+    schedule.start()
+    try:
+        for _ in range(200):
+            if len(calls) == 4:
+                break
+            await asyncio.sleep(0.01)
+        # The next refresh waits for the next market close
+        await asyncio.sleep(0.1)
+    finally:
+        await schedule.stop()
+
+    assert len(calls) == 4
+    gaps = [later - earlier for earlier, later in zip(calls, calls[1:])]
+    for gap, expected in zip(gaps, (0.02, 0.04, 0.04)):
+        assert gap >= expected - 0.005
+
+
+@pytest.mark.asyncio
+async def test_stop_cancels_the_schedule():
+    """Test that stop() cancels the background task."""
+    started = asyncio.Event()
+
+    async def refresh():
+        started.set()
+        return True
+
+    schedule = MarketCloseSchedule("test", refresh)
+    schedule.start()
+    await asyncio.wait_for(started.wait(), timeout=1)
+    await schedule.stop()
+    assert schedule._task is None
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+from app import main, screener
+from app.compute_pool import ComputePool
+from app.metrics import RiskMetrics
+from app.screener import SCREEN_COLUMNS, ScreenTable, UniverseScreener, compute_screen
+from benchmarks.synthetic import synthetic_market_data
+
+
+def _table():
+    market_data = synthetic_market_data(30, 300)
+    benchmark = market_data.benchmark_prices["SPY"].pct_change()
+    return market_data, compute_screen(market_data.returns, benchmark, {"S0000": "First Co"})
+
+
+def test_screen_matches_per_ticker_reference():
+    """Test that the vectorized statistics equal per-ticker pandas computations."""
+    market_data, table = _table()
+    returns = market_data.returns
+    benchmark = market_data.benchmark_prices["SPY"].pct_change().reindex(returns.index)
+    correlations = returns.corr().to_numpy()
+
+    for i, ticker in enumerate(returns.columns):
+        row = dict(zip(SCREEN_COLUMNS, table.values[i]))
+        assert np.isclose(row["volatility"], RiskMetrics.calculate_volatility(returns[ticker]))
+        assert np.isclose(row["sharpe_ratio"], RiskMetrics.calculate_sharpe_ratio(returns[ticker]))
+        assert np.isclose(row["max_drawdown"], RiskMetrics.calculate_max_drawdown(returns[ticker]))
+        shared = benchmark.notna()
+        assert np.isclose(row["beta"], np.cov(returns[ticker][shared], benchmark[shared])[0, 1] / benchmark[shared].var())
+        assert np.isclose(row["avg_correlation"], (correlations[i].sum() - 1) / (len(returns.columns) - 1))
+    assert table.names[0] == "First Co" and table.names[1] == "S0001"
+
+
+def test_query_filters_sorts_and_pages():
+    """Test that a query filters on bounds, sorts with undefined values last and pages the matches."""
+    values = np.array([[0.1, 0.2, 1.0, -0.1, 1.0, 0.3],
+                       [0.3, 0.4, np.nan, -0.5, 0.8, 0.2],
+                       [0.2, 0.1, 2.0, -0.2, 1.2, 0.4],
+                       [0.4, 0.3, 0.5, -0.3, np.nan, 0.1]])
+    table = ScreenTable(["A", "B", "C", "D"], ["a", "b", "c", "d"], values, "2024-06-28", 252)
+
+    total, rows = table.query("sharpe_ratio", descending=True)
+    assert total == 4 and [row["symbol"] for row in rows] == ["C", "A", "D", "B"]
+    assert rows[-1]["sharpe_ratio"] is None
+
+    total, rows = table.query("annual_return", descending=False, filters={"volatility": (0.15, None)}, offset=1, limit=1)
+    assert total == 3 and [row["symbol"] for row in rows] == ["B"]
+
+    # Undefined values never match a bound
+    total, _ = table.query(filters={"beta": (None, 5.0)})
+    assert total == 3
+    with pytest.raises(ValueError):
+        table.query("alpha")
+
+
+@pytest.mark.asyncio
+async def test_refresh_builds_table(monkeypatch):
+    """Test that a refresh screens the downloaded universe and keeps the old table on failure."""
+    market_data = synthetic_market_data(6, 400)
+    monkeypatch.setattr(screener, "load_screen_data", lambda symbols, lookback_days: market_data)
+    pool = ComputePool(max_workers=0)
+    universe = UniverseScreener([{"symbol": f"S{i:04d}", "name": f"Company {i}"} for i in range(6)], pool, lookback_days=200)
+    try:
+        assert await universe.refresh()
+        assert len(universe.table) == 6 and universe.table.lookback_days == 200
+        assert universe.table.names[2] == "Company 2"
+        # The as-of date is the last date in the data, not the last scheduled close
+        assert universe.table.as_of == market_data.returns.index[-1].date().isoformat()
+
+        def fail(symbols, lookback_days):
+            raise ValueError("No tickers with sufficient historical data")
+        monkeypatch.setattr(screener, "load_screen_data", fail)
+        table = universe.table
+        assert not await universe.refresh()
+        assert universe.table is table
+    finally:
+        pool.shutdown()
+
+
+def test_screen_endpoint(monkeypatch):
+    """Test that /screen answers 503 until the table exists, then serves filtered pages."""
+    client = TestClient(main.app)
+    monkeypatch.setattr(main.screener, "table", None)
+    response = client.get("/screen")
+    assert response.status_code == 503 and "Retry-After" in response.headers
+
+    _, table = _table()
+    monkeypatch.setattr(main.screener, "table", table)
+    response = client.get("/screen", params={"sort_by": "volatility", "order": "asc", "max_beta": 10, "limit": 5, "offset": 2})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] == 30 and body["offset"] == 2 and len(body["results"]) == 5
+    volatilities = [row["volatility"] for row in body["results"]]
+    assert volatilities == sorted(volatilities)
+    assert volatilities[0] >= np.sort(table.column("volatility"))[2]
+
+    assert client.get("/screen", params={"sort_by": "alpha"}).status_code == 422
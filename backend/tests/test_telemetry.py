@@ -0,0 +1,75 @@
+import pandas as pd
+import numpy as np
+from fastapi.testclient import TestClient
+from app import main, telemetry
+from app.optimizer import PortfolioOptimizer
+from app.telemetry import MetricsRegistry
+
+
+def test_registry_renders_prometheus_format():
+    """Test counter and cumulative histogram rendering."""
+    registry = MetricsRegistry(buckets=(0.1, 1.0))
+    registry.inc("cache_requests_total", cache="result", outcome="hit")
+    registry.inc("cache_requests_total", 2, cache="result", outcome="hit")
+    registry.observe("portfolio_stage_duration_seconds", 0.05, stage="solve")
+    registry.observe("portfolio_stage_duration_seconds", 0.5, stage="solve")
+    registry.observe("portfolio_stage_duration_seconds", 3.0, stage="solve")
+    
+    text = registry.render()
+    assert "# TYPE cache_requests_total counter" in text
+    assert 'cache_requests_total{cache="result",outcome="hit"} 3' in text
+    assert 'portfolio_stage_duration_seconds_bucket{stage="solve",le="0.1"} 1' in text
+    assert 'portfolio_stage_duration_seconds_bucket{stage="solve",le="1"} 2' in text
+    assert 'portfolio_stage_duration_seconds_bucket{stage="solve",le="+Inf"} 3' in text
+    assert 'portfolio_stage_duration_seconds_count{stage="solve"} 3' in text
+
+
+def test_collect_returns_samples_instead_of_recording():
+    """Test that samples recorded under collect() are handed back for merging."""
+    telemetry.REGISTRY.clear()
+    
+    def work():
+        with telemetry.span("solve"):
+            telemetry.inc("optimizer_slsqp_iterations_total", 7, objective="sharpe")
+        return "done"
+    
+    result, samples = telemetry.collect(work)
+    assert result == "done"
+    assert telemetry.REGISTRY.counter_value("optimizer_slsqp_iterations_total", objective="sharpe") == 0
+    
+    telemetry.REGISTRY.merge(samples)
+    assert telemetry.REGISTRY.counter_value("optimizer_slsqp_iterations_total", objective="sharpe") == 7
+    assert telemetry.REGISTRY.histogram_count("portfolio_stage_duration_seconds", stage="solve") == 1
+
+
+def test_optimizer_records_solver_counters():
+    """Test that restarts, iterations and frontier points are counted."""
+    telemetry.REGISTRY.clear()
+    np.random.seed(3)
+    returns = pd.DataFrame(np.random.normal(0.001, 0.02, (252, 3)), columns=["A", "B", "C"])
+    optimizer = PortfolioOptimizer(returns, objective="sharpe", portfolio_type="long_only")
+    
+    optimizer.optimize(num_restarts=3)
+    frontier = optimizer.calculate_efficient_frontier(num_points=10)
+    
+    registry = telemetry.REGISTRY
+    restarts = sum(registry.counter_value("optimizer_restarts_total", objective="sharpe", outcome=outcome)
+                   for outcome in ("converged", "failed", "error"))
+    assert restarts == 3
+    assert registry.counter_value("optimizer_slsqp_iterations_total", objective="sharpe") > 0
+    assert registry.counter_value("optimizer_objective_evaluations_total", objective="sharpe") > 0
+    assert len(frontier) <= registry.counter_value("frontier_points_total", outcome="attempted") <= 10
+    assert registry.counter_value("frontier_points_total", outcome="kept") == len(frontier)
+    assert registry.histogram_count("portfolio_stage_duration_seconds", stage="optimize") == 1
+
+
+def test_metrics_endpoint_reports_route_latency():
+    """Test that /metrics exposes request latency by route template."""
+    telemetry.REGISTRY.clear()
+    client = TestClient(main.app)
+    client.get("/search/tickers", params={"q": "AAPL"})
+    
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_request_duration_seconds_count{method="GET",route="/search/tickers",status="200"} 1' in response.text
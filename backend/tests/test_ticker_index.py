@@ -0,0 +1,57 @@
+import json
+import random
+import string
+from pathlib import Path
+from app.ticker_index import TickerIndex
+
+TICKERS = json.loads((Path(__file__).parent.parent / "data" / "tickers.json").read_text())
+
+
+def _linear_search(tickers, q):
+    """Reference implementation: the original linear scan of /search/tickers."""
+    query = q.upper().strip()
+    results = []
+    for ticker_info in tickers:
+        symbol = ticker_info["symbol"].upper()
+        name = ticker_info["name"].upper()
+        if query in symbol or query in name:
+            if symbol == query:
+                score = 100
+            elif symbol.startswith(query):
+                score = 50
+            elif query in symbol:
+                score = 30
+            else:
+                score = 20
+            results.append({"symbol": ticker_info["symbol"], "name": ticker_info["name"], "_score": score})
+    results.sort(key=lambda x: (-x["_score"], x["symbol"]))
+    return [{"symbol": r["symbol"], "name": r["name"]} for r in results[:20]]
+
+
+def test_matches_linear_scan():
+    """Test that the index ranks exactly like the linear scan on the shipped database."""
+    index = TickerIndex(TICKERS)
+    queries = ["A", "a", "AA", "APP", "apple", "MS", "INC", "CORP", "BANK", "X", "ZZZZ", "  nv ", "ENERGY", "S&P"]
+    for query in queries:
+        assert index.search(query) == _linear_search(TICKERS, query), query
+
+
+def test_matches_linear_scan_on_random_universe():
+    """Test ranking on a synthetic universe with many shared prefixes and substrings."""
+    random.seed(0)
+    tickers = [
+        {"symbol": "".join(random.choices("ABCDE", k=random.randint(1, 4))),
+         "name": " ".join("".join(random.choices(string.ascii_lowercase[:6], k=5)) for _ in range(2))}
+        for _ in range(2000)
+    ]
+    index = TickerIndex(tickers)
+    for query in ["A", "AB", "ABC", "ABCD", "BAD", "CAFE", "FACED", "E", "DDD"]:
+        assert index.search(query) == _linear_search(tickers, query), query
+
+
+def test_repeat_queries_hit_cache():
+    """Test that normalized repeat queries are answered from the LRU cache."""
+    index = TickerIndex(TICKERS)
+    index.search("msft")
+    index.search(" MSFT ")
+    assert index._search.cache_info().hits == 1
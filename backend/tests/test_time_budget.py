@@ -0,0 +1,61 @@
+import numpy as np
+from fastapi.testclient import TestClient
+from app import main
+from app.optimizer import PortfolioOptimizer
+from benchmarks.synthetic import synthetic_market_data
+
+
+def _returns():
+    return synthetic_market_data(8, 504).returns.tail(252)
+
+
+def test_budget_returns_best_feasible_partial_result():
+    """Test that a solve cut short by the time budget returns feasible weights flagged as partial."""
+    optimizer = PortfolioOptimizer(_returns(), objective="calmar", portfolio_type="long_short", time_budget_ms=20,
+                                   seed=0)
+    weights, metrics = optimizer.optimize()
+
+    assert metrics["partial"] is True
+    assert metrics["convergence"]["stopped_by_budget"] is True
+    assert metrics["convergence"]["elapsed_ms"] < 1000
+    assert np.isclose(weights.sum(), 1.0, atol=1e-6)
+    assert np.all(np.abs(weights) <= 1.0 + 1e-6) and np.abs(weights).sum() <= 1.5 + 1e-6
+
+
+def test_generous_budget_matches_unbudgeted_solve():
+    """Test that a budget that does not run out changes nothing but the diagnostics."""
+    weights, metrics = PortfolioOptimizer(_returns(), objective="sharpe", portfolio_type="long_only", seed=0).optimize()
+    budgeted_weights, budgeted_metrics = PortfolioOptimizer(
+        _returns(), objective="sharpe", portfolio_type="long_only", time_budget_ms=600000, seed=0
+    ).optimize()
+
+    assert "partial" not in metrics
+    assert budgeted_metrics["partial"] is False
+    assert budgeted_metrics["convergence"]["restarts_attempted"] == 5
+    assert np.allclose(weights, budgeted_weights)
+
+
+def test_frontier_stops_when_budget_is_spent():
+    """Test that the efficient frontier returns early and reports it once the budget is used up."""
+    optimizer = PortfolioOptimizer(_returns(), objective="sharpe", portfolio_type="long_only", time_budget_ms=0)
+    assert optimizer.calculate_efficient_frontier(num_points=50) == []
+    assert optimizer.frontier_complete is False
+
+
+def test_partial_response_is_not_cached(monkeypatch):
+    """Test that /optimize flags a budget-limited response as partial and does not cache it."""
+    market_data = synthetic_market_data(8, 504)
+    monkeypatch.setattr(main, "load_market_data", lambda request, cancel_token=None: market_data)
+    main.result_cache.clear()
+    response = TestClient(main.app).post("/optimize", json={
+        "tickers": list(market_data.prices.columns), "objective": "calmar", "portfolio_type": "long_short",
+        "include": ["weights"], "time_budget_ms": 10
+    })
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["partial"] is True
+    assert body["convergence"]["stopped_by_budget"] is True
+    assert response.headers["Cache-Control"] == "no-store"
+    assert "ETag" not in response.headers
+    assert len(main.result_cache) == 0
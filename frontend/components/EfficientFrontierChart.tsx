@@ -6,8 +6,12 @@ import { LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, Legend, Responsi
 interface EfficientFrontierPoint {
   risk: number;
   return: number;
+  weights?: Record<string, number>;
 }
 
+// Largest holdings listed in the hover tooltip of a frontier point
+const TOOLTIP_HOLDINGS = 5;
+
 interface EfficientFrontierChartProps {
   efficientFrontier: EfficientFrontierPoint[];
   currentRisk: number;
@@ -44,9 +48,10 @@ export default function EfficientFrontierChart({
   );
   
   // Prepare data for the frontier line
-  let frontierData = validFrontier.map(point => ({
+  let frontierData: Array<{ risk: number; return: number; weights?: Record<string, number> }> = validFrontier.map(point => ({
     risk: point.risk * 100,
     return: point.return * 100,
+    weights: point.weights,
   }));
   
   // Current portfolio point - validate and convert to percentage
@@ -218,17 +223,36 @@ export default function EfficientFrontierChart({
             />
             <Tooltip 
               cursor={{ stroke: '#38915a', strokeWidth: 1, strokeDasharray: '3 3' }}
-              contentStyle={{ 
-                backgroundColor: isDark ? 'rgba(31, 41, 55, 0.98)' : 'rgba(255, 255, 255, 0.98)', 
-                border: isDark ? '1px solid #4b5563' : '1px solid #e5e7eb',
-                borderRadius: '8px',
-                padding: '12px',
-                boxShadow: '0 10px 25px -5px rgba(0, 0, 0, 0.1), 0 8px 10px -6px rgba(0, 0, 0, 0.1)',
-                color: isDark ? '#f3f4f6' : '#111827'
+              content={({ active, payload, label }: any) => {
+                if (!active || !payload || payload.length === 0) return null;
+                const point = payload[0].payload;
+                const holdings = Object.entries((point.weights ?? {}) as Record<string, number>)
+                  .sort((a, b) => Math.abs(b[1]) - Math.abs(a[1]))
+                  .slice(0, TOOLTIP_HOLDINGS);
+                return (
+                  <div
+                    style={{
+                      backgroundColor: isDark ? 'rgba(31, 41, 55, 0.98)' : 'rgba(255, 255, 255, 0.98)',
+                      border: isDark ? '1px solid #4b5563' : '1px solid #e5e7eb',
+                      borderRadius: '8px',
+                      padding: '12px',
+                      boxShadow: '0 10px 25px -5px rgba(0, 0, 0, 0.1), 0 8px 10px -6px rgba(0, 0, 0, 0.1)',
+                      color: isDark ? '#f3f4f6' : '#111827',
+                      fontSize: '12px'
+                    }}
+                  >
+                    <div>Risk (Volatility): {Math.round(parseFloat(label))}%</div>
+                    <div>Expected Return: {parseFloat(point.return).toFixed(2)}%</div>
+                    {holdings.length > 0 && (
+                      <div className="mt-2">
+                        {holdings.map(([ticker, weight]) => (
+                          <div key={ticker}>{ticker}: {(weight * 100).toFixed(1)}%</div>
+                        ))}
+                      </div>
+                    )}
+                  </div>
+                );
               }}
-              formatter={(value: any) => [`${parseFloat(value).toFixed(2)}%`, 'Expected Return']}
-              labelFormatter={(label) => `Risk (Volatility): ${Math.round(parseFloat(label))}%`}
-              separator=": "
             />
             <Area
               type="monotone"
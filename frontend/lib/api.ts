@@ -4,8 +4,17 @@ export interface PortfolioRequest {
   portfolio_type: string;
   lookback_days: number;
   esg_weight?: number;
+  covariance_model?: 'sample' | 'pca' | 'shrinkage';
+  n_factors?: number;
+  include?: ResponseSection[];
+  exclude?: ResponseSection[];
+  series_format?: 'records' | 'columnar';
+  frequency?: 'daily' | 'weekly' | 'monthly';
 }
 
+export type ResponseSection =
+  | 'weights' | 'metrics' | 'frontier' | 'rolling' | 'prices' | 'benchmark' | 'risk' | 'esg';
+
 export interface PortfolioResponse {
   weights: Record<string, number>;
   expected_return: number;
@@ -18,7 +27,7 @@ export interface PortfolioResponse {
   price_history?: Record<string, Array<{ date: string; price: number }>>;
   portfolio_returns?: Array<{ date: string; value: number }>;
   benchmark_returns?: Array<{ date: string; value: number }>;
-  efficient_frontier?: Array<{ risk: number; return: number; sharpe: number }>;
+  efficient_frontier?: FrontierPoint[];
   rolling_metrics?: {
     sharpe_30?: Array<{ date: string; value: number }>;
     sharpe_60?: Array<{ date: string; value: number }>;
@@ -47,22 +56,85 @@ export interface TickerSearchResponse {
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL || 'http://127.0.0.1:8000';
 
+// Last response per request body, revalidated with If-None-Match (the API answers 304 if unchanged)
+const optimizeCache = new Map<string, { etag: string; data: PortfolioResponse }>();
+
 export async function optimizePortfolio(params: PortfolioRequest): Promise<PortfolioResponse> {
+  const body = JSON.stringify(params);
+  const cached = optimizeCache.get(body);
+  const headers: Record<string, string> = { 'Content-Type': 'application/json' };
+  if (cached) {
+    headers['If-None-Match'] = cached.etag;
+  }
+  
   const response = await fetch(`${API_URL}/optimize`, {
     method: 'POST',
-    headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify(params),
+    headers,
+    body,
   });
   
+  if (response.status === 304 && cached) {
+    return cached.data;
+  }
+  
   if (!response.ok) {
     const error = await response.json();
     throw new Error(error.detail || 'Optimization failed');
   }
   
-  return response.json();
+  const data: PortfolioResponse = await response.json();
+  const etag = response.headers.get('ETag');
+  if (etag) {
+    optimizeCache.set(body, { etag, data });
+  }
+  return data;
 }
 
 
+// Weights of the frontier portfolio (tiny weights omitted), for hover tooltips
+export type FrontierPoint = { risk: number; return: number; weights?: Record<string, number> };
+
+export type FrontierEvent =
+  | { type: 'portfolio'; weights: Record<string, number>; expected_return_theoretical: number; volatility_theoretical: number }
+  | ({ type: 'point' } & FrontierPoint)
+  | { type: 'frontier'; points: FrontierPoint[] }
+  | { type: 'error'; status_code: number; detail: string };
+
+// Streams frontier points as they are solved; aborting the signal cancels the remaining solves
+export async function streamEfficientFrontier(
+  params: PortfolioRequest,
+  onEvent: (event: FrontierEvent) => void,
+  signal?: AbortSignal,
+): Promise<void> {
+  const response = await fetch(`${API_URL}/optimize/frontier/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(params),
+    signal,
+  });
+  
+  if (!response.ok || !response.body) {
+    const error = await response.json();
+    throw new Error(error.detail || 'Frontier stream failed');
+  }
+  
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split('\n');
+    buffer = lines.pop() ?? '';
+    for (const line of lines) {
+      if (line.trim()) {
+        onEvent(JSON.parse(line));
+      }
+    }
+  }
+}
+
 export async function searchTickers(query: string): Promise<TickerInfo[]> {
   const response = await fetch(`${API_URL}/search/tickers?q=${encodeURIComponent(query)}`, {
     method: 'GET',
@@ -6,6 +6,16 @@ export interface PortfolioPreset {
   tickers: string[];
   suggested_objective: 'sharpe' | 'sortino' | 'calmar' | 'min_variance';
   suggested_esg_weight?: number;
+  precomputed?: {
+    objective: string;
+    lookback_days: number;
+    as_of: string;
+    weights: Record<string, number>;
+    expected_return: number;
+    volatility: number;
+    sharpe_ratio: number | null;
+    max_drawdown: number | null;
+  } | null;
 }
 
 // Import presets from JSON (in production, this would be fetched from API)